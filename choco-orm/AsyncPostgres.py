@@ -0,0 +1,209 @@
+import asyncio
+import uuid
+from typing import Any, AsyncIterator, Awaitable, List, Optional, Tuple, Union
+
+from AsyncPostgresPool import AsyncPostgresPool, wait_connection
+from Columnar import build_columns
+from PostgresBuilder import PostgresBuilder
+from Query import Query
+from QueryStatistics import QueryEvent
+
+
+class AsyncPostgres(PostgresBuilder):
+    """
+    Asyncio counterpart of Postgres.
+
+    Queries are built with the same fluent API (select, from_table, where, where_in,
+    subquery...), but `get()` is awaited and rows can be consumed with `async for`,
+    over a pool of asynchronous psycopg2 connections, so the event loop is never blocked.
+    Asynchronous psycopg2 connections are always in autocommit mode and do not use the
+    prepared statement mode.
+
+    It shares the builder of Postgres (PostgresBuilder), not its blocking operations: writes,
+    transactions, batches, plans, exports, pagination and introspection are Postgres only.
+    `cached()` results share the result cache of the DSN with Postgres.
+
+    Example:
+        db = QueryBuilder.AsyncPostgres(**config)
+        rows = await db.select(['country']).from_table('locations').where('country', '=', 'Brazil').get()
+
+        async for row in db.select(['country']).from_table('locations').stream(batch_size=500):
+            ...
+    """
+
+    _pool_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    @property
+    def pool(self) -> AsyncPostgresPool:
+        """
+        The asynchronous connection pool shared by every AsyncPostgres instance with the same DSN
+        in the running event loop.
+        """
+        loop = asyncio.get_running_loop()
+        if self._pool_loop is not loop:
+            # pools belong to one event loop, the one of another loop cannot be used here
+            self._pool, self._pool_loop = None, loop
+        return super().pool
+
+    def _shared_pool(self) -> AsyncPostgresPool:
+        return AsyncPostgresPool.for_dsn(self.dsn, **self.pool_options)
+
+    async def _execute_async(self, cursor, query: str, params: Optional[Tuple[Any, ...]] = None):
+        cursor.execute(query, params)
+        await wait_connection(cursor.connection)
+
+    def get(self) -> Awaitable[Union[List[Any], str, Tuple[str, Tuple[Any, ...]]]]:
+        """
+        Compiles the built query right away and returns an awaitable with the rows in the
+        configured result shape. With `get_query()` the awaitable gives the SQL instead.
+
+        The builder is cleared before anything is awaited, so several queries can be built
+        and then awaited together, e.g. with asyncio.gather.
+        """
+        return_query = self._return_query
+        if return_query:
+            return self._as_awaitable(self._query_text(self.build(), return_query))
+
+        event = QueryEvent('get')
+        show_query = self._show_query
+        query = self.build()
+        event.compile_time = event.lap()
+
+        if show_query == True:
+            print(self.inline_params(query.sql, query.params) + ';')
+
+        return self._fetch(query, event)
+
+    def run(self, query: Query) -> Awaitable[List[Any]]:
+        """
+        Returns an awaitable running a query object built with `build()`.
+        """
+        return self._fetch(query, QueryEvent('get'))
+
+    async def _as_awaitable(self, value: Any) -> Any:
+        return value
+
+    async def _fetch(self, query: Query, event: QueryEvent) -> List[Any]:
+        results = await self._fetch_cached(query, event)
+
+        for prefetch in query.prefetch:
+            children_query = prefetch.query(results, self, query.cache_ttl)
+            children = await self._fetch_cached(children_query, QueryEvent('prefetch')) if children_query else []
+            prefetch.attach(results, children)
+        return results
+
+    async def _fetch_cached(self, query: Query, event: QueryEvent) -> List[Any]:
+        if query.cache_ttl is None:
+            return await self._fetch_query(query, event)
+
+        event.query, event.params = query.sql, query.params
+        cache_key = self._result_cache_key(query)
+        results = self._cached_results(cache_key, event)
+        if results is not None:
+            return results
+
+        results = await self._fetch_query(query, event)
+        self.result_cache.put(cache_key, results, query.tables, query.cache_ttl)
+        return self._copy_results(results)
+
+    async def _fetch_query(self, query: Query, event: QueryEvent) -> List[Any]:
+        shape = query.shape
+        event.query, event.params = query.sql, query.params
+        results = None
+        event.lap()
+        conn = await self.pool.getconn()
+        try:
+            event.acquire_time = event.lap()
+            with conn.cursor() as cursor:
+                # the rows arrive with the query result, fetchall() only reads them from the client buffer
+                await self._execute_async(cursor, event.query, event.params)
+                event.execute_time = event.lap()
+                description = cursor.description
+                rows = cursor.fetchall()
+
+            if shape == 'columns':
+                results = build_columns(description, [rows])
+            else:
+                column_names = tuple(desc[0] for desc in description)
+                if shape == 'headers':
+                    results = [column_names] + rows
+                else:
+                    results = self._format_rows(shape, column_names, rows)
+            event.row_count = len(rows)
+            event.fetch_time = event.lap()
+        except Exception as error:
+            event.error = error
+            # the time until the failure (e.g. a statement timeout) counts as execution
+            event.execute_time += event.lap()
+            raise
+        finally:
+            await self.pool.putconn(conn)
+            self._emit_query_event(event, results)
+
+        return results
+
+    def stream(self, batch_size: int = 1000) -> AsyncIterator[Any]:
+        """
+        Runs the built query through a server-side cursor (DECLARE / FETCH) and yields the
+        rows one by one, fetching `batch_size` rows per round trip.
+        The pooled connection is returned when the iteration ends or is closed (wrap the
+        iterator in contextlib.aclosing when breaking out of the loop early).
+        """
+        shape = self._result_shape()
+        if shape == 'columns':
+            raise ValueError("rows_as_columns() results cannot be streamed, use get()")
+        event = QueryEvent('stream')
+        query, params = self._take_query()
+        event.compile_time = event.lap()
+        event.query, event.params = query, params
+
+        return self._stream_rows(event, batch_size, shape)
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self.stream()
+
+    def __iter__(self):
+        raise TypeError("AsyncPostgres is iterated with 'async for'")
+
+    async def _stream_rows(self, event: QueryEvent, batch_size: int, shape: str) -> AsyncIterator[Any]:
+        # asynchronous connections cannot create named cursors, the cursor is declared by hand
+        cursor_name = f'choco_stream_{uuid.uuid4().hex}'
+
+        event.lap()
+        conn = await self.pool.getconn()
+        try:
+            event.acquire_time = event.lap()
+            with conn.cursor() as cursor:
+                await self._execute_async(cursor, 'BEGIN')
+                await self._execute_async(
+                    cursor, f'DECLARE {cursor_name} NO SCROLL CURSOR FOR {event.query}', event.params
+                )
+                event.execute_time = event.lap()
+                column_names = None
+
+                while True:
+                    event.lap()
+                    await self._execute_async(cursor, f'FETCH FORWARD {int(batch_size)} FROM {cursor_name}')
+                    rows = cursor.fetchall()
+                    event.fetch_time += event.lap()
+                    event.row_count += len(rows)
+
+                    if column_names is None:
+                        column_names = tuple(desc[0] for desc in cursor.description)
+                        if shape == 'headers':
+                            yield column_names
+
+                    if not rows:
+                        break
+
+                    for row in self._format_rows(shape, column_names, rows):
+                        yield row
+
+                await self._execute_async(cursor, 'COMMIT')
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            # an interrupted stream leaves the transaction open, putconn rolls it back
+            await self.pool.putconn(conn)
+            self._emit_query_event(event)
@@ -0,0 +1,247 @@
+import asyncio
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import psycopg2
+from psycopg2 import extensions
+
+from PostgresPool import PoolTimeoutError
+
+
+async def wait_connection(conn):
+    """
+    Waits, without blocking the event loop, until the pending operation of an
+    asynchronous psycopg2 connection is complete.
+    """
+    loop = asyncio.get_running_loop()
+
+    while True:
+        state = conn.poll()
+        if state == extensions.POLL_OK:
+            return
+
+        waiter = loop.create_future()
+        wake_up = lambda: waiter.done() or waiter.set_result(None)
+        fileno = conn.fileno()
+
+        if state == extensions.POLL_READ:
+            loop.add_reader(fileno, wake_up)
+            try:
+                await waiter
+            finally:
+                loop.remove_reader(fileno)
+        elif state == extensions.POLL_WRITE:
+            loop.add_writer(fileno, wake_up)
+            try:
+                await waiter
+            finally:
+                loop.remove_writer(fileno)
+        else:
+            raise psycopg2.OperationalError(f"Unexpected poll state: {state}")
+
+
+async def async_connect(dsn: str):
+    conn = psycopg2.connect(dsn, async_=True)
+    await wait_connection(conn)
+    return conn
+
+
+class AsyncPostgresPool:
+    """
+    Pool of asynchronous psycopg2 connections for a single DSN, used by AsyncPostgres.
+
+    Same behaviour as PostgresPool (shared per DSN, min/max size, checkout timeout,
+    idle eviction), but waiting for a connection suspends the task instead of the thread.
+    """
+
+    _pools: Dict[Tuple[str, asyncio.AbstractEventLoop], 'AsyncPostgresPool'] = {}
+
+    def __init__(
+            self,
+            dsn: str,
+            min_size: int = 1,
+            max_size: int = 10,
+            timeout: float = 30.0,
+            max_idle: float = 300.0,
+            connect: Callable[..., Any] = async_connect
+        ):
+        """
+        Args:
+            dsn (str): The libpq connection string.
+            min_size (int): Connections kept open even when idle.
+            max_size (int): Maximum number of connections open at the same time.
+            timeout (float): Seconds to wait for a free connection before raising PoolTimeoutError.
+            max_idle (float): Seconds an idle connection above min_size is kept before being closed.
+            connect (Callable): Coroutine function opening a new connection, receives the dsn.
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self._connect = connect
+
+        self._idle = deque()    # (connection, last_used) pairs, most recently used on the right
+        self._size = 0
+        self._waiting = 0
+        self._closed = False
+        self._cond = asyncio.Condition()
+
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'evicted': 0,
+            'wait_time': 0.0,
+        }
+
+    @classmethod
+    def for_dsn(cls, dsn: str, **options: Any) -> 'AsyncPostgresPool':
+        """
+        Returns the pool shared by every caller using the same DSN in the running event loop,
+        creating it on first use. The options are only applied when the pool is created.
+        """
+        key = (dsn, asyncio.get_running_loop())
+        pool = cls._pools.get(key)
+        if pool is None or pool._closed:
+            pool = cls(dsn, **options)
+            cls._pools[key] = pool
+        return pool
+
+    @classmethod
+    async def close_all(cls):
+        """Closes the pools of the running event loop."""
+        loop = asyncio.get_running_loop()
+        for key in [key for key in cls._pools if key[1] is loop]:
+            await cls._pools.pop(key).close()
+
+    def _discard(self, conn):
+        """Closes a connection and frees its slot. Must be called with the condition held."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._size -= 1
+        self._stats['discarded'] += 1
+        self._cond.notify()
+
+    def _evict_idle(self):
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.max_idle:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+            self._stats['evicted'] += 1
+
+    async def getconn(self, timeout: Optional[float] = None):
+        """
+        Checks a connection out of the pool, opening one while below max_size.
+
+        Raises:
+            PoolTimeoutError: If no connection is available within the timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            async with self._cond:
+                if self._closed:
+                    raise psycopg2.InterfaceError('connection pool is closed')
+                self._evict_idle()
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Could not get a connection within {timeout}s "
+                            f"({self._size} of {self.max_size} in use)"
+                        )
+                    self._waiting += 1
+                    try:
+                        await asyncio.wait_for(self._cond.wait(), remaining)
+                    except asyncio.TimeoutError:
+                        pass
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, _ = self._idle.pop()
+                else:
+                    conn = None
+                    self._size += 1
+
+            if conn is None:
+                try:
+                    conn = await self._connect(self.dsn)
+                except Exception:
+                    async with self._cond:
+                        self._size -= 1
+                        self._cond.notify()
+                    raise
+                self._stats['created'] += 1
+            elif conn.closed or conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+                async with self._cond:
+                    self._discard(conn)
+                continue
+
+            self._stats['checkouts'] += 1
+            self._stats['wait_time'] += time.monotonic() - started
+            return conn
+
+    async def putconn(self, conn, discard: bool = False):
+        """
+        Returns a connection to the pool, rolling back any transaction left open.
+        """
+        if not discard and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                elif status != extensions.TRANSACTION_STATUS_IDLE:
+                    # asynchronous connections are in autocommit mode, transactions are explicit
+                    with conn.cursor() as cursor:
+                        cursor.execute('ROLLBACK')
+                        await wait_connection(conn)
+            except Exception:
+                discard = True
+
+        async with self._cond:
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._evict_idle()
+                self._cond.notify()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    async def close(self):
+        async with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = dict(self._stats)
+        stats.update({
+            'size': self._size,
+            'idle': len(self._idle),
+            'in_use': self._size - len(self._idle),
+            'waiting': self._waiting,
+            'min_size': self.min_size,
+            'max_size': self.max_size,
+        })
+        return stats
@@ -0,0 +1,105 @@
+from array import array
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+try:
+    import numpy
+except ImportError:  # optional, columns are returned as array.array without it
+    numpy = None
+
+
+# PostgreSQL type oid -> array.array typecode, other types are kept as Python objects
+TYPECODES_BY_OID = {
+    16: 'b',      # bool
+    20: 'q',      # int8
+    21: 'h',      # int2
+    23: 'i',      # int4
+    26: 'L',      # oid
+    700: 'f',     # float4
+    701: 'd',     # float8
+}
+
+
+class Columns(dict):
+    """
+    Query result as a mapping of column name -> column values.
+
+    Numeric and boolean columns are contiguous typed arrays (numpy arrays when numpy is
+    installed, array.array otherwise); other types are numpy object arrays or lists.
+    NULLs are tracked in `masks` (column name -> True where the value is NULL); with numpy,
+    typed columns holding NULLs are returned as masked arrays.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.masks: Dict[str, Any] = {}
+        self.row_count = 0
+
+
+class ColumnBuilder:
+    """
+    Accumulates the values of one column batch by batch.
+    """
+
+    def __init__(self, typecode: Optional[str]):
+        self.typecode = typecode
+        self.values = array(typecode) if typecode else []
+        self.mask = array('b')
+        self.has_nulls = False
+
+    def extend(self, values: Tuple[Any, ...]):
+        if None in values:
+            self.has_nulls = True
+            self.mask.extend([value is None for value in values])
+            if self.typecode:
+                values = [0 if value is None else value for value in values]
+        else:
+            self.mask.frombytes(bytes(len(values)))
+        self.values.extend(values)
+
+    def build(self) -> Tuple[Any, Any]:
+        """Returns the column values and the NULL mask in their final form."""
+        if numpy is None:
+            return self.values, self.mask
+
+        mask = numpy.frombuffer(self.mask, dtype=numpy.bool_) if len(self.mask) else numpy.zeros(0, dtype=numpy.bool_)
+
+        if self.typecode:
+            # shares the memory of the array.array instead of copying it
+            values = numpy.frombuffer(self.values, dtype=self.values.typecode) if len(self.values) \
+                else numpy.zeros(0, dtype=self.values.typecode)
+            if self.typecode == 'b':
+                values = values.view(numpy.bool_)
+            if self.has_nulls:
+                values = numpy.ma.MaskedArray(values, mask=mask)
+        else:
+            values = numpy.empty(len(self.values), dtype=object)
+            values[:] = self.values
+
+        return values, mask
+
+
+def build_columns(description: Sequence[Any], batches: Iterable[List[Tuple[Any, ...]]]) -> Columns:
+    """
+    Fills one typed array per column from batches of fetched rows, without keeping
+    the rows themselves.
+
+    Args:
+        description: The cursor description (name and type oid of each column).
+        batches: Iterable of lists of row tuples, e.g. successive cursor.fetchmany() results.
+    """
+    names = [column[0] for column in description]
+    builders = [ColumnBuilder(TYPECODES_BY_OID.get(column[1])) for column in description]
+
+    row_count = 0
+    for rows in batches:
+        if not rows:
+            continue
+        row_count += len(rows)
+        for builder, values in zip(builders, zip(*rows)):
+            builder.extend(values)
+
+    columns = Columns()
+    columns.row_count = row_count
+    for name, builder in zip(names, builders):
+        columns[name], columns.masks[name] = builder.build()
+    return columns
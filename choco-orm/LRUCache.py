@@ -0,0 +1,136 @@
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+
+class LRUCache:
+    """
+    Thread-safe mapping bounded to `max_size` entries (and optionally `max_bytes`) that evicts
+    the least recently used one. Entries can also expire after a time to live.
+
+    Keeps hit/miss/eviction counters so callers can expose how well the cache is doing.
+    """
+
+    def __init__(
+            self,
+            max_size: int = 128,
+            on_evict: Optional[Callable[[Hashable, Any], None]] = None,
+            ttl: Optional[float] = None,
+            max_bytes: Optional[int] = None,
+            sizeof: Optional[Callable[[Any], int]] = None
+        ):
+        """
+        Args:
+            max_size (int): Maximum number of entries kept.
+            on_evict (Optional[Callable]): Called with (key, value) when an entry is evicted to make room
+                or found expired.
+            ttl (Optional[float]): Default seconds an entry stays valid, None to never expire.
+            max_bytes (Optional[int]): Maximum total size of the values, measured with `sizeof`.
+            sizeof (Optional[Callable]): Returns the approximate size in bytes of a value,
+                sys.getsizeof by default.
+        """
+        if max_size < 1:
+            raise ValueError(f"max_size must be at least 1, got {max_size}")
+
+        self.max_size = max_size
+        self.on_evict = on_evict
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._sizeof = sizeof or sys.getsizeof
+        self._data = OrderedDict()     # key -> (value, expires_at or None, size)
+        self._bytes = 0
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            try:
+                value, expires_at, size = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            expired = expires_at is not None and expires_at <= time.monotonic()
+            if expired:
+                del self._data[key]
+                self._bytes -= size
+                self.expirations += 1
+                self.misses += 1
+            else:
+                self._data.move_to_end(key)
+                self.hits += 1
+
+        if not expired:
+            return value
+        if self.on_evict:
+            self.on_evict(key, value)
+        return default
+
+    def put(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """
+        Stores a value, `ttl` overrides the default time to live of the cache.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl is not None else None
+
+        size = self._sizeof(value) if self.max_bytes is not None else 0
+
+        evicted = []
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data[key][2]
+            self._data[key] = (value, expires_at, size)
+            self._data.move_to_end(key)
+            self._bytes += size
+            while len(self._data) > self.max_size or (self.max_bytes is not None and self._bytes > self.max_bytes):
+                evicted_key, (evicted_value, _, evicted_size) = self._data.popitem(last=False)
+                self._bytes -= evicted_size
+                evicted.append((evicted_key, evicted_value))
+                self.evictions += 1
+
+        if self.on_evict:
+            for evicted_key, evicted_value in evicted:
+                self.on_evict(evicted_key, evicted_value)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            value, _, size = self._data.pop(key)
+            self._bytes -= size
+            return value
+
+    def keys(self) -> List[Hashable]:
+        """Returns a snapshot of the keys, expired entries included."""
+        with self._lock:
+            return list(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._bytes = 0
+
+    def __contains__(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def info(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'size': len(self._data),
+                'max_size': self.max_size,
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+            }
@@ -1,4 +1,6 @@
-from QuerySql import QuerySql
+from PostgresBuilder import PostgresBuilder
+from QuerySql import PerThread
+from QueryNodes import BoolGroup, Parameter, Predicate, Subquery
 from typing import (
     Any,
     List,
@@ -6,135 +8,681 @@ from typing import (
     Union,
     Dict,
     Tuple,
-    Callable
+    Callable,
+    Iterator
 )
+import contextlib
+import io
+import itertools
+import logging
+import re
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 
-import psycopg2
 from psycopg2 import sql
+from psycopg2.extras import execute_values
+from psycopg2.extensions import encodings
+
+from Columnar import build_columns
+from LRUCache import LRUCache
+from PostgresCopy import CopyChunkWriter, CopyRowsReader
+from PostgresPool import PostgresPool
+from Query import Query
+from QueryBatch import QueryBatch
+from QueryPlan import QueryPlan
+from QueryStatistics import QueryEvent
+from Record import to_records
+
+logger = logging.getLogger(__name__)
+
+class Postgres(PostgresBuilder):
+    _statement_names = itertools.count(1)
+
+    # Introspection results of every DSN, see get_schemas/get_tables/get_info_table.
+    _metadata_caches: Dict[str, LRUCache] = {}
+    metadata_ttl: Optional[float] = 300.0
+
+    # Connection state, one per thread (see QuerySql)
+    conn = PerThread()
+    # open transaction() blocks and tables written in them
+    _transaction_depth = PerThread(lambda instance: 0)
+    _transaction_tables = PerThread(lambda instance: set())
+
+    # get() calls taking longer than this (seconds) log a warning with their plan, None disables it.
+    slow_query_threshold: Optional[float] = None
+    slow_query_analyze: bool = False
 
-class Postgres(QuerySql):
     def __init__(
             self,
             database: Optional[str],
             host: Optional[str], 
             port: Union[str, int],
             user_name: Optional[str], 
-            password: Optional[str]
+            password: Optional[str],
+            pool_options: Optional[Dict[str, Any]] = None
         ):
-        super().__init__()  # inicializa atributos conforme definido em SqlQuery
-        self.reset()
-        self.has_schema = True
-        self.DB_POSTGRES_DATABASE = database
-        self.DB_POSTGRES_HOST = host
-        self.DB_POSTGRES_PORT = port
-        self.DB_POSTGRES_USERNAME = user_name
-        self.DB_POSTGRES_PASSWORD = password
+        super().__init__(database, host, port, user_name, password, pool_options)
+        self.conn = None
 
-    def open_connection(self):
-        if not hasattr(self, 'conn') or self.conn.closed:
-            self.conn = psycopg2.connect(
-                dbname=self.DB_POSTGRES_DATABASE,
-                user=self.DB_POSTGRES_USERNAME,
-                password=self.DB_POSTGRES_PASSWORD,
-                host=self.DB_POSTGRES_HOST,
-                port=self.DB_POSTGRES_PORT,
-            )
+        self._use_prepared_statements = False
+        self._max_prepared_statements = 100
 
-    def close_connection(self):
-        if hasattr(self, 'conn'):
-            self.conn.close()
-
-    def __reset_query_parameters(self):
-        self.from_schema_name = []
-        self.with_query = []
-        self.selected_fields = []
-        self.from_table_name = []
-        self.joins_conditions = []
-        self.where_conditions = []
-        self.group_by_conditions = []
-        self.having_conditions = []
-        self.order_by_conditions = []
-        self.limit_value: int = None
-        self.offset_value: int = None
-
-        self._is_in_subquery: bool = False
-        self.subquery_depth = 0 # LEVEL DA SUBQUERY
-        self._current_attribute = None
-        self._is_start_subquery: bool = False
-        
-        self._show_query: bool = False
-        self._return_query: bool = False
-        self.query: str = None
-        return self
-    
+    @property
+    def pool(self) -> PostgresPool:
+        """
+        The connection pool shared by every Postgres instance with the same DSN.
+        """
+        return super().pool
 
+    def _shared_pool(self) -> PostgresPool:
+        return PostgresPool.for_dsn(self.dsn, **self.pool_options)
 
-    def print_query(self) -> 'Postgres':
-        self._show_query = True
-        return self
-    
-    def get_query(self) -> 'Postgres':
-        self._return_query = True
+    def log_slow_queries(self, threshold: Optional[float] = 1.0, analyze: bool = False) -> 'Postgres':
+        """
+        Captures the plan of every `get()` of this instance taking at least `threshold`
+        seconds and logs it as a warning (logger 'Postgres'), so plan regressions show up
+        as soon as they happen. The class attributes `slow_query_threshold` and
+        `slow_query_analyze` set the same for every instance.
+
+        Args:
+            threshold (Optional[float]): Duration in seconds, None turns the capture off.
+            analyze (bool): Captures the plan with EXPLAIN ANALYZE, which runs the slow
+                query a second time to get actual row counts and timings.
+        """
+        self.slow_query_threshold = threshold
+        self.slow_query_analyze = analyze
         return self
-   
-    def from_schema(self, schema_name) -> 'Postgres':
-        schema_name = self.to_postgres_field(schema_name)
-        self.from_schema_name = schema_name
+
+    def use_prepared_statements(self, enabled: bool = True, max_statements: int = 100) -> 'Postgres':
+        """
+        Runs queries as server-side prepared statements: each query shape is sent with
+        PREPARE once per connection and then only EXECUTEd with its values, skipping
+        parsing and planning on repeated calls.
+
+        Args:
+            enabled (bool): Turns the mode on or off for this instance.
+            max_statements (int): Prepared statements kept per connection; the least
+                recently used ones are deallocated.
+        """
+        self._use_prepared_statements = enabled
+        self._max_prepared_statements = max_statements
         return self
 
-    # def select(self, fields: List[str]) -> 'Postgres':
-    #     self.selected_fields = fields
-    #     self.query_historic.append('select')
-    #     return self
-    
-    def format_value(self, value) -> 'Postgres':
-        if value is None:
-            return "NULL"
-        elif isinstance(value, bool):
-            return 'TRUE' if value else 'FALSE'
-        elif isinstance(value, int):
-            return str(value)
-        elif isinstance(value, str):
-            return f"'{value}'"
-        elif isinstance(value, (list, tuple)):
-            return value
-        elif isinstance(value, dict):
-            return value
-        else:
-            raise ValueError(f"Unsupported value type: {type(value)}")
+    def open_connection(self):
+        # inside transaction() the pinned connection is kept, even when it was closed by a failure
+        if self._transaction_depth:
+            return
+        if self.conn is None or self.conn.closed:
+            self.conn = self.pool.getconn()
 
+    def close_connection(self):
+        if self._transaction_depth:
+            return
+        if self.conn is not None:
+            self.pool.putconn(self.conn)
+            self.conn = None
+
+    @property
+    def in_transaction(self) -> bool:
+        return self._transaction_depth > 0
+
+    @contextlib.contextmanager
+    def transaction(
+            self,
+            isolation_level: Optional[str] = None,
+            readonly: Optional[bool] = None,
+            deferrable: Optional[bool] = None
+        ) -> Iterator['Postgres']:
+        """
+        Runs every query of the block, in the current thread, on one pooled connection and in
+        one transaction, committed when the block ends and rolled back if it raises.
 
+        A transaction() opened inside another one is a SAVEPOINT: when its block raises, only
+        its own changes are rolled back and the outer transaction can go on.
 
-    def insert_many(self, fields: List[str], *values: Tuple[Any, ...]) -> 'Postgres':
+        Args:
+            isolation_level (Optional[str]): 'READ COMMITTED', 'REPEATABLE READ' or 'SERIALIZABLE'.
+            readonly (Optional[bool]): READ ONLY transaction, writes are rejected by the server.
+            deferrable (Optional[bool]): With SERIALIZABLE and readonly, waits for a snapshot that
+                cannot conflict, so a long report runs without serialization checks or failures.
+            The options are only accepted by the outermost transaction.
+
+        Example:
+            with db.transaction():
+                db.from_table('locations').insert_many(['country', 'population'], rows)
+                db.from_table('totals').insert_many(['country', 'population'], totals)
+
+            with db.transaction(isolation_level='SERIALIZABLE', readonly=True, deferrable=True):
+                report = db.select(['country', 'sum(population)']).from_table('locations').get()
         """
-        Constrói e exibe uma consulta SQL para inserção múltipla.
+        options = {
+            name: value for name, value in (
+                ('isolation_level', isolation_level),
+                ('readonly', readonly),
+                ('deferrable', deferrable),
+            ) if value is not None
+        }
+
+        if self._transaction_depth:
+            if options:
+                raise ValueError("Transaction options can only be set on the outermost transaction()")
+            yield from self._savepoint()
+            return
+
+        self.open_connection()
+        try:
+            if options:
+                self.conn.set_session(**options)
+            self._transaction_depth = 1
+            self._transaction_tables = set()
+            yield self
+            self.conn.commit()
+        finally:
+            tables = self._transaction_tables
+            self._transaction_depth = 0
+            self._transaction_tables = set()
+            # an uncommitted transaction is rolled back, and the session options reset, by the pool
+            self.close_connection()
+
+        # results cached by other threads while the transaction was open are stale now
+        for table_name in tables:
+            self.result_cache.invalidate_table(table_name)
+
+    def _savepoint(self) -> Iterator['Postgres']:
+        name = f'choco_savepoint_{self._transaction_depth}'
+        with self.conn.cursor() as cursor:
+            cursor.execute(f'SAVEPOINT {name}')
+
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            with self.conn.cursor() as cursor:
+                cursor.execute(f'ROLLBACK TO SAVEPOINT {name}')
+                cursor.execute(f'RELEASE SAVEPOINT {name}')
+            raise
+
+        self._transaction_depth -= 1
+        with self.conn.cursor() as cursor:
+            cursor.execute(f'RELEASE SAVEPOINT {name}')
+
+    def _commit(self):
+        """Commits the write just done, unless it is part of a transaction() block."""
+        if not self._transaction_depth:
+            self.conn.commit()
+
+    def _invalidate_table(self, table_name: str):
+        self.result_cache.invalidate_table(table_name)
+        if self._transaction_depth:
+            self._transaction_tables.add(table_name)
+
+
+
+    def insert_many(
+            self,
+            fields: List[str],
+            *values: Tuple[Any, ...],
+            rows: Optional[Any] = None,
+            method: str = 'values',
+            page_size: int = 1000
+        ) -> int:
+        """
+        Inserts rows into the table set with `from_table()`.
+
+        Rows can be given one per argument, or as a single iterable (list, generator...)
+        which is consumed lazily, so the whole dataset never has to be in memory.
+        A single tuple argument is one row, unless every element of it is a tuple:
+        then it is a tuple of rows. `rows=` always takes an iterable of rows.
 
         Args:
-            fields (List[str]): Lista de nomes de colunas.
-            values (Tuple[Any, ...]): Sequência de tuplas, onde cada tupla contém valores correspondentes às colunas.
+            fields (List[str]): Column names.
+            values (Tuple[Any, ...]): Rows with one value per column, or one iterable of rows.
+            rows (Optional[Iterable]): The rows, as an iterable, instead of `values`.
+            method (str): 'values' sends multi-row INSERT ... VALUES batches of `page_size`
+                rows through execute_values; 'copy' streams the rows through COPY ... FROM STDIN,
+                which is the fastest path for large loads.
+            page_size (int): Rows per INSERT statement for the 'values' method.
 
         Returns:
-            None: A função imprime a consulta SQL construída.
+            int: The number of rows inserted.
+
+        Example:
+            db.from_table('locations').insert_many(['country', 'population'], rows_generator(), method='copy')
         """
-        # Montar a string de colunas
+        if method not in ('values', 'copy'):
+            raise ValueError(f"Unsupported insert method: {method}")
+
+        table_name = self._current_table_name()
+        if table_name is None:
+            raise ValueError("Call from_table() before insert_many()")
+
+        if rows is not None:
+            if values:
+                raise ValueError("Pass the rows either as arguments or with rows=, not both")
+        elif len(values) == 1 and self._is_rows_iterable(values[0]):
+            rows = values[0]
+        else:
+            rows = values
+
+        inserted = 0
+
+        def counted(rows):
+            nonlocal inserted
+            for row in rows:
+                inserted += 1
+                yield row
+
         fields_str = ', '.join(fields)
-        
-        # Montar a string de placeholders para os valores
-        placeholders_str = ', '.join(['%s'] * len(fields))
+        self._reset_query_parameters()
+
+        if method == 'values':
+            query = f"INSERT INTO {table_name} ({fields_str}) VALUES %s"
+        else:
+            query = f"COPY {table_name} ({fields_str}) FROM STDIN"
+
+        event = QueryEvent('insert_many', query)
+        self.open_connection()
+
+        try:
+            event.acquire_time = event.lap()
+            with self.conn.cursor() as cursor:
+                if method == 'values':
+                    execute_values(cursor, query, counted(rows), page_size=page_size)
+                else:
+                    cursor.copy_expert(query, CopyRowsReader(counted(rows), len(fields)))
+            self._commit()
+            event.execute_time = event.lap()
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            self.close_connection()
+            event.row_count = inserted
+            self._emit_query_event(event)
+
+        self._invalidate_table(table_name)
+        return inserted
+
+    def _is_rows_iterable(self, value: Any) -> bool:
+        # a tuple is a row, unless it only holds tuples (a tuple of rows)
+        if isinstance(value, tuple):
+            return len(value) > 0 and all(isinstance(row, tuple) for row in value)
+        return True
+
+    def upsert_many(
+            self,
+            table_name: str,
+            rows: Any,
+            key: List[str],
+            fields: Optional[List[str]] = None,
+            update_fields: Optional[List[str]] = None,
+            skip_unchanged: bool = False
+        ) -> Dict[str, int]:
+        """
+        Inserts rows, or updates the existing rows with the same key, in one statement.
+
+        The rows are streamed with COPY into a temporary staging table, then applied with
+        a single `INSERT ... SELECT ... ON CONFLICT (key) DO UPDATE`. The key columns need
+        a unique index or constraint, and must not repeat within the rows.
+
+        Args:
+            table_name (str): The table, qualified with the `from_schema()` schema or 'public'.
+            rows: Iterable (consumed lazily) of dicts, or of tuples with one value per field.
+            key (List[str]): Columns identifying a row.
+            fields (Optional[List[str]]): Columns of the tuples. Taken from the first row for dicts.
+            update_fields (Optional[List[str]]): Columns updated on existing rows, every non-key field by default.
+            skip_unchanged (bool): Leaves existing rows whose values are already equal untouched
+                (no new row version is written); they are not counted as updated.
+
+        Returns:
+            Dict[str, int]: {'rows': rows sent, 'inserted': rows inserted, 'updated': rows updated}.
 
-        # Criar a consulta SQL completa
-        query = f"INSERT INTO {self.table_name} ({fields_str}) VALUES ({placeholders_str});"
+        Example:
+            db.upsert_many('locations', [{'id': 1, 'country': 'Brazil', 'population': 1000}], key=['id'])
+        """
+        def statement(target: str, stage: str, fields: List[str]) -> str:
+            updated = update_fields if update_fields is not None else [f for f in fields if f not in key]
+            fields_str = ', '.join(fields)
+
+            if updated:
+                assignments = ', '.join(f'{field} = EXCLUDED.{field}' for field in updated)
+                action = f'DO UPDATE SET {assignments}'
+                if skip_unchanged:
+                    current = ', '.join(f't.{field}' for field in updated)
+                    excluded = ', '.join(f'EXCLUDED.{field}' for field in updated)
+                    action += f' WHERE ROW({current}) IS DISTINCT FROM ROW({excluded})'
+            else:
+                action = 'DO NOTHING'
+
+            # xmax is 0 on a freshly inserted row version and set on an updated one
+            return (
+                f"WITH applied AS ("
+                f"INSERT INTO {target} AS t ({fields_str}) SELECT {fields_str} FROM {stage} "
+                f"ON CONFLICT ({', '.join(key)}) {action} RETURNING (xmax = 0) AS inserted"
+                f") SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM applied"
+            )
+
+        return self._apply_staged('upsert_many', table_name, rows, fields, statement)
+
+    def update_many(
+            self,
+            table_name: str,
+            rows: Any,
+            key: List[str],
+            fields: Optional[List[str]] = None,
+            skip_unchanged: bool = False
+        ) -> Dict[str, int]:
+        """
+        Updates the rows with the same key, in one statement. Rows without a match are ignored.
+
+        The rows are streamed with COPY into a temporary staging table, then applied with
+        a single `UPDATE ... FROM` joining it on the key columns.
+
+        Args:
+            table_name (str): The table, qualified with the `from_schema()` schema or 'public'.
+            rows: Iterable (consumed lazily) of dicts, or of tuples with one value per field.
+            key (List[str]): Columns identifying a row; the other fields are updated.
+            fields (Optional[List[str]]): Columns of the tuples. Taken from the first row for dicts.
+            skip_unchanged (bool): Leaves rows whose values are already equal untouched;
+                they are not counted as updated.
+
+        Returns:
+            Dict[str, int]: {'rows': rows sent, 'inserted': 0, 'updated': rows updated}.
+
+        Example:
+            db.update_many('locations', [(1, 2000), (2, 3500)], key=['id'], fields=['id', 'population'])
+        """
+        def statement(target: str, stage: str, fields: List[str]) -> str:
+            updated = [field for field in fields if field not in key]
+            if not updated:
+                raise ValueError("update_many() needs at least one field besides the key")
+
+            assignments = ', '.join(f'{field} = s.{field}' for field in updated)
+            conditions = [f't.{field} = s.{field}' for field in key]
+            if skip_unchanged:
+                current = ', '.join(f't.{field}' for field in updated)
+                staged = ', '.join(f's.{field}' for field in updated)
+                conditions.append(f'ROW({current}) IS DISTINCT FROM ROW({staged})')
+
+            return (
+                f"WITH applied AS ("
+                f"UPDATE {target} AS t SET {assignments} FROM {stage} AS s "
+                f"WHERE {' AND '.join(conditions)} RETURNING 1"
+                f") SELECT 0, count(*) FROM applied"
+            )
+
+        return self._apply_staged('update_many', table_name, rows, fields, statement)
+
+    def _apply_staged(
+            self,
+            operation: str,
+            table_name: str,
+            rows: Any,
+            fields: Optional[List[str]],
+            statement: Callable[[str, str, List[str]], str]
+        ) -> Dict[str, int]:
+        """
+        Copies the rows into a temporary table with the column types of the target table,
+        then runs the statement built by `statement(target, stage, fields)`, which returns
+        one (inserted, updated) row.
+        """
+        target = self._resolve_table_name(table_name)
+        self._reset_query_parameters()
+
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            return {'rows': 0, 'inserted': 0, 'updated': 0}
+
+        if isinstance(first, dict):
+            fields = list(fields or first)
+            rows = (tuple(row[field] for field in fields) for row in itertools.chain([first], rows))
+        elif fields is None:
+            raise ValueError(f"{operation}() needs `fields` when the rows are not dicts")
+        else:
+            rows = itertools.chain([first], rows)
 
-        # Imprimir cada consulta com os valores reais para demonstração
-        print("Generated SQL Query:")
-        for value in values:
-            # Substituir placeholders por valores reais apenas para mostrar como ficaria a consulta
-            filled_query = query.replace("%s", "{}").format(*value)
-            print(filled_query)
+        fields_str = ', '.join(fields)
+        # temporary tables are per session and this one is dropped before the call returns
+        # (or rolled back with its transaction), so the name is fixed and the statement
+        # text stays the same between calls
+        stage = 'choco_stage'
+        apply_query = statement(target, stage, fields)
+
+        event = QueryEvent(operation, apply_query)
+        self.open_connection()
 
+        try:
+            event.acquire_time = event.lap()
+            reader = CopyRowsReader(rows, len(fields))
+            with self.conn.cursor() as cursor:
+                cursor.execute(
+                    f'CREATE TEMPORARY TABLE {stage} ON COMMIT DROP AS '
+                    f'SELECT {fields_str} FROM {target} WITH NO DATA'
+                )
+                cursor.copy_expert(f'COPY {stage} ({fields_str}) FROM STDIN', reader)
+                # the planner has no statistics for a new table, a large stage would get a poor join plan
+                cursor.execute(f'ANALYZE {stage}')
+                cursor.execute(apply_query)
+                inserted, updated = cursor.fetchone()
+                cursor.execute(f'DROP TABLE {stage}')
+            self._commit()
+            event.execute_time = event.lap()
+            event.row_count = inserted + updated
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            self.close_connection()
+            self._emit_query_event(event)
+
+        self._invalidate_table(target)
+        return {'rows': reader.rows_read, 'inserted': inserted, 'updated': updated}
 
     # INFO FUNCTIONS
-    def get_schemas(self) -> 'Postgres':
+    @property
+    def metadata_cache(self) -> LRUCache:
+        """
+        Cache of introspection results shared by every instance with the same DSN.
+        Entries expire after `metadata_ttl` seconds (None keeps them until invalidated).
+        """
+        cache = self._metadata_caches.get(self.dsn)
+        if cache is None:
+            cache = self._metadata_caches.setdefault(self.dsn, LRUCache(max_size=4096))
+        return cache
+
+    def invalidate_metadata(self, schema: Optional[str] = None, table_name: Optional[str] = None) -> 'Postgres':
+        """
+        Drops cached introspection results: everything, one schema, or one table. A table
+        given without schema ('locations') is dropped from every schema, 'public.locations'
+        only from its own.
+        """
+        cache = self.metadata_cache
+        if schema is None and table_name is None:
+            cache.clear()
+            return self
+
+        if schema is None and '.' in table_name:
+            schema, table_name = table_name.split('.', 1)
+
+        for key in cache.keys():
+            if key[0] == 'schemas':
+                if table_name is None:
+                    cache.pop(key)
+            elif (schema is None or key[1] == schema) and (table_name is None or len(key) == 2 or key[2] == table_name):
+                cache.pop(key)
+        return self
+
+    def warm_metadata(self, schema: str = 'public') -> 'Postgres':
+        """
+        Loads the tables and the columns of every table of a schema into the metadata
+        cache with a single query.
+        """
+        query = sql.SQL("""
+            SELECT c.table_name, c.column_name, c.udt_name, c.character_maximum_length, c.numeric_precision,
+                c.numeric_scale, c.datetime_precision, c.interval_type
+            FROM information_schema.columns c
+            JOIN information_schema.tables t
+                ON t.table_schema = c.table_schema AND t.table_name = c.table_name
+            WHERE c.table_schema = %s
+            ORDER BY c.table_name, c.ordinal_position;
+        """)
+
+        self.open_connection()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(query, (schema,))
+                rows = cursor.fetchall()
+        finally:
+            self.close_connection()
+
+        tables = {}
+        for table_name, column, *type_info in rows:
+            tables.setdefault(table_name, {})[column] = self._format_column_type(*type_info)
+
+        cache = self.metadata_cache
+        cache.put(('tables', schema), sorted(tables), self.metadata_ttl)
+        for table_name, column_info in tables.items():
+            cache.put(('columns', schema, table_name), column_info, self.metadata_ttl)
+        return self
+
+    def introspect(self, schemas: Union[str, List[str]] = 'public') -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Describes every table, view and materialized view of one or more schemas with three
+        pg_catalog queries over a single connection, instead of one query per table.
+
+        Args:
+            schemas (Union[str, List[str]]): Schema name or list of schema names.
+
+        Returns:
+            Dict: schema -> table -> {
+                'kind': 'table' | 'partitioned table' | 'view' | 'materialized view' | 'foreign table',
+                'estimated_rows': planner estimate (None if the table was never analyzed),
+                'columns': {column: {'type': 'character varying(30)', 'nullable': bool, 'default': str or None}},
+                'primary_key': [column, ...],
+                'indexes': {index: {'columns': [...], 'unique': bool, 'primary': bool, 'definition': str}},
+            }
+
+        Results are cached like the other introspection methods (see `invalidate_metadata`)
+        and shared between callers, so they should be treated as read-only.
+        """
+        if isinstance(schemas, str):
+            schemas = [schemas]
+
+        result = {}
+        missing = []
+        for schema in schemas:
+            cached = self.metadata_cache.get(('introspect', schema))
+            if cached is None:
+                missing.append(schema)
+            else:
+                result[schema] = cached
+
+        if missing:
+            for schema, tables in self._introspect_schemas(missing).items():
+                self.metadata_cache.put(('introspect', schema), tables, self.metadata_ttl)
+                result[schema] = tables
+
+        return {schema: result[schema] for schema in schemas}
+
+    def _introspect_schemas(self, schemas: List[str]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        relations_query = sql.SQL("""
+            SELECT c.oid, n.nspname, c.relname, c.relkind, c.reltuples::bigint
+            FROM pg_catalog.pg_class c
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = ANY(%s) AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+            ORDER BY n.nspname, c.relname;
+        """)
+        columns_query = sql.SQL("""
+            SELECT a.attrelid, a.attname, pg_catalog.format_type(a.atttypid, a.atttypmod),
+                NOT a.attnotnull, pg_catalog.pg_get_expr(d.adbin, d.adrelid)
+            FROM pg_catalog.pg_attribute a
+            JOIN pg_catalog.pg_class c ON c.oid = a.attrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            LEFT JOIN pg_catalog.pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+            WHERE n.nspname = ANY(%s) AND c.relkind IN ('r', 'p', 'v', 'm', 'f')
+                AND a.attnum > 0 AND NOT a.attisdropped
+            ORDER BY a.attrelid, a.attnum;
+        """)
+        indexes_query = sql.SQL("""
+            SELECT i.indrelid, ic.relname, i.indisunique, i.indisprimary,
+                pg_catalog.pg_get_indexdef(i.indexrelid),
+                ARRAY(
+                    SELECT a.attname
+                    FROM unnest(i.indkey) WITH ORDINALITY AS k(attnum, position)
+                    JOIN pg_catalog.pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+                    ORDER BY k.position
+                )
+            FROM pg_catalog.pg_index i
+            JOIN pg_catalog.pg_class ic ON ic.oid = i.indexrelid
+            JOIN pg_catalog.pg_class c ON c.oid = i.indrelid
+            JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = ANY(%s)
+            ORDER BY i.indrelid, ic.relname;
+        """)
+        kinds = {
+            'r': 'table',
+            'p': 'partitioned table',
+            'v': 'view',
+            'm': 'materialized view',
+            'f': 'foreign table',
+        }
+
+        self.open_connection()
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(relations_query, (schemas,))
+                relations = cursor.fetchall()
+                cursor.execute(columns_query, (schemas,))
+                columns = cursor.fetchall()
+                cursor.execute(indexes_query, (schemas,))
+                indexes = cursor.fetchall()
+        finally:
+            self.close_connection()
+
+        result = {schema: {} for schema in schemas}
+        tables_by_oid = {}
+
+        for oid, schema, table_name, kind, estimated_rows in relations:
+            table = {
+                'kind': kinds[kind],
+                # reltuples is -1 (or 0 before PostgreSQL 14) until the table is analyzed
+                'estimated_rows': estimated_rows if estimated_rows >= 0 else None,
+                'columns': {},
+                'primary_key': [],
+                'indexes': {},
+            }
+            result[schema][table_name] = table
+            tables_by_oid[oid] = table
+
+        for oid, column, data_type, nullable, default in columns:
+            tables_by_oid[oid]['columns'][column] = {
+                'type': data_type,
+                'nullable': nullable,
+                'default': default,
+            }
+
+        for oid, index_name, unique, primary, definition, index_columns in indexes:
+            table = tables_by_oid.get(oid)
+            if table is None:
+                continue
+            table['indexes'][index_name] = {
+                'columns': index_columns,
+                'unique': unique,
+                'primary': primary,
+                'definition': definition,
+            }
+            if primary:
+                table['primary_key'] = index_columns
+
+        return result
+
+    def get_schemas(self) -> List[str]:
+        cached = self.metadata_cache.get(('schemas',))
+        if cached is not None:
+            return list(cached)
+
         self.open_connection()
         query = sql.SQL("""
             SELECT schema_name 
@@ -142,11 +690,16 @@ class Postgres(QuerySql):
             ORDER BY schema_name;
         """)
         
-        with self.conn.cursor() as cursor:
-            cursor.execute(query)
-            schemas = cursor.fetchall()
-        self.close_connection()
-        return [schema[0] for schema in schemas]
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(query)
+                schemas = cursor.fetchall()
+        finally:
+            self.close_connection()
+
+        schemas = [schema[0] for schema in schemas]
+        self.metadata_cache.put(('schemas',), schemas, self.metadata_ttl)
+        return list(schemas)
 
 
     def get_tables(self, schema: Optional[str] = None) -> List[str]:
@@ -154,11 +707,16 @@ class Postgres(QuerySql):
         Recupera uma lista de nomes de tabelas do esquema especificado.
 
         :param schema: O esquema do qual recuperar os nomes das tabelas. Se nenhum esquema for especificado,
-                    será usado o esquema atualmente definido para a instância da classe.
+                    será usado o esquema definido com from_schema(), ou 'public'.
         :return: Uma lista de strings, onde cada string é o nome de uma tabela no esquema especificado.
         """
+        schema = schema if schema else (self.from_schema_name or 'public')
+
+        cached = self.metadata_cache.get(('tables', schema))
+        if cached is not None:
+            return list(cached)
+
         self.open_connection()
-        schema = schema if schema else self.schema_name
         query = sql.SQL("""
             SELECT table_name 
             FROM information_schema.tables 
@@ -166,462 +724,577 @@ class Postgres(QuerySql):
             ORDER BY table_name;
         """)
         
-        with self.conn.cursor() as cursor:
-            cursor.execute(query, (schema,))
-            tables = cursor.fetchall()
-        
-        self.close_connection()
-
-        return [table[0] for table in tables]
-
-
-    def get_info_table(self, table_name: str) -> Dict[str, str]:
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(query, (schema,))
+                tables = cursor.fetchall()
+        finally:
+            self.close_connection()
+
+        tables = [table[0] for table in tables]
+        self.metadata_cache.put(('tables', schema), tables, self.metadata_ttl)
+        return list(tables)
+
+    def _format_column_type(self, udt_name, char_len, num_prec, num_scale, datetime_prec, interval_type) -> str:
+        data_type = udt_name
+        if char_len:
+            data_type += f'({char_len})'
+        elif num_prec and num_scale is not None:
+            data_type += f'({num_prec},{num_scale})'
+        elif datetime_prec:
+            data_type += f'({datetime_prec})'
+        elif interval_type:
+            data_type += f' {interval_type}'
+        return data_type
+
+    def get_info_table(self, table_name: str, schema: Optional[str] = None) -> Dict[str, str]:
         """
         Retorna um dicionário com os nomes das colunas e seus tipos detalhados para uma tabela especificada.
         
-        :param table_name: O nome da tabela para a qual recuperar os metadados.
+        :param table_name: O nome da tabela para a qual recuperar os metadados, opcionalmente no formato 'schema.tabela'.
+        :param schema: O esquema da tabela. Se não for especificado, é usado o esquema de from_schema(), ou 'public'.
         :return: Um dicionário onde cada chave é o nome de uma coluna e o valor é o tipo de dado detalhado da coluna.
         """
+        if schema is None:
+            schema, table_name = self._resolve_table_name(table_name).split('.', 1)
+
+        cached = self.metadata_cache.get(('columns', schema, table_name))
+        if cached is not None:
+            return dict(cached)
+
         self.open_connection()
         
         query = sql.SQL("""
             SELECT column_name, udt_name, character_maximum_length, numeric_precision, numeric_scale, datetime_precision, interval_type 
             FROM information_schema.columns 
-            WHERE table_name = %s
+            WHERE table_schema = %s AND table_name = %s
+            ORDER BY ordinal_position
         """)
         
         column_info = {}
-        with self.conn.cursor() as cursor:
-            cursor.execute(query, (table_name,))
-            for column, udt_name, char_len, num_prec, num_scale, datetime_prec, interval_type in cursor.fetchall():
-                data_type = udt_name
-                if char_len:
-                    data_type += f'({char_len})'
-                elif num_prec and num_scale is not None:
-                    data_type += f'({num_prec},{num_scale})'
-                elif datetime_prec:
-                    data_type += f'({datetime_prec})'
-                elif interval_type:
-                    data_type += f' {interval_type}'
-
-                column_info[column] = data_type
-        
-        self.close_connection()
-        return column_info
-    
-    # def select(self, fields: List[str], *lambda_functions: Optional[Callable[[], None]]) -> 'Postgres':      
-    #     if not self._current_attribute_name:
-    #         self._current_attribute_name = 'selected_fields'
-
-    #     current_query = getattr(self, self._current_attribute_name)
-    #     current_query.extend(fields)
-
-    #     # if callable(lambda_function):
-    #     #         lambda_function()
-    #     # print(len(*lambda_functions))
-    #     # self.subquery(*lambda_functions)
-    #     # current_query.extend('(')
-    #     for lambda_function in lambda_functions:
-    #         if callable(lambda_function):
-    #             lambda_function()
-    #     # current_query.extend(')')
-        
-    #     self._is_start_subquery = False
-    #     self._is_end_subquery = False
-    #     # name = self._current_attribute_name
-    #     # print(self._current_attribute_name)
-    #     # print(hasattr(self, 'selected_fields')) # verifica se existe
-    #     # setattr(self, 'selected_fields', ['idade'])
-    #     # print(getattr(self, 'selected_fields')) # faz referencia ao atributo
-    #     # hasattr(p, 'nome');
-    #     # getattr(p, 'nome');
-    #     # setattr(p, 'idade', 31)
-        
-        
-    #     self._current_attribute_name = None
-    #     return self
-
-    # def where(self, field: str, operator: str, value: Any, combinator: str = 'AND'):
-    #     if not self._current_attribute_name:
-    #         self._current_attribute_name = 'where_conditions'
-        
-    #     current_query = getattr(self, self._current_attribute_name)
-
-    #     print(self._is_end_subquery)
-
-    #     if self._is_start_subquery:
-    #         if len(current_query) > 0 and self._subquery_prefix:
-    #             current_query.append(self._subquery_prefix)    
-    #         current_query.extend('(')
-
-    #     if len(current_query) == 0 or self._is_start_subquery:
-    #         current_query.extend([field, operator, value])
-    #     else:
-    #         current_query.extend([combinator, field, operator, value])
-
-    #     if self._is_end_subquery:
-    #         current_query.extend(')')
-
-    #     self._current_attribute_name = None
-    #     return self
-
-    # def where(self, field: str, operator: str, value: Any, combinator: str = 'AND'):
-    #     print(" ")
-    #     print(f"where: {field}, {operator}, {value}")
-    #     print(f"start subquery: {self._is_start_subquery}")
-    #     print(f"end subquery: {self._is_end_subquery}")
-    #     print(" ")
-
-    #     if self._is_start_subquery:
-    #         if len(self.where_conditions) > 0 and self._subquery_prefix:
-    #             self.where_conditions.append(self._subquery_prefix)    
-            
-    #         self.where_conditions.extend('(')
-
-    #     if len(self.where_conditions) == 0 or self._is_start_subquery:
-    #         self.where_conditions.extend([field, operator, value])
-    #     else:
-    #         self.where_conditions.extend([combinator, field, operator, value])
-
-    #     if self._is_end_subquery:
-    #         self.where_conditions.extend(')')
-
-    #     return self
-    
-    # def subquery(self, *lambda_functions: Callable[[], None], combinator: Optional[str] = None):
-    #     print('subquery')
-
-    #     for index, lambda_function in enumerate(lambda_functions):
-    #         print(index)
-    #         if index == 0:
-    #             self._is_start_subquery = True
-    #             self._subquery_prefix = combinator
-    #         else:
-    #             self._is_start_subquery = False
-    #             self._subquery_prefix = None
-
-    #         if (len(lambda_functions) == 1 or index == (len(lambda_functions) - 1)):
-    #             self._is_end_subquery = True
-    #         else:
-    #             self._is_end_subquery = False
-
-    #         self.index = index
-    #         if callable(lambda_function):
-    #             lambda_function()
-
-    #     return self
-
-    def call_subquery(func):
-        def wrapper(self, *args, **kwargs):
-            print('antes')
-            result = func(self, *args, **kwargs)
-            print('depois')
-
-            return result
-        return wrapper
-
-    def before_and_after(func):
-        def wrapper(self, *args, **kwargs):
-            
-            # print("Antes da execução de", func.__name__) # nome da função
-            result = func(self, *args, **kwargs)  # Executa a função original com seus argumentos
-            # self.where_conditions.extend(')')
-            # print("Depois da execução de", func.__name__)
-            return result
-        return wrapper
-    
-
-    def to_postgres_select_field(self, fields):
-        new_fileds = []
-        for index, field in enumerate(fields):
-            if index == (len(fields) - 1):
-                new_fileds.append(field)
-            else:
-                new_fileds.extend([field, ','])
-        return new_fileds
-    
-    def to_postgres_field(self, field):  
-        return f'{field}'
-    
-    def to_postgres_value(self, value):
-        if isinstance(value, str):
-            return f"'{value}'"
-        else:
-            return value
-        
-    def to_postgres_values(self, values: List):
-        new_values = []
+        try:
+            with self.conn.cursor() as cursor:
+                cursor.execute(query, (schema, table_name))
+                for column, *type_info in cursor.fetchall():
+                    column_info[column] = self._format_column_type(*type_info)
+        finally:
+            self.close_connection()
 
-        for value in values:
-            new_values.append(self.to_postgres_value(value))
+        self.metadata_cache.put(('columns', schema, table_name), column_info, self.metadata_ttl)
+        return dict(column_info)
 
-        string = '('
-        string += ", ".join(map(str, new_values))
-        string += ')'
-
-        return string        
+    def get(self) -> 'Postgres':
+        event = QueryEvent('get')
+        return_query, show_query = self._return_query, self._show_query
+        query = self.build()
+        event.compile_time = event.lap()
 
-    # @before_and_after
-    def where(self, field: str, operator: str, value: Any, combinator: str = 'AND'):       
-        field = self.to_postgres_field(field)
+        # self.query = " ".join(map(str, query_parts))
+        # self.query += ';'
 
-        if isinstance(value, list):
-            value = self.to_postgres_values(value)
-        else:
-            value = self.to_postgres_value(value)
+        if return_query:
+            return self._query_text(query, return_query)
         
-        if self._is_in_subquery:
-            if self._is_start_subquery:
-                self.subquery_args.extend([field, operator, value])  
-            else:
-                if "WHERE" in self.subquery_args:
-                    self.subquery_args.extend([combinator, field, operator, value])
-                else:
-                    self.subquery_args.extend(['WHERE', field, operator, value])
+        if show_query == True:
+            print(self.inline_params(query.sql, query.params) + ';')
 
-        else:
-            if len(self.where_conditions) == 0:
-                self.where_conditions.extend(['WHERE', field, operator, value])  
-            else:
-                self.where_conditions.extend([combinator, field, operator, value])
-        return self
-    
-    def where_or(self, field: str, operator: str, value: Any):
-        self.where(field, operator, value, 'OR')
-        return self
-    
-    def where_in(self, field: str, values: List, combinator: str = 'AND'):
-        if len(values) > 0:
-            self.where(field, 'IN', values, combinator)
+        return self._run(query, event)
 
-        return self
-    
-    def select(self, fields: List[str] = '*') -> 'Postgres':
-        selected_fields = []
+    def run(self, query: Query) -> Any:
+        """
+        Runs a query object built with `build()` on a pooled connection and returns the rows
+        in its result shape. Safe to call from several threads at once.
+        """
+        return self._run(query, QueryEvent('get'))
 
-        if len(fields) == 0 or (len(fields) == 1 and fields[0] == '*'):
-            selected_fields = ['*']
+    def _run(self, query: Query, event: QueryEvent) -> Any:
+        results = self._run_cached(query, event)
 
-        if len(fields) == 1:
-            selected_fields = fields
-        else:
-            for index, field in enumerate(fields):
-                if index == (len(fields) - 1):
-                    selected_fields.append(field)
-                else:
-                    selected_fields.extend([field, ','])
+        for prefetch in query.prefetch:
+            children_query = prefetch.query(results, self, query.cache_ttl)
+            children = self._run_cached(children_query, QueryEvent('prefetch')) if children_query else []
+            prefetch.attach(results, children)
+        return results
 
-        if self._is_in_subquery:
-            self.subquery_args.append('SELECT')
-            self.subquery_args.extend(selected_fields)
-        else:
-            self.selected_fields.append('SELECT')
-            self.selected_fields.extend(selected_fields)
-        return self
-    
-    def from_table(self, table_name: str) -> 'Postgres':
-        if not self.from_schema_name:
-            self.from_schema_name = 'public'
+    def _run_cached(self, query: Query, event: QueryEvent) -> Any:
+        event.query, event.params = query.sql, query.params
+        # a transaction can read its own uncommitted writes, which must not be cached
+        use_cache = query.cache_ttl is not None and not self._transaction_depth
 
-        if '.' in table_name:
-            full_table_name = table_name
-        else:
-            full_table_name = f'{self.from_schema_name}.{table_name}'
+        if use_cache:
+            cache_key = self._result_cache_key(query)
+            results = self._cached_results(cache_key, event)
+            if results is not None:
+                return results
 
-        if self._is_in_subquery:
-            self.subquery_args.extend(['FROM', full_table_name])
-        else:
-            self.from_table_name.extend(['FROM', full_table_name])
-        return self
-    
-    def where_subquery(self, field: str, operator: Optional[str], *lambda_functions: Callable[[], None], combinator: Optional[str] = 'AND'):
-        self._current_attribute = self.where_conditions
-    
-        if len(self.where_conditions) == 0:
-            self.where_conditions.extend(['WHERE', field, operator])
-        else:
-            self.where_conditions.extend([combinator, field, operator])       
+        results = self._run_query(event, query.shape)
 
-        self.subquery(*lambda_functions);
-        return self
-    
-
-    
-    # @call_subquery
-    def subquery(self, *lambda_functions, combinator: Optional[str] = None):
-        if combinator and (combinator in self._attributes_by_function):
-            self._current_attribute = getattr(self, self._attributes_by_function[combinator])
-        # print(combinator)
-        # else:
-        #     self._current_attribute = getattr(self, self._attributes_by_function['SUBQUERY'])
-
-        has_previous_argument = True if self.subquery_args and self.subquery_args[-1] != '(' else False
-        has_arguments = True if len(lambda_functions) > 0 else False
-        is_first_argument = True if self.subquery_depth == 0 else False
-        
-        if combinator and has_arguments and (is_first_argument or has_previous_argument):
-            self.subquery_args.append(combinator)
-
-        self.subquery_depth += 1
+        if self.slow_query_threshold is not None and event.total_time >= self.slow_query_threshold:
+            self._log_slow_query(event)
 
-        if has_arguments:
-            self.subquery_args.extend('(')
-        
-            for index, lambda_function in enumerate(lambda_functions):
-                if index == 0:
-                    self._is_start_subquery = True
-                else:
-                    self._is_start_subquery = False
-
-                self._is_in_subquery = True
+        if use_cache:
+            self.result_cache.put(cache_key, results, query.tables, query.cache_ttl)
+            return self._copy_results(results)
+        return results
 
-                if callable(lambda_function):
-                    lambda_function()
-                else:
-                    self.subquery_args.append(lambda_function)
+    def batch(self) -> QueryBatch:
+        """
+        Returns a QueryBatch: queries added to it run together in one statement (one round
+        trip) when the `with` block ends, each result going to the Future returned by `add()`.
+        Rows come back as row literals decoded with the psycopg2 typecasters of their
+        columns, so they match what `get()` returns (see QueryBatch).
+
+        Example:
+            with db.batch() as batch:
+                brazil = batch.add(db.from_table('locations').where('country', '=', 'Brazil'))
+                chile = batch.add(db.from_table('locations').where('country', '=', 'Chile'))
+            brazil.result()
+        """
+        return QueryBatch(self)
+
+    @staticmethod
+    def gather(
+            queries: List[Query],
+            max_workers: Optional[int] = None,
+            return_exceptions: bool = True
+        ) -> List[Any]:
+        """
+        Runs independent queries at the same time over a thread pool, each on its own pooled
+        connection, so the total latency is about the slowest query instead of the sum.
 
-            self.subquery_args.extend(')')
+        Args:
+            queries (List[Query]): Query objects created with `build()`, possibly from
+                different Postgres instances.
+            max_workers (Optional[int]): Queries running at once, all of them by default (up
+                to 32). More than the pool max_size makes the extra queries wait for a connection.
+            return_exceptions (bool): Puts the exception of a failed query in its place in the
+                results; if False, the first error is raised once every query is done.
 
-        self.subquery_depth -= 1
-        self._is_in_subquery = False
+        Returns:
+            List[Any]: The results in the order of the queries.
 
-        # if self._current_attribute and self.subquery_depth == 0:
-        # self.where_conditions.extend(self.subquery_args)
-        # print(self.where_conditions)
-        # print(self._current_attribute)
-        # print(self.subquery_args)
+        Example:
+            sales, stock = Postgres.gather([
+                db.select(['sum(total) AS total']).from_table('sales').build(),
+                db.select(['count(*) AS items']).from_table('stock').build(),
+            ], max_workers=8)
+        """
+        if not queries:
+            return []
+        if not all(isinstance(query.db, Postgres) for query in queries):
+            raise TypeError(
+                "Postgres.gather() runs queries in threads, await AsyncPostgres queries with "
+                "asyncio.gather(*(query.run() for query in queries))"
+            )
 
-        if self.subquery_depth == 0:
-            self._current_attribute.extend(self.subquery_args)
-            self.subquery_args = []
+        max_workers = max_workers or min(32, len(queries))
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='choco_gather') as executor:
+            futures = [executor.submit(query.run) for query in queries]
 
-        return self
-    
-    def __builder_query_select(self):
-        query_select = ", ".join(map(str, self.selected_fields))
-        return query_select
+        results = []
+        for future in futures:
+            error = future.exception()
+            if error is not None and not return_exceptions:
+                raise error
+            results.append(error if error is not None else future.result())
+        return results
 
+    def explain(self, analyze: bool = False, buffers: bool = False) -> QueryPlan:
+        """
+        Returns the plan of the built query, from `EXPLAIN (FORMAT JSON)`, instead of running it.
 
-    def get(self) -> 'Postgres':
-        query_parts = []
+        Args:
+            analyze (bool): Runs the query (EXPLAIN ANALYZE) to get the actual rows and
+                timings of every node. The query runs in a transaction (or, inside transaction(),
+                a savepoint) that is rolled back.
+            buffers (bool): Adds the shared/local/temp buffer usage of every node.
+
+        Example:
+            plan = db.from_table('locations').where('country', '=', 'Brazil').explain(analyze=True)
+            print(plan.total_cost, plan.estimated_rows, plan.actual_rows, plan.seq_scans())
+        """
+        query, params = self._take_query()
+        return self._explain(query, params, analyze, buffers)
 
-        # print(self.__builder_query_select())
-        # if self.with_query:
-        #     query_parts.append("WITH " + ", ".join(self.with_query))
+    def _explain(
+            self,
+            query: str,
+            params: Optional[Tuple[Any, ...]] = None,
+            analyze: bool = False,
+            buffers: bool = False
+        ) -> QueryPlan:
+        # VERBOSE gives the schema of every scanned table
+        options = ['FORMAT JSON', 'VERBOSE']
+        if analyze:
+            options.append('ANALYZE')
+        if buffers:
+            options.append('BUFFERS')
+
+        # inside transaction() the changes of an analyzed write are rolled back to a savepoint
+        rollback = analyze and self._transaction_depth > 0
 
-        if self.selected_fields:
-            query_parts.extend(self.selected_fields)
+        self.open_connection()
+        try:
+            with self.conn.cursor() as cursor:
+                if rollback:
+                    cursor.execute('SAVEPOINT choco_explain')
+                cursor.execute(f"EXPLAIN ({', '.join(options)}) {query}", params)
+                plan = QueryPlan(cursor.fetchone()[0], query)
+                if rollback:
+                    cursor.execute('ROLLBACK TO SAVEPOINT choco_explain')
+                    cursor.execute('RELEASE SAVEPOINT choco_explain')
+
+                relations = plan.seq_scan_relations()
+                if relations and not analyze:
+                    # without actual figures, sequential scans are measured by the size of their table
+                    cursor.execute(
+                        "SELECT n.nspname || '.' || c.relname, c.reltuples FROM pg_catalog.pg_class c "
+                        "JOIN pg_catalog.pg_namespace n ON n.oid = c.relnamespace "
+                        "WHERE n.nspname || '.' || c.relname = ANY(%s)",
+                        (relations,)
+                    )
+                    plan.table_rows = dict(cursor.fetchall())
+        finally:
+            self.close_connection()
+
+        return plan
+
+    def _log_slow_query(self, event: QueryEvent):
+        try:
+            plan = self._explain(event.query, event.params, analyze=self.slow_query_analyze)
+        except Exception:
+            logger.exception("Could not capture the plan of a slow query: %s", event.fingerprint)
+            return
+
+        logger.warning(
+            "Slow query (%.3f s, %d rows): %s\n%s",
+            event.total_time, event.row_count, event.fingerprint, plan
+        )
+
+    def _execute(self, cursor, query: str, params: Optional[Tuple[Any, ...]] = None):
+        """
+        Runs a query on the cursor, through a prepared statement when that mode is on.
+        """
+        if not self._use_prepared_statements or cursor.name is not None:
+            cursor.execute(query, params)
+            return
+
+        statement = self._to_prepared_statement(query.rstrip().rstrip(';'))
+        statements = self.pool.statement_cache(cursor.connection, self._max_prepared_statements)
+        statement_name = statements.get(statement)
+
+        if statement_name is None:
+            statement_name = f'choco_{next(self._statement_names)}'
+            cursor.execute(f'PREPARE {statement_name} AS {statement}')
+            statements.put(statement, statement_name)
+
+        if params:
+            placeholders = ', '.join(['%s'] * len(params))
+            cursor.execute(f'EXECUTE {statement_name} ({placeholders})', params)
         else:
-            query_parts.append("SELECT *")
-
-        if self.from_table_name:
-
-            query_parts.extend(self.from_table_name)
+            cursor.execute(f'EXECUTE {statement_name}')
 
-        # if self.joins_conditions:
-        #     query_parts.extend(self.joins_conditions)
+    def _to_prepared_statement(self, query: str) -> str:
+        """
+        Converts the driver placeholders (`%s`) to the numbered ones PREPARE expects (`$1`).
+        """
+        numbers = itertools.count(1)
+        return re.sub(r'%([s%])', lambda match: f'${next(numbers)}' if match.group(1) == 's' else '%', query)
 
-        if self.where_conditions:
-            query_parts.extend(self.where_conditions)
 
-        # if self.group_by_conditions:
-        #     query_parts.append("GROUP BY " + ", ".join(self.group_by_conditions))
+    def export(
+            self,
+            path_or_fileobj: Any,
+            format: str = 'csv',
+            header: bool = True,
+            chunk_size: int = 65536
+        ) -> Dict[str, int]:
+        """
+        Writes the result of the built query to a file with `COPY (...) TO STDOUT`.
 
-        # if self.having_conditions:
-        #     query_parts.append("HAVING " + " AND ".join(self.having_conditions))
+        The data goes from the server straight into the file in `chunk_size` writes,
+        without creating Python objects per row.
 
-        # if self.order_by_conditions:
-        #     query_parts.append("ORDER BY " + ", ".join(self.order_by_conditions))
+        Args:
+            path_or_fileobj: A file path, or an open file object (binary, or text for csv).
+            format (str): 'csv' or 'binary' (the PostgreSQL binary COPY format).
+            header (bool): Writes the column names as the first csv line.
+            chunk_size (int): Bytes per write to the file.
 
-        # if self.limit_value is not None:
-        #     query_parts.append("LIMIT " + str(self.limit_value))
+        Returns:
+            Dict[str, int]: {'rows': rows exported, 'bytes': bytes written}.
 
-        # if self.offset_value is not None:
-        #     query_parts.append("OFFSET " + str(self.offset_value))
-        query = " ".join(map(str, query_parts))
-        query += ';'
+        Example:
+            db.select(['country', 'population']).from_table('locations').export('locations.csv')
+        """
+        if format not in ('csv', 'binary'):
+            raise ValueError(f"Unsupported export format: {format}")
 
-        # self.query = " ".join(map(str, query_parts))
-        # self.query += ';'
+        event = QueryEvent('export')
+        query, params = self._take_query()
+        event.compile_time = event.lap()
 
-        if self._return_query == True:
-            self.__reset_query_parameters()
-            return query
-        
-        if self._show_query == True:
-            print(query)
+        options = 'FORMAT csv, HEADER true' if format == 'csv' and header else f'FORMAT {format}'
 
-        if self._rows_only:
-            return self.results_only_rows(query)
-        elif self._rows_with_headers:
-            return self.results_with_headers(query)
+        if isinstance(path_or_fileobj, (str, bytes)) or hasattr(path_or_fileobj, '__fspath__'):
+            file = open(path_or_fileobj, 'wb')
+            close_file = True
         else:
-            return self.results_with_dictionary(query)
-
+            file = path_or_fileobj
+            close_file = False
 
-    # RESULT METHODOS
-    def results_only_rows(self, query):
+        event.lap()
         self.open_connection()
 
-        with self.conn.cursor() as cursor:
-            cursor.execute(query)
-            results = cursor.fetchall()
+        try:
+            event.acquire_time = event.lap()
+            encoding = None
+            if isinstance(file, io.TextIOBase):
+                if format == 'binary':
+                    raise ValueError("The binary format needs a file opened in binary mode")
+                encoding = encodings.get(self.conn.encoding, self.conn.encoding)
+
+            writer = CopyChunkWriter(file, chunk_size, encoding)
+
+            with self.conn.cursor() as cursor:
+                # COPY does not take bound parameters, the values are inlined by the driver
+                copy_query = cursor.mogrify(f'COPY ({query}) TO STDOUT WITH ({options})', params)
+                event.query, event.params = f'COPY ({query}) TO STDOUT WITH ({options})', params
+                cursor.copy_expert(copy_query, writer, size=chunk_size)
+                rows = cursor.rowcount
+            writer.flush()
+            event.execute_time = event.lap()
+            event.row_count = rows
+            event.result_size = writer.bytes_written
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            self.close_connection()
+            if close_file:
+                file.close()
+            self._emit_query_event(event)
+
+        return {'rows': rows, 'bytes': writer.bytes_written}
+
+    def chunk_by(self, key_column: str, size: int = 1000) -> Iterator[List[Any]]:
+        """
+        Pages through the built query with keyset pagination and yields one list of rows
+        (in the configured result shape) per page.
+
+        Each page runs `... WHERE <filters> AND key > <last key> ORDER BY key LIMIT size`, so
+        it costs the same at any depth, unlike OFFSET pagination which reads and discards
+        every previous row. The key column must be unique, not null and selected by the
+        query; an index on it keeps every page cheap. ORDER BY, LIMIT and OFFSET set on the
+        builder are replaced. No connection is held between pages.
+
+        Example:
+            for page in db.select(['id', 'country']).from_table('locations').chunk_by('id', 5000):
+                ...
+        """
+        shape = self._result_shape()
+        if shape == 'columns':
+            raise ValueError("rows_as_columns() results cannot be paginated with chunk_by()")
 
-        self.close_connection()
+        base = self._query
+        if self._show_query == True:
+            print(self.inline_params(*base.to_sql()) + ';')
+        self._reset_query_parameters()
+
+        return self._chunk_pages(base, key_column, size, shape)
+
+    def _chunk_pages(self, base: Subquery, key_column: str, size: int, shape: str) -> Iterator[List[Any]]:
+        # name of the key in the result rows, without table or schema prefix
+        key_name = key_column.split('.')[-1]
+        last_key = None
+        key_index = None
+
+        page_query = base.copy()
+        page_query.order_by = [key_column]
+        page_query.limit = size
+        page_query.offset = None
+
+        while True:
+            if last_key is not None:
+                # the original filters stay one group (compiled once) so an OR among them
+                # cannot escape the key condition
+                page_query.where = BoolGroup()
+                if base.where:
+                    page_query.where.add(base.where)
+                page_query.where.add(Predicate(key_column, '>', Parameter(last_key)))
+
+            event = QueryEvent('chunk_by')
+            event.query, event.params = page_query.to_sql()
+            event.compile_time = event.lap()
+
+            page = self._run_query(event, 'headers')
+            column_names, rows = page[0], page[1:]
+
+            if not rows:
+                return
+
+            if key_index is None:
+                if key_name not in column_names:
+                    raise ValueError(f"The key column '{key_name}' must be part of the selected fields")
+                key_index = column_names.index(key_name)
+
+            last_key = rows[-1][key_index]
+
+            if shape == 'headers':
+                yield page
+            else:
+                yield self._format_rows(shape, column_names, rows)
 
-        self.__reset_query_parameters()
+            if len(rows) < size:
+                return
 
-        return results
-    
-    def results_with_headers(self, query):
-        self.open_connection()
+    def stream(self, batch_size: int = 1000) -> Iterator[Any]:
+        """
+        Runs the built query through a server-side cursor and yields the rows one by one,
+        fetching `batch_size` rows per round trip, so memory stays flat for any result size.
 
-        results = []
+        Rows are yielded in the configured result shape: tuples for `rows_only()`, the
+        header tuple followed by tuples for `rows_with_headers()`, Record objects for
+        `rows_are_records()`, dictionaries otherwise.
+        The pooled connection is returned when the iterator is exhausted or closed.
 
-        with self.conn.cursor() as cursor:
-            cursor.execute(query)
-            column_names = tuple(desc[0] for desc in cursor.description)
-            results.append(column_names)
-            rows = cursor.fetchall()
-            results.extend(rows)
+        Example:
+            for row in db.select(['country']).from_table('locations').stream(batch_size=500):
+                ...
+        """
+        shape = self._result_shape()
+        if shape == 'columns':
+            raise ValueError("rows_as_columns() results cannot be streamed, use get()")
+        event = QueryEvent('stream')
+        query, params = self._take_query()
+        event.compile_time = event.lap()
+        event.query, event.params = query, params
+
+        return self._stream_rows(event, batch_size, shape)
+
+    def __iter__(self) -> Iterator[Any]:
+        return self.stream()
+
+    def _stream_rows(self, event: QueryEvent, batch_size: int, shape: str) -> Iterator[Any]:
+        # the time spent by the caller between batches is not counted as fetch time
+        event.lap()
+        # inside transaction() the rows are read in the transaction, on its connection
+        in_transaction = self._transaction_depth > 0
+        conn = self.conn if in_transaction else self.pool.getconn()
+        try:
+            event.acquire_time = event.lap()
+            with conn.cursor(name=f'choco_stream_{uuid.uuid4().hex}') as cursor:
+                cursor.itersize = batch_size
+                cursor.execute(event.query, event.params)
+
+                # a named cursor only runs the query on the first fetch
+                rows = cursor.fetchmany(batch_size)
+                event.execute_time = event.lap()
+                column_names = tuple(desc[0] for desc in cursor.description)
+
+                if shape == 'headers':
+                    yield column_names
+
+                while rows:
+                    event.row_count += len(rows)
+                    yield from self._format_rows(shape, column_names, rows)
+                    event.lap()
+                    rows = cursor.fetchmany(batch_size)
+                    event.fetch_time += event.lap()
+        except Exception as error:
+            event.error = error
+            raise
+        finally:
+            if not in_transaction:
+                self.pool.putconn(conn)
+            self._emit_query_event(event)
+
+    def _run_query(self, event: QueryEvent, shape: str, fetcher: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Runs the query of the event on a pooled connection, timing each step, and returns
+        the rows in the given result shape, or what `fetcher(cursor)` reads when given
+        (the fetcher then sets the event row count).
+        """
+        results = None
+        event.lap()
+        self.open_connection()
 
-        self.close_connection()
+        try:
+            event.acquire_time = event.lap()
+            cursor_name = f'choco_columns_{uuid.uuid4().hex}' if shape == 'columns' else None
 
-        self.__reset_query_parameters()
+            with self.conn.cursor(name=cursor_name) as cursor:
+                self._execute(cursor, event.query, event.params)
+                event.execute_time = event.lap()
+                if fetcher is not None:
+                    results = fetcher(cursor)
+                else:
+                    results = self._result_fetchers[shape](self, cursor)
+                    # the rowcount of a named cursor only counts its last fetch
+                    event.row_count = results.row_count if shape == 'columns' else cursor.rowcount
+            event.fetch_time = event.lap()
+        except Exception as error:
+            event.error = error
+            # the time until the failure (e.g. a statement timeout) counts as execution
+            event.execute_time += event.lap()
+            raise
+        finally:
+            self.close_connection()
+            self._emit_query_event(event, results)
 
         return results
 
-    def results_with_dictionary(self, query):
-        self.open_connection()
-
-        results = []
-
-        with self.conn.cursor() as cursor:
-            cursor.execute(query)
-            column_names = [desc[0] for desc in cursor.description]
-            rows = cursor.fetchall()
-            for row in rows:
-                results.append(dict(zip(column_names, row)))
+    def _fetch_rows(self, cursor) -> List[Tuple[Any, ...]]:
+        return cursor.fetchall()
+
+    def _fetch_with_headers(self, cursor) -> List[Tuple[Any, ...]]:
+        column_names = tuple(desc[0] for desc in cursor.description)
+        return [column_names] + cursor.fetchall()
+
+    def _fetch_dictionaries(self, cursor) -> List[Dict[str, Any]]:
+        column_names = [desc[0] for desc in cursor.description]
+        return [dict(zip(column_names, row)) for row in cursor.fetchall()]
+
+    def _fetch_records(self, cursor) -> List[Any]:
+        column_names = tuple(desc[0] for desc in cursor.description)
+        return to_records(column_names, cursor.fetchall())
+
+    def _fetch_columns(self, cursor, batch_size: int = 10000) -> Any:
+        cursor.itersize = batch_size
+        # the description of a server-side cursor is only known after the first fetch
+        first_batch = cursor.fetchmany(batch_size)
+        batches = itertools.chain([first_batch], iter(lambda: cursor.fetchmany(batch_size), []))
+        return build_columns(cursor.description, batches)
+
+    _result_fetchers = {
+        'rows': _fetch_rows,
+        'headers': _fetch_with_headers,
+        'dictionary': _fetch_dictionaries,
+        'records': _fetch_records,
+        'columns': _fetch_columns,
+    }
+
+    def results_only_rows(self, query, params=None):
+        results = self._run_query(QueryEvent('get', query, params), 'rows')
+        self._reset_query_parameters()
+        return results
 
-        self.close_connection()
-        self.__reset_query_parameters()
+    def results_with_headers(self, query, params=None):
+        results = self._run_query(QueryEvent('get', query, params), 'headers')
+        self._reset_query_parameters()
+        return results
 
+    def results_with_dictionary(self, query, params=None):
+        results = self._run_query(QueryEvent('get', query, params), 'dictionary')
+        self._reset_query_parameters()
         return results
 
-    def rows_are_dictionary(self):
-        self._rows_are_dictionary = True
-        self._rows_have_headers = False
-        self._rows_only = False
-        return self
+    def results_with_records(self, query, params=None):
+        results = self._run_query(QueryEvent('get', query, params), 'records')
+        self._reset_query_parameters()
+        return results
 
-    def rows_with_headers(self):
-        self._rows_with_headers = True
-        self._rows_are_dictionary = False
-        self._rows_only = False
-        return self
-    
-    def rows_only(self):
-        self._rows_only = True
-        self._rows_with_headers = False
-        self._rows_are_dictionary = False
-        return self
+    def results_as_columns(self, query, params=None):
+        results = self._run_query(QueryEvent('get', query, params), 'columns')
+        self._reset_query_parameters()
+        return results
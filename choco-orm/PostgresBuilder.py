@@ -0,0 +1,973 @@
+from QuerySql import PerThread, QuerySql
+from QueryNodes import (
+    Aggregate, BoolGroup, CommonTable, CompiledSql, From, Join, Parameter, Predicate, Raw, Select, Subquery, UnionQuery
+)
+from typing import (
+    Any,
+    List,
+    Optional,
+    Union,
+    Dict,
+    Tuple,
+    Callable
+)
+import logging
+from abc import abstractmethod
+
+from psycopg2.extensions import adapt, make_dsn
+
+from PostgresCopy import array_literal
+from Prefetch import Prefetch
+from Query import Query
+from QueryStatistics import QueryEvent, estimate_result_size
+from Record import to_records
+from ResultCache import ResultCache
+
+logger = logging.getLogger(__name__)
+
+class PostgresBuilder(QuerySql):
+    """
+    The fluent query builder shared by Postgres and AsyncPostgres: builds and compiles
+    queries (select, from_table, where, joins, subqueries...), and holds the result shape,
+    the query hooks and the result cache settings. Running queries is left to the subclasses,
+    blocking (Postgres) or on an event loop (AsyncPostgres).
+    """
+    # Operators rewritten to their array form when compared against a list,
+    # so the list travels as one bound parameter whatever its length.
+    _array_operators = {
+        'IN': '= ANY',
+        'NOT IN': '<> ALL',
+    }
+
+    # Lists of at least this many values compared with IN / NOT IN are sent as one array
+    # literal string ('{1,2,3}') instead of ARRAY[1, 2, 3]: the server reads it with a single
+    # array_in call instead of parsing an expression per element, and psycopg2 does not have
+    # to adapt each value. None always uses ARRAY[...].
+    where_in_literal_threshold: Optional[int] = 1000
+
+    # Builder state, one per thread (see QuerySql)
+    _referenced_tables = PerThread(lambda instance: set())
+    _cache_ttl = PerThread()
+    _prefetches = PerThread(lambda instance: [])
+    _cte_names = PerThread(lambda instance: set())
+    _rows_are_records = PerThread(False)
+    _rows_as_columns = PerThread(False)
+
+    # Results of queries built with cached(), per DSN.
+    _result_caches: Dict[str, ResultCache] = {}
+
+    # Callables receiving a QueryEvent after every query of every instance.
+    _global_query_hooks: List[Callable[[QueryEvent], None]] = []
+
+    def __init__(
+            self,
+            database: Optional[str],
+            host: Optional[str], 
+            port: Union[str, int],
+            user_name: Optional[str], 
+            password: Optional[str],
+            pool_options: Optional[Dict[str, Any]] = None
+        ):
+        super().__init__()  # inicializa atributos conforme definido em SqlQuery
+        self.reset()
+        self.has_schema = True
+        self.DB_POSTGRES_DATABASE = database
+        self.DB_POSTGRES_HOST = host
+        self.DB_POSTGRES_PORT = port
+        self.DB_POSTGRES_USERNAME = user_name
+        self.DB_POSTGRES_PASSWORD = password
+        self.pool_options = pool_options or {}
+
+        self.dsn = make_dsn(
+            dbname=database,
+            user=user_name,
+            password=password,
+            host=host,
+            port=port,
+        )
+        self._pool = None
+
+        self._referenced_tables = set()
+        self._cache_ttl = None
+
+        self._rows_are_records = False
+        self._rows_as_columns = False
+
+        self._query_hooks: List[Callable[[QueryEvent], None]] = []
+
+    @property
+    def pool(self) -> Any:
+        """
+        The connection pool shared by every instance with the same DSN.
+        """
+        pool = self._pool
+        if pool is None or pool.closed:
+            # looked up once, and again only if the pool was closed (e.g. by close_all())
+            pool = self._pool = self._shared_pool()
+        return pool
+
+    @abstractmethod
+    def _shared_pool(self) -> Any:
+        """Returns the pool registered for the DSN, created on first use."""
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return self.pool.stats()
+
+    @property
+    def result_cache(self) -> ResultCache:
+        """
+        Cache of the results of queries built with `cached()`, shared by every instance with the same DSN.
+        """
+        cache = self._result_caches.get(self.dsn)
+        if cache is None:
+            cache = self._result_caches.setdefault(self.dsn, ResultCache())
+        return cache
+
+    def result_cache_info(self) -> Dict[str, Any]:
+        """
+        Returns the hits, misses, evictions, expirations and invalidations of the result cache.
+        """
+        return self.result_cache.info()
+
+    def cached(self, ttl: Optional[float] = 60.0) -> 'PostgresBuilder':
+        """
+        Serves the next `get()` from the result cache when the same SQL, with the same
+        parameters and result shape, ran less than `ttl` seconds ago.
+
+        Cached results are dropped when rows are written to one of the tables of the query
+        through this library (e.g. `insert_many`). Writes made by other clients are only
+        seen once the entry expires. Results of `rows_as_columns()` are not cached.
+
+        Example:
+            db.cached(ttl=10).select(['country']).from_table('locations').where('population', '>', 1000).get()
+        """
+        self._cache_ttl = ttl
+        return self
+
+    def add_query_hook(self, hook: Callable[[QueryEvent], None]) -> 'PostgresBuilder':
+        """
+        Calls `hook(event)` after every query run by this instance, with a QueryEvent holding
+        the query fingerprint, the compile, connection-acquire, execute and fetch times, the
+        row count and the approximate result size. Exceptions raised by hooks are logged and
+        never reach the query.
+
+        Example:
+            stats = QueryStatistics()
+            db.add_query_hook(stats)
+        """
+        self._query_hooks.append(hook)
+        return self
+
+    def remove_query_hook(self, hook: Callable[[QueryEvent], None]) -> 'PostgresBuilder':
+        self._query_hooks.remove(hook)
+        return self
+
+    @classmethod
+    def add_global_query_hook(cls, hook: Callable[[QueryEvent], None]):
+        """
+        Like `add_query_hook`, for the queries of every instance.
+        """
+        cls._global_query_hooks.append(hook)
+
+    @classmethod
+    def remove_global_query_hook(cls, hook: Callable[[QueryEvent], None]):
+        cls._global_query_hooks.remove(hook)
+
+    def _emit_query_event(self, event: QueryEvent, results: Any = None):
+        hooks = self._global_query_hooks + self._query_hooks
+        if not hooks:
+            return
+
+        if results is not None:
+            event.result_size = estimate_result_size(results)
+
+        for hook in hooks:
+            try:
+                hook(event)
+            except Exception:
+                logger.exception("Query hook %r failed", hook)
+
+    def _reset_query_parameters(self):
+        self.from_schema_name = []
+        self.new_query()
+        
+        self._show_query: bool = False
+        self._return_query: bool = False
+        self.query: str = None
+
+        self._referenced_tables = set()
+        self._cache_ttl = None
+        self._prefetches = []
+        self._cte_names = set()
+        return self
+
+    def reset(self) -> 'PostgresBuilder':
+        """
+        Discards the query being built without compiling or running it.
+        """
+        return self._reset_query_parameters()
+    
+
+
+    def print_query(self) -> 'PostgresBuilder':
+        self._show_query = True
+        return self
+    
+    def get_query(self, parameterized: bool = False) -> 'PostgresBuilder':
+        """
+        Makes `get()` return the SQL instead of running it.
+
+        Args:
+            parameterized (bool): If True, `get()` returns a `(sql, params)` tuple with
+                placeholders in the SQL; otherwise the values are inlined as literals.
+        """
+        self._return_query = 'parameterized' if parameterized else True
+        return self
+   
+    def from_schema(self, schema_name) -> 'PostgresBuilder':
+        schema_name = self.to_postgres_field(schema_name)
+        self.from_schema_name = schema_name
+        return self
+
+    # def select(self, fields: List[str]) -> 'PostgresBuilder':
+    #     self.selected_fields = fields
+    #     self.query_historic.append('select')
+    #     return self
+    
+    def format_value(self, value) -> 'PostgresBuilder':
+        if value is None:
+            return "NULL"
+        elif isinstance(value, bool):
+            return 'TRUE' if value else 'FALSE'
+        elif isinstance(value, int):
+            return str(value)
+        elif isinstance(value, str):
+            return f"'{value}'"
+        elif isinstance(value, (list, tuple)):
+            return value
+        elif isinstance(value, dict):
+            return value
+        else:
+            raise ValueError(f"Unsupported value type: {type(value)}")
+    
+    # def select(self, fields: List[str], *lambda_functions: Optional[Callable[[], None]]) -> 'PostgresBuilder':      
+    #     if not self._current_attribute_name:
+    #         self._current_attribute_name = 'selected_fields'
+
+    #     current_query = getattr(self, self._current_attribute_name)
+    #     current_query.extend(fields)
+
+    #     # if callable(lambda_function):
+    #     #         lambda_function()
+    #     # print(len(*lambda_functions))
+    #     # self.subquery(*lambda_functions)
+    #     # current_query.extend('(')
+    #     for lambda_function in lambda_functions:
+    #         if callable(lambda_function):
+    #             lambda_function()
+    #     # current_query.extend(')')
+        
+    #     self._is_start_subquery = False
+    #     self._is_end_subquery = False
+    #     # name = self._current_attribute_name
+    #     # print(self._current_attribute_name)
+    #     # print(hasattr(self, 'selected_fields')) # verifica se existe
+    #     # setattr(self, 'selected_fields', ['idade'])
+    #     # print(getattr(self, 'selected_fields')) # faz referencia ao atributo
+    #     # hasattr(p, 'nome');
+    #     # getattr(p, 'nome');
+    #     # setattr(p, 'idade', 31)
+        
+        
+    #     self._current_attribute_name = None
+    #     return self
+
+    # def where(self, field: str, operator: str, value: Any, combinator: str = 'AND'):
+    #     if not self._current_attribute_name:
+    #         self._current_attribute_name = 'where_conditions'
+        
+    #     current_query = getattr(self, self._current_attribute_name)
+
+    #     print(self._is_end_subquery)
+
+    #     if self._is_start_subquery:
+    #         if len(current_query) > 0 and self._subquery_prefix:
+    #             current_query.append(self._subquery_prefix)    
+    #         current_query.extend('(')
+
+    #     if len(current_query) == 0 or self._is_start_subquery:
+    #         current_query.extend([field, operator, value])
+    #     else:
+    #         current_query.extend([combinator, field, operator, value])
+
+    #     if self._is_end_subquery:
+    #         current_query.extend(')')
+
+    #     self._current_attribute_name = None
+    #     return self
+
+    # def where(self, field: str, operator: str, value: Any, combinator: str = 'AND'):
+    #     print(" ")
+    #     print(f"where: {field}, {operator}, {value}")
+    #     print(f"start subquery: {self._is_start_subquery}")
+    #     print(f"end subquery: {self._is_end_subquery}")
+    #     print(" ")
+
+    #     if self._is_start_subquery:
+    #         if len(self.where_conditions) > 0 and self._subquery_prefix:
+    #             self.where_conditions.append(self._subquery_prefix)    
+            
+    #         self.where_conditions.extend('(')
+
+    #     if len(self.where_conditions) == 0 or self._is_start_subquery:
+    #         self.where_conditions.extend([field, operator, value])
+    #     else:
+    #         self.where_conditions.extend([combinator, field, operator, value])
+
+    #     if self._is_end_subquery:
+    #         self.where_conditions.extend(')')
+
+    #     return self
+    
+    # def subquery(self, *lambda_functions: Callable[[], None], combinator: Optional[str] = None):
+    #     print('subquery')
+
+    #     for index, lambda_function in enumerate(lambda_functions):
+    #         print(index)
+    #         if index == 0:
+    #             self._is_start_subquery = True
+    #             self._subquery_prefix = combinator
+    #         else:
+    #             self._is_start_subquery = False
+    #             self._subquery_prefix = None
+
+    #         if (len(lambda_functions) == 1 or index == (len(lambda_functions) - 1)):
+    #             self._is_end_subquery = True
+    #         else:
+    #             self._is_end_subquery = False
+
+    #         self.index = index
+    #         if callable(lambda_function):
+    #             lambda_function()
+
+    #     return self
+
+    def call_subquery(func):
+        def wrapper(self, *args, **kwargs):
+            print('antes')
+            result = func(self, *args, **kwargs)
+            print('depois')
+
+            return result
+        return wrapper
+
+    def before_and_after(func):
+        def wrapper(self, *args, **kwargs):
+            
+            # print("Antes da execução de", func.__name__) # nome da função
+            result = func(self, *args, **kwargs)  # Executa a função original com seus argumentos
+            # self.where_conditions.extend(')')
+            # print("Depois da execução de", func.__name__)
+            return result
+        return wrapper
+    
+
+    def to_postgres_select_field(self, fields):
+        new_fileds = []
+        for index, field in enumerate(fields):
+            if index == (len(fields) - 1):
+                new_fileds.append(field)
+            else:
+                new_fileds.extend([field, ','])
+        return new_fileds
+    
+    def to_postgres_field(self, field):  
+        return f'{field}'
+    
+    def to_postgres_value(self, value):
+        if isinstance(value, str):
+            return f"'{value}'"
+        else:
+            return value
+        
+    def to_postgres_values(self, values: List):
+        new_values = []
+
+        for value in values:
+            new_values.append(self.to_postgres_value(value))
+
+        string = '('
+        string += ", ".join(map(str, new_values))
+        string += ')'
+
+        return string        
+
+    def to_postgres_array_literal(self, values: List) -> Optional[str]:
+        """
+        Writes the values as a Postgres array literal, e.g. '{1,2,NULL}' or '{"a","b"}'.
+        Sent as a string, the literal takes the array type of the column it is compared with.
+        Returns None when a value has no text form here (bytes...).
+        """
+        return array_literal(values)
+
+    # @before_and_after
+    def where(self, field: str, operator: str, value: Any, combinator: str = 'AND'):       
+        field = self.to_postgres_field(field)
+        self._scope.where.add(self._predicate(field, operator, value), combinator)
+        return self
+
+    def _predicate(self, field: str, operator: str, value: Any) -> Predicate:
+        """
+        `field operator value` with the value bound as a parameter; lists compared with
+        IN / NOT IN become one array parameter.
+        """
+        if isinstance(value, list) and operator.upper() in self._array_operators:
+            operator = self._array_operators[operator.upper()]
+            value = self._array_parameter(value)
+        elif isinstance(value, list):
+            value = Parameter(tuple(value))
+        else:
+            value = Parameter(value)
+        return Predicate(field, operator, value)
+    
+    def _array_parameter(self, values: List) -> Parameter:
+        """
+        The list as one array parameter, for `= ANY` / `<> ALL`; long lists are sent as an
+        array literal string, see `where_in_literal_threshold`.
+        """
+        threshold = self.where_in_literal_threshold
+        if threshold is not None and len(values) >= threshold:
+            literal = self.to_postgres_array_literal(values)
+            if literal is not None:
+                return Parameter(literal, '(%s)')
+        return Parameter(values, '(%s)')
+
+    def where_or(self, field: str, operator: str, value: Any):
+        self.where(field, operator, value, 'OR')
+        return self
+    
+    def where_in(self, field: str, values: List, combinator: str = 'AND'):
+        """
+        `field IN values`, sent as `field = ANY(%s)` with the list as a single parameter,
+        whatever its length; see `where_in_literal_threshold` for long lists.
+        An empty list adds no condition.
+        """
+        if len(values) > 0:
+            self.where(field, 'IN', values, combinator)
+
+        return self
+    
+    def select(self, fields: List[str] = '*') -> 'PostgresBuilder':
+        if isinstance(fields, str):
+            fields = [fields]
+
+        scope = self._scope
+        if scope.select is None:
+            scope.select = Select()
+        # an empty list selects everything, see Select
+        scope.select.fields.extend(fields)
+        return self
+
+    def group_by(self, fields: Union[str, List[str]]) -> 'PostgresBuilder':
+        """
+        Adds columns or expressions to GROUP BY.
+
+        Example:
+            db.select(['country']).count('*', alias='cities').from_table('cities').group_by('country')
+        """
+        if isinstance(fields, str):
+            fields = [fields]
+        self._scope.group_by.extend(fields)
+        return self
+
+    def having(self, expression: str, operator: str, value: Any, combinator: str = 'AND') -> 'PostgresBuilder':
+        """
+        Adds a HAVING condition on an aggregate, the value being bound like in `where()`.
+
+        Example:
+            db.select(['country']).from_table('cities').group_by('country').having('count(*)', '>', 10)
+        """
+        self._scope.having.add(self._predicate(expression, operator, value), combinator)
+        return self
+
+    def having_or(self, expression: str, operator: str, value: Any) -> 'PostgresBuilder':
+        return self.having(expression, operator, value, 'OR')
+
+    def order_by(self, field: str, direction: str = 'ASC', nulls: Optional[str] = None) -> 'PostgresBuilder':
+        """
+        Adds a column or expression to ORDER BY.
+
+        Args:
+            field (str): Column, expression or alias of a selected aggregate.
+            direction (str): 'ASC' or 'DESC'.
+            nulls (Optional[str]): 'FIRST' or 'LAST', the Postgres default otherwise.
+        """
+        direction = direction.upper()
+        if direction not in ('ASC', 'DESC'):
+            raise ValueError(f"Unsupported order direction: {direction}")
+
+        order = f'{field} {direction}'
+        if nulls is not None:
+            nulls = nulls.upper()
+            if nulls not in ('FIRST', 'LAST'):
+                raise ValueError(f"Unsupported nulls order: {nulls}")
+            order += f' NULLS {nulls}'
+
+        self._scope.order_by.append(order)
+        return self
+
+    def aggregate(
+            self,
+            function: str,
+            expression: str,
+            alias: Optional[str] = None,
+            filter: Optional[Callable[[], None]] = None,
+            distinct: bool = False
+        ) -> 'PostgresBuilder':
+        """
+        Selects `function([DISTINCT] expression) FILTER (WHERE ...) AS alias`, so rows are
+        reduced by the database and only the aggregates are returned.
+
+        Args:
+            function (str): Aggregate function, e.g. 'count', 'sum', 'string_agg'.
+            expression (str): Its argument, written as it is.
+            alias (Optional[str]): Name of the result column.
+            filter (Optional[Callable]): Lambda adding, with `where()` calls, the conditions
+                of the rows aggregated (FILTER clause), so several aggregates over different
+                subsets are read in one pass over the table.
+            distinct (bool): Aggregates the distinct values only.
+
+        Example:
+            (db.select(['country']).from_table('cities').group_by('country')
+                .count('*', alias='cities')
+                .sum('population', alias='big_cities_population', filter=lambda: db.where('population', '>', 1000000)))
+        """
+        condition = self._build_scope([filter]) if filter is not None else None
+        if isinstance(condition, Subquery):
+            raise ValueError("An aggregate filter takes conditions only, not a SELECT or FROM")
+
+        scope = self._scope
+        if scope.select is None:
+            scope.select = Select()
+        scope.select.fields.append(Aggregate(function, expression, alias, condition, distinct))
+        return self
+
+    def count(self, expression: str = '*', alias: Optional[str] = None, filter: Optional[Callable[[], None]] = None, distinct: bool = False) -> 'PostgresBuilder':
+        return self.aggregate('count', expression, alias, filter, distinct)
+
+    def sum(self, expression: str, alias: Optional[str] = None, filter: Optional[Callable[[], None]] = None, distinct: bool = False) -> 'PostgresBuilder':
+        return self.aggregate('sum', expression, alias, filter, distinct)
+
+    def avg(self, expression: str, alias: Optional[str] = None, filter: Optional[Callable[[], None]] = None, distinct: bool = False) -> 'PostgresBuilder':
+        return self.aggregate('avg', expression, alias, filter, distinct)
+
+    def min(self, expression: str, alias: Optional[str] = None, filter: Optional[Callable[[], None]] = None) -> 'PostgresBuilder':
+        return self.aggregate('min', expression, alias, filter)
+
+    def max(self, expression: str, alias: Optional[str] = None, filter: Optional[Callable[[], None]] = None) -> 'PostgresBuilder':
+        return self.aggregate('max', expression, alias, filter)
+    
+    def _resolve_table_name(self, table_name: str) -> str:
+        """
+        Qualifies the table name with the schema set by `from_schema()`, 'public' by default.
+        """
+        if not self.from_schema_name:
+            self.from_schema_name = 'public'
+
+        if '.' in table_name:
+            return table_name
+        return f'{self.from_schema_name}.{table_name}'
+
+    def _current_table_name(self) -> Optional[str]:
+        """
+        Returns the table set with `from_table()` in the main query, if any.
+        """
+        if self._query.from_ is not None:
+            return self._query.from_.table
+        return None
+
+    def _table_reference(self, table_name: str) -> str:
+        """
+        Qualifies a table name, keeping names of CTEs declared with `with_cte()` as they are,
+        and records it as read by the query (for result cache invalidation).
+        """
+        if table_name in self._cte_names:
+            return table_name
+
+        full_table_name = self._resolve_table_name(table_name)
+        self._referenced_tables.add(full_table_name)
+        return full_table_name
+
+    def from_table(self, table_name: str) -> 'PostgresBuilder':
+        table_name, _, alias = table_name.strip().partition(' ')
+        self._scope.from_ = From(self._table_reference(table_name), alias.strip() or None)
+        return self
+    
+    def join(self, table_name: str, first: str, operator: str, second: str, kind: str = 'INNER') -> 'PostgresBuilder':
+        """
+        Adds `kind JOIN table ON first operator second`, where both sides are columns
+        (filters on values go in `where()`). The table can have an alias: 'cities c'.
+
+        Args:
+            table_name (str): Table to join, qualified like `from_table()`.
+            first (str): Column of the condition.
+            operator (str): Comparison operator.
+            second (str): Column compared with, written as it is.
+            kind (str): 'INNER', 'LEFT', 'RIGHT' or 'FULL'.
+
+        Example:
+            db.select(['locations.country', 'cities.name']).from_table('locations').join(
+                'cities', 'cities.location_id', '=', 'locations.id')
+        """
+        kind = kind.upper()
+        if kind not in ('INNER', 'LEFT', 'RIGHT', 'FULL'):
+            raise ValueError(f"Unsupported join type: {kind}")
+
+        table_name, _, alias = table_name.strip().partition(' ')
+        full_table_name = self._table_reference(table_name)
+
+        on = BoolGroup().add(Predicate(first, operator, Raw(second)))
+        self._scope.joins.append(Join(kind, f'{full_table_name} {alias}' if alias else full_table_name, on))
+        return self
+
+    def left_join(self, table_name: str, first: str, operator: str, second: str) -> 'PostgresBuilder':
+        """
+        Adds `LEFT JOIN table ON first operator second`, see `join()`.
+        """
+        return self.join(table_name, first, operator, second, kind='LEFT')
+
+    def prefetch(self, child_table: str, foreign_key: str, key: str = 'id', name: Optional[str] = None) -> 'PostgresBuilder':
+        """
+        Loads the child rows of every row of the query with one extra query, instead of one
+        query per row: after the rows are fetched, their `key` values are collected and the
+        children are read with `WHERE foreign_key = ANY(keys)`, then attached to each row
+        under `name` (the child table name by default) as a list of dicts.
+        Works with the dictionary result shape (the default); can be called several times.
+
+        Args:
+            child_table (str): Table of the children, qualified like `from_table()`.
+            foreign_key (str): Column of the child table referencing the parent rows.
+            key (str): Column of the parent rows referenced, it must be selected.
+            name (Optional[str]): Key of the children in the parent rows.
+
+        Example:
+            locations = db.from_table('locations').prefetch('cities', 'location_id').get()
+            locations[0]['cities']  # [{'id': 7, 'location_id': 1, 'name': ...}, ...]
+        """
+        self._prefetches.append(Prefetch(self._resolve_table_name(child_table), foreign_key, key, name))
+        return self
+
+    def with_cte(
+            self,
+            name: str,
+            query: Union[Callable[[], None], List[Callable[[], None]], Query],
+            materialized: Optional[bool] = None,
+            columns: Optional[List[str]] = None
+        ) -> 'PostgresBuilder':
+        """
+        Adds `name AS (query)` to the WITH clause of the query; `from_table(name)` and
+        `join(name, ...)` then read it without schema. Several CTEs can be chained, each one
+        reading the previous ones, so a multi-stage pipeline runs in one statement.
+
+        Args:
+            name (str): Name of the CTE.
+            query: Lambda(s) building the CTE query with the builder, in the `subquery()`
+                style, or a Query object made with `build()`.
+            materialized (Optional[bool]): True writes MATERIALIZED (computed once, e.g. when
+                read several times), False NOT MATERIALIZED (inlined, so outer filters can be
+                pushed into it); None lets the planner choose.
+            columns (Optional[List[str]]): Names of its columns, those of the query by default.
+
+        Example:
+            (db.with_cte('big', lambda: db.select(['id', 'country']).from_table('cities').where('population', '>', 1000000))
+                .select(['country']).count('*', alias='big_cities').from_table('big').group_by('country'))
+        """
+        statement = self._build_statement(query)
+        self._cte_names.add(name)
+        self._scope.ctes.append(CommonTable(name, statement, columns, materialized))
+        return self
+
+    def with_recursive(
+            self,
+            name: str,
+            anchor: Union[Callable[[], None], List[Callable[[], None]], Query],
+            recursive: Union[Callable[[], None], List[Callable[[], None]], Query],
+            columns: Optional[List[str]] = None,
+            union_all: bool = True,
+            materialized: Optional[bool] = None
+        ) -> 'PostgresBuilder':
+        """
+        Adds a recursive CTE, `WITH RECURSIVE name AS (anchor UNION ALL recursive)`: the
+        recursive query joins the rows found so far (`name`) to find the next ones, so a
+        whole tree is walked in one statement instead of one query per level.
+
+        Args:
+            name (str): Name of the CTE.
+            anchor: Lambda(s) or Query selecting the starting rows.
+            recursive: Lambda(s) or Query selecting the next rows, reading `name`.
+            columns (Optional[List[str]]): Names of its columns, those of the anchor by default.
+            union_all (bool): False uses UNION, dropping duplicate rows (stops cycles).
+            materialized (Optional[bool]): MATERIALIZED hint, see `with_cte()`.
+
+        Example:
+            (db.with_recursive('tree',
+                lambda: db.select(['id', 'parent_id', 'name']).from_table('categories').where('id', '=', 1),
+                lambda: db.select(['c.id', 'c.parent_id', 'c.name']).from_table('categories c')
+                    .join('tree', 'c.parent_id', '=', 'tree.id'))
+                .from_table('tree'))
+        """
+        # the name is known before the recursive part is built, so it reads the CTE
+        self._cte_names.add(name)
+        try:
+            body = UnionQuery(self._build_statement(anchor), self._build_statement(recursive), union_all)
+        except Exception:
+            self._cte_names.discard(name)
+            raise
+        self._scope.ctes.append(CommonTable(name, body, columns, materialized, recursive=True))
+        return self
+
+    def _build_statement(self, query: Union[Callable[[], None], List[Callable[[], None]], Query]) -> Any:
+        """
+        The node of a statement given as lambda(s) building it, or as a Query object.
+        """
+        if isinstance(query, Query):
+            self._referenced_tables.update(query.tables)
+            return CompiledSql(query.sql, query.params)
+
+        lambda_functions = query if isinstance(query, (list, tuple)) else [query]
+        statement = self._build_scope(lambda_functions)
+        if not isinstance(statement, Subquery):
+            raise ValueError("A CTE query needs a SELECT or FROM")
+        return statement
+
+    def where_subquery(self, field: str, operator: Optional[str], *lambda_functions: Callable[[], None], combinator: Optional[str] = 'AND'):
+        """
+        Adds `field operator (subquery)`, the subquery being built by the builder calls
+        made in the lambdas.
+
+        Example:
+            db.where_subquery('population', 'IN',
+                lambda: db.select(['population']),
+                lambda: db.from_table('locations'),
+                lambda: db.where('country', '=', 'Brazil'))
+        """
+        subquery = self._build_scope(lambda_functions)
+        self._scope.where.add(Predicate(field, operator, subquery), combinator)
+        return self
+
+    def subquery(self, *lambda_functions, combinator: Optional[str] = None):
+        """
+        Groups the conditions added by the lambdas in parentheses, joined to the previous
+        conditions with `combinator` (AND by default). Lambdas can nest other subquery() calls;
+        non callable arguments are written as raw SQL.
+
+        Example:
+            db.where('country', '=', 'Brazil').subquery(
+                lambda: db.where('population', '>', 1000),
+                lambda: db.where_or('population', '<', 10),
+                combinator='AND')
+        """
+        if not lambda_functions:
+            return self
+
+        if combinator is None or combinator.upper() in ('WHERE', 'SELECT', 'WITH', 'SUBQUERY'):
+            # older versions took the clause to append to as combinator, only WHERE is supported
+            combinator = 'AND'
+
+        self._scope.where.add(self._build_scope(lambda_functions), combinator)
+        return self
+
+    def _build_scope(self, lambda_functions) -> Union[Subquery, BoolGroup]:
+        """
+        Runs the lambdas with a new scope as target of the builder calls. Returns the scope
+        as a subquery if a SELECT or FROM was given, otherwise its group of conditions.
+        """
+        outer_scope = self._scope
+        scope = self._scope = Subquery()
+        try:
+            for lambda_function in lambda_functions:
+                if callable(lambda_function):
+                    lambda_function()
+                else:
+                    scope.where.add(Raw(lambda_function), None)
+        finally:
+            self._scope = outer_scope
+
+        return scope if scope.is_statement else scope.where
+
+    def _compile_query(self) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Compiles the query tree into the SQL text, without the trailing semicolon.
+
+        Not cached by shape: conditions are compiled as they are added (see BoolGroup), so
+        compiling the tree is a join per group and a few appends. Any key identifying the
+        shape of the tree has to walk it too and cost twice as much as compiling it.
+
+        Returns:
+            The SQL with a `%s` placeholder for every bound value, and the values in order.
+        """
+        return self._query.to_sql()
+
+    def _quote_value(self, value: Any) -> str:
+        if isinstance(value, list):
+            return 'ARRAY[' + ','.join(self._quote_value(item) for item in value) + ']'
+        if isinstance(value, tuple):
+            return '(' + ', '.join(self._quote_value(item) for item in value) + ')'
+
+        adapted = adapt(value)
+        if hasattr(adapted, 'encoding'):
+            adapted.encoding = 'utf8'
+        return adapted.getquoted().decode('utf8')
+
+    def inline_params(self, query: str, params: Tuple[Any, ...]) -> str:
+        """
+        Writes the bound values into the SQL as literals, for display and debugging only.
+        """
+        return query % tuple(self._quote_value(value) for value in params)
+
+    def _query_text(self, query: Query, return_query: Union[bool, str]) -> Union[str, Tuple[str, Tuple[Any, ...]]]:
+        """
+        What `get()` returns after `get_query()`: the SQL with the values inlined, or with
+        placeholders and the values when parameterized.
+        """
+        if return_query == 'parameterized':
+            return query.sql + ';', query.params
+        return self.inline_params(query.sql, query.params) + ';'
+
+    def build(self) -> Query:
+        """
+        Compiles the built query into an immutable Query object, with the result shape
+        configured on the instance, and clears the builder for the next query.
+
+        Query objects can be run later and from any thread, see `run` and `gather`.
+        """
+        shape = self._result_shape()
+        if self._prefetches and shape != 'dictionary':
+            self._reset_query_parameters()
+            raise ValueError("prefetch() needs the dictionary result shape")
+
+        sql, params = self._compile_query()
+        query = Query(
+            sql,
+            params,
+            shape,
+            self._referenced_tables,
+            self._cache_ttl if not self._rows_as_columns else None,
+            self,
+            self._prefetches
+        )
+        self._reset_query_parameters()
+        return query
+
+    def _result_cache_key(self, query: Query) -> Tuple[Any, ...]:
+        return (query.sql, self._freeze_params(query.params), query.shape)
+
+    def _cached_results(self, cache_key: Tuple[Any, ...], event: QueryEvent) -> Optional[List[Any]]:
+        """Returns a copy of the cached results and emits the event of the cache hit, None on a miss."""
+        results = self.result_cache.get(cache_key)
+        if results is None:
+            return None
+        event.cached = True
+        event.fetch_time = event.lap()
+        event.row_count = len(results)
+        self._emit_query_event(event, results)
+        return self._copy_results(results)
+
+    def _freeze_params(self, value: Any) -> Any:
+        """Turns the parameters into a hashable value usable in a cache key."""
+        if isinstance(value, (list, tuple)):
+            return (type(value).__name__,) + tuple(self._freeze_params(item) for item in value)
+        if isinstance(value, dict):
+            return ('dict',) + tuple(sorted((key, self._freeze_params(item)) for key, item in value.items()))
+        return value
+
+    def _copy_results(self, results: List[Any]) -> List[Any]:
+        """Copies cached rows so callers cannot change what the cache holds."""
+        return [dict(row) if isinstance(row, dict) else row for row in results]
+
+    def _take_query(self) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Compiles the built query and clears the builder for the next one.
+        """
+        query, params = self._compile_query()
+
+        if self._show_query == True:
+            print(self.inline_params(query, params) + ';')
+
+        self._reset_query_parameters()
+        return query, params
+
+    # RESULT METHODOS
+    def _result_shape(self) -> str:
+        """
+        Name of the configured result shape: 'rows', 'headers', 'records', 'columns' or 'dictionary'.
+        """
+        if self._rows_only:
+            return 'rows'
+        elif self._rows_with_headers:
+            return 'headers'
+        elif self._rows_are_records:
+            return 'records'
+        elif self._rows_as_columns:
+            return 'columns'
+        return 'dictionary'
+
+    def _format_rows(self, shape: str, column_names: Tuple[str, ...], rows: List[Tuple[Any, ...]]) -> List[Any]:
+        """
+        Converts fetched tuples to the result shape (the header line is not included).
+        """
+        if shape == 'records':
+            return to_records(column_names, rows)
+        elif shape == 'dictionary':
+            return [dict(zip(column_names, row)) for row in rows]
+        return rows
+
+    def rows_are_dictionary(self):
+        self._rows_are_dictionary = True
+        self._rows_with_headers = False
+        self._rows_only = False
+        self._rows_are_records = False
+        self._rows_as_columns = False
+        return self
+
+    def rows_as_columns(self):
+        """
+        Returns a Columns mapping of column name -> typed contiguous array (numpy when
+        installed, array.array otherwise), with NULLs tracked in `result.masks`. The arrays
+        are filled batch by batch while fetching, no list of rows is built.
+        """
+        self._rows_as_columns = True
+        self._rows_are_records = False
+        self._rows_are_dictionary = False
+        self._rows_with_headers = False
+        self._rows_only = False
+        return self
+
+    def rows_are_records(self):
+        """
+        Returns rows as Record objects: tuples that also support access by column name
+        (`row['country']`) and by attribute (`row.country`). One Record class is created per
+        set of columns and reused, so rows cost about as much memory as plain tuples.
+        """
+        self._rows_are_records = True
+        self._rows_as_columns = False
+        self._rows_are_dictionary = False
+        self._rows_with_headers = False
+        self._rows_only = False
+        return self
+
+    def rows_with_headers(self):
+        self._rows_with_headers = True
+        self._rows_are_dictionary = False
+        self._rows_only = False
+        self._rows_are_records = False
+        self._rows_as_columns = False
+        return self
+    
+    def rows_only(self):
+        self._rows_only = True
+        self._rows_with_headers = False
+        self._rows_are_dictionary = False
+        self._rows_are_records = False
+        self._rows_as_columns = False
+        return self
@@ -0,0 +1,154 @@
+import codecs
+import json
+import uuid
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Any, Iterable, Iterator, Optional
+
+
+def array_literal(values: Iterable[Any]) -> Optional[str]:
+    """
+    Writes the values as a Postgres array literal, e.g. '{1,2,NULL}', '{"a","b"}' or
+    '{{1,2},{3,4}}' for nested lists. Returns None when a value has no text form here (bytes...).
+    """
+    items = []
+    append = items.append
+    for value in values:
+        kind = type(value)
+        if kind is int or kind is float or kind is Decimal:
+            append(str(value))
+        elif kind is str:
+            append('"' + value.replace('\\', '\\\\').replace('"', '\\"') + '"')
+        elif value is None:
+            append('NULL')
+        elif kind is bool:
+            append('t' if value else 'f')
+        elif isinstance(value, (uuid.UUID, date, time)):
+            append(f'"{value}"')
+        elif isinstance(value, (list, tuple)):
+            nested = array_literal(value)
+            if nested is None:
+                return None
+            append(nested)
+        elif isinstance(value, dict):
+            append('"' + json.dumps(value).replace('\\', '\\\\').replace('"', '\\"') + '"')
+        else:
+            return None
+    return '{' + ','.join(items) + '}'
+
+
+class CopyRowsReader:
+    """
+    File-like object that feeds `COPY ... FROM STDIN` from an iterable of rows.
+
+    Rows are encoded to the COPY text format only as the driver asks for more data,
+    so a generator of any size is streamed without being held in memory.
+    """
+
+    _escapes = str.maketrans({
+        '\\': '\\\\',
+        '\n': '\\n',
+        '\r': '\\r',
+        '\t': '\\t',
+    })
+
+    def __init__(self, rows: Iterable[Any], columns_count: Optional[int] = None):
+        """
+        Args:
+            rows (Iterable): Sequences of values, one per row.
+            columns_count (Optional[int]): Expected length of every row, checked when given.
+        """
+        self._rows: Iterator[Any] = iter(rows)
+        self._columns_count = columns_count
+        self._buffer = ''
+        self.rows_read = 0
+
+    def format_value(self, value: Any) -> str:
+        if value is None:
+            return '\\N'
+        elif isinstance(value, bool):
+            return 't' if value else 'f'
+        elif isinstance(value, (bytes, bytearray, memoryview)):
+            return '\\\\x' + bytes(value).hex()
+        elif isinstance(value, (datetime, date, time)):
+            return value.isoformat()
+        elif isinstance(value, dict):
+            return json.dumps(value).translate(self._escapes)
+        elif isinstance(value, (list, tuple)):
+            literal = array_literal(value)
+            if literal is None:
+                raise ValueError(f"Row {self.rows_read + 1}: {value!r} cannot be written as a Postgres array")
+            return literal.translate(self._escapes)
+        else:
+            return str(value).translate(self._escapes)
+
+    def format_row(self, row: Any) -> str:
+        if self._columns_count is not None and len(row) != self._columns_count:
+            raise ValueError(f"Row {self.rows_read + 1} has {len(row)} values, expected {self._columns_count}")
+        return '\t'.join(self.format_value(value) for value in row) + '\n'
+
+    def read(self, size: int = -1) -> str:
+        lines = [self._buffer]
+        length = len(self._buffer)
+
+        while size < 0 or length < size:
+            try:
+                row = next(self._rows)
+            except StopIteration:
+                break
+            line = self.format_row(row)
+            self.rows_read += 1
+            lines.append(line)
+            length += len(line)
+
+        data = ''.join(lines)
+        if size < 0:
+            self._buffer = ''
+            return data
+
+        self._buffer = data[size:]
+        return data[:size]
+
+    def readline(self, size: int = -1) -> str:
+        return self.read(size)
+
+
+class CopyChunkWriter:
+    """
+    File-like object receiving the output of `COPY ... TO STDOUT`.
+
+    Buffers the data sent by the driver and writes it to the target file in
+    `chunk_size` pieces, counting the bytes written.
+    """
+
+    def __init__(self, target: Any, chunk_size: int = 65536, encoding: Optional[str] = None):
+        """
+        Args:
+            target: Binary file object, or text file object when `encoding` is given.
+            chunk_size (int): Size of every write to the target, except the last one.
+            encoding (Optional[str]): Decodes the data before writing it to a text target.
+        """
+        self._target = target
+        self._chunk_size = chunk_size
+        self._decoder = codecs.getincrementaldecoder(encoding)() if encoding else None
+        self._buffer = bytearray()
+        self.bytes_written = 0
+
+    def write(self, data: bytes) -> int:
+        self._buffer += data
+        while len(self._buffer) >= self._chunk_size:
+            self._write_chunk(bytes(self._buffer[:self._chunk_size]))
+            del self._buffer[:self._chunk_size]
+        return len(data)
+
+    def _write_chunk(self, chunk: bytes):
+        # the incremental decoder keeps characters split between two chunks
+        self._target.write(self._decoder.decode(chunk) if self._decoder else chunk)
+        self.bytes_written += len(chunk)
+
+    def flush(self):
+        if self._buffer:
+            self._write_chunk(bytes(self._buffer))
+            self._buffer.clear()
+        if hasattr(self._target, 'flush'):
+            self._target.flush()
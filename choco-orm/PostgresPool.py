@@ -0,0 +1,304 @@
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+import psycopg2
+from psycopg2 import extensions
+
+from LRUCache import LRUCache
+
+
+class PoolTimeoutError(Exception):
+    """
+    Raised when no connection could be checked out of the pool within the timeout.
+    """
+    pass
+
+
+class PostgresPool:
+    """
+    Thread-safe pool of psycopg2 connections for a single DSN.
+
+    Connections are reused between queries instead of paying the TCP + auth +
+    backend-fork handshake on every call. Pools are shared per DSN through
+    `PostgresPool.for_dsn`, so every Postgres instance pointing at the same
+    database uses the same pool.
+    """
+
+    _pools: Dict[str, 'PostgresPool'] = {}
+    _pools_lock = threading.Lock()
+
+    def __init__(
+            self,
+            dsn: str,
+            min_size: int = 1,
+            max_size: int = 10,
+            timeout: float = 30.0,
+            max_idle: float = 300.0,
+            ping_after: float = 30.0,
+            reset_query: Optional[str] = None,
+            connect: Callable[..., Any] = psycopg2.connect
+        ):
+        """
+        Args:
+            dsn (str): The libpq connection string.
+            min_size (int): Connections kept open even when idle.
+            max_size (int): Maximum number of connections open at the same time.
+            timeout (float): Seconds to wait for a free connection before raising PoolTimeoutError.
+            max_idle (float): Seconds an idle connection above min_size is kept before being closed.
+            ping_after (float): Idle seconds after which a connection is pinged on checkout.
+            reset_query (Optional[str]): Extra SQL executed when a connection is returned (e.g. 'DISCARD ALL').
+            connect (Callable): Factory used to open new connections, receives the dsn.
+        """
+        if min_size < 0 or max_size < 1 or min_size > max_size:
+            raise ValueError(f"Invalid pool size: min_size={min_size}, max_size={max_size}")
+
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.ping_after = ping_after
+        self.reset_query = reset_query
+        self._connect = connect
+
+        self._idle = deque()    # (connection, last_used) pairs, most recently used on the right
+        self._statements: Dict[Any, LRUCache] = {}  # prepared statements of each connection
+        self._size = 0          # open connections, idle or in use
+        self._waiting = 0
+        self._closed = False
+        self._cond = threading.Condition()
+
+        self._stats = {
+            'checkouts': 0,
+            'timeouts': 0,
+            'created': 0,
+            'discarded': 0,
+            'evicted': 0,
+            'failed_health_checks': 0,
+            'wait_time': 0.0,
+        }
+
+        for _ in range(min_size):
+            with self._cond:
+                self._size += 1
+            conn = self._new_connection()
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+
+    @classmethod
+    def for_dsn(cls, dsn: str, **options: Any) -> 'PostgresPool':
+        """
+        Returns the pool shared by every caller using the same DSN, creating it on first use.
+        The options are only applied when the pool is created.
+        """
+        with cls._pools_lock:
+            pool = cls._pools.get(dsn)
+        if pool is not None and not pool._closed:
+            return pool
+
+        # the min_size connections are opened without the lock, other DSNs don't wait for them
+        created = cls(dsn, **options)
+        with cls._pools_lock:
+            pool = cls._pools.get(dsn)
+            if pool is None or pool._closed:
+                cls._pools[dsn] = pool = created
+        if pool is not created:
+            created.close()
+        return pool
+
+    @classmethod
+    def close_all(cls):
+        with cls._pools_lock:
+            pools = list(cls._pools.values())
+            cls._pools.clear()
+        for pool in pools:
+            pool.close()
+
+    def _new_connection(self):
+        try:
+            conn = self._connect(self.dsn)
+        except Exception:
+            with self._cond:
+                self._size -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return conn
+
+    def _discard(self, conn):
+        """Closes a connection and frees its slot. Must be called with the lock held."""
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._statements.pop(conn, None)
+        self._size -= 1
+        self._stats['discarded'] += 1
+        self._cond.notify()
+
+    def _evict_idle(self):
+        """Closes connections idle for longer than max_idle, keeping min_size. Lock must be held."""
+        now = time.monotonic()
+        while self._idle and self._size > self.min_size:
+            conn, last_used = self._idle[0]
+            if now - last_used < self.max_idle:
+                break
+            self._idle.popleft()
+            self._discard(conn)
+            self._stats['evicted'] += 1
+
+    def _is_healthy(self, conn, last_used: float) -> bool:
+        if conn.closed:
+            return False
+        if conn.get_transaction_status() == extensions.TRANSACTION_STATUS_UNKNOWN:
+            return False
+        if time.monotonic() - last_used < self.ping_after:
+            return True
+        try:
+            with conn.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def getconn(self, timeout: Optional[float] = None):
+        """
+        Checks a connection out of the pool.
+
+        Idle connections are reused (most recent first) after a health check, new ones are
+        opened while the pool is below max_size, otherwise the call waits for a connection to
+        be returned.
+
+        Raises:
+            PoolTimeoutError: If no connection is available within the timeout.
+        """
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise psycopg2.InterfaceError('connection pool is closed')
+                self._evict_idle()
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"Could not get a connection within {timeout}s "
+                            f"({self._size} of {self.max_size} in use)"
+                        )
+                    self._waiting += 1
+                    try:
+                        self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    conn, last_used = None, None
+                    self._size += 1
+
+            if conn is None:
+                conn = self._new_connection()
+            elif not self._is_healthy(conn, last_used):
+                with self._cond:
+                    self._stats['failed_health_checks'] += 1
+                    self._discard(conn)
+                continue
+
+            with self._cond:
+                self._stats['checkouts'] += 1
+                self._stats['wait_time'] += time.monotonic() - started
+            return conn
+
+    def putconn(self, conn, discard: bool = False):
+        """
+        Returns a connection to the pool after resetting its session state.
+
+        Any open transaction is rolled back and the psycopg2 session characteristics
+        (autocommit, isolation level, read only, deferrable) are restored to the defaults.
+        Broken connections are closed instead of being reused.
+        """
+        if not discard and not conn.closed:
+            try:
+                status = conn.get_transaction_status()
+                if status == extensions.TRANSACTION_STATUS_UNKNOWN:
+                    discard = True
+                else:
+                    if status != extensions.TRANSACTION_STATUS_IDLE:
+                        conn.rollback()
+                    conn.set_session(
+                        isolation_level='DEFAULT',
+                        readonly='DEFAULT',
+                        deferrable='DEFAULT',
+                        autocommit=False
+                    )
+                    if self.reset_query:
+                        with conn.cursor() as cursor:
+                            cursor.execute(self.reset_query)
+                        conn.commit()
+                        with self._cond:
+                            self._statements.pop(conn, None)
+            except Exception:
+                discard = True
+
+        with self._cond:
+            if discard or conn.closed or self._closed:
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+                self._evict_idle()
+                self._cond.notify()
+
+    def statement_cache(self, conn, max_size: int = 100) -> LRUCache:
+        """
+        Returns the LRU map of `query text -> prepared statement name` of a pooled connection.
+        Statements pushed out of the cache are deallocated on the server.
+        """
+        with self._cond:
+            cache = self._statements.get(conn)
+            if cache is None:
+                cache = LRUCache(max_size, on_evict=lambda _, name: self._deallocate(conn, name))
+                self._statements[conn] = cache
+            return cache
+
+    def _deallocate(self, conn, statement_name: str):
+        with conn.cursor() as cursor:
+            cursor.execute(f'DEALLOCATE {statement_name}')
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self):
+        """Closes every idle connection; connections in use are closed when returned."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns a snapshot of the pool counters.
+        """
+        with self._cond:
+            stats = dict(self._stats)
+            stats.update({
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'waiting': self._waiting,
+                'min_size': self.min_size,
+                'max_size': self.max_size,
+            })
+        return stats
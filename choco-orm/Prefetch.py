@@ -0,0 +1,61 @@
+from typing import Any, Dict, List, Optional
+
+from Query import Query
+from QueryNodes import From, Predicate, Subquery
+
+
+class Prefetch:
+    """
+    Child rows to load for the rows of a query, see `Postgres.prefetch`.
+
+    Once the parent rows are fetched, the children of all of them are read with one
+    `WHERE foreign_key = ANY(<parent keys>)` query and attached to their parent row,
+    under `name`, as a list of dicts.
+    """
+    __slots__ = ('table', 'foreign_key', 'key', 'name')
+
+    def __init__(self, table: str, foreign_key: str, key: str = 'id', name: Optional[str] = None):
+        """
+        Args:
+            table (str): The child table, schema qualified.
+            foreign_key (str): Column of the child table holding the parent key.
+            key (str): Column of the parent rows referenced by the foreign key.
+            name (Optional[str]): Key of the children in the parent rows, the table name by default.
+        """
+        self.table = table
+        self.foreign_key = foreign_key
+        self.key = key
+        self.name = name or table.split('.')[-1]
+
+    def query(self, rows: List[Dict[str, Any]], db: Any, cache_ttl: Optional[float] = None) -> Optional[Query]:
+        """
+        Returns the query reading the children of the rows, None when no row has a key.
+        """
+        try:
+            keys = list(dict.fromkeys(row[self.key] for row in rows))
+        except KeyError:
+            raise ValueError(f"The key column '{self.key}' must be part of the selected fields to prefetch {self.name}")
+        if None in keys:
+            keys.remove(None)
+        if not keys:
+            return None
+
+        children = Subquery()
+        children.from_ = From(self.table)
+        children.where.add(Predicate(self.foreign_key, '= ANY', db._array_parameter(keys)))
+        sql, params = children.to_sql()
+        return Query(sql, params, 'dictionary', {self.table}, cache_ttl, db)
+
+    def attach(self, rows: List[Dict[str, Any]], children: List[Dict[str, Any]]):
+        """
+        Sets the list of its children on every row, empty for rows without children.
+        """
+        groups: Dict[Any, List[Dict[str, Any]]] = {}
+        for child in children:
+            groups.setdefault(child[self.foreign_key], []).append(child)
+
+        for row in rows:
+            row[self.name] = groups.get(row[self.key], [])
+
+    def __repr__(self) -> str:
+        return f'Prefetch({self.table!r}, {self.foreign_key!r}, {self.key!r}, name={self.name!r})'
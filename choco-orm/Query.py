@@ -0,0 +1,55 @@
+from typing import Any, FrozenSet, Optional, Tuple
+
+
+class Query:
+    """
+    Immutable compiled query, created with `build()` at the end of a builder chain.
+
+    It holds everything needed to run it (SQL, parameters, result shape, tables read,
+    result cache TTL, the Postgres instance that built it and the relations to prefetch), so it can be kept, run
+    several times and run from any thread, e.g. by `Postgres.gather`.
+
+    Example:
+        query = db.select(['country']).from_table('locations').where('population', '>', 1000).build()
+        rows = query.run()
+    """
+    __slots__ = ('sql', 'params', 'shape', 'tables', 'cache_ttl', 'db', 'prefetch')
+
+    def __init__(
+            self,
+            sql: str,
+            params: Tuple[Any, ...],
+            shape: str,
+            tables: FrozenSet[str] = frozenset(),
+            cache_ttl: Optional[float] = None,
+            db: Any = None,
+            prefetch: Tuple[Any, ...] = ()
+        ):
+        object.__setattr__(self, 'sql', sql)
+        object.__setattr__(self, 'params', tuple(params))
+        object.__setattr__(self, 'shape', shape)
+        object.__setattr__(self, 'tables', frozenset(tables))
+        object.__setattr__(self, 'cache_ttl', cache_ttl)
+        object.__setattr__(self, 'db', db)
+        object.__setattr__(self, 'prefetch', tuple(prefetch))
+
+    def __setattr__(self, name: str, value: Any):
+        raise AttributeError(f"Query objects are immutable, cannot set '{name}'")
+
+    def __delattr__(self, name: str):
+        raise AttributeError(f"Query objects are immutable, cannot delete '{name}'")
+
+    def run(self) -> Any:
+        """Runs the query on the instance that built it, see `Postgres.run`."""
+        return self.db.run(self)
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, Query):
+            return NotImplemented
+        return (self.sql, self.params, self.shape) == (other.sql, other.params, other.shape)
+
+    def __hash__(self) -> int:
+        return hash((self.sql, self.shape))
+
+    def __repr__(self) -> str:
+        return f'Query({self.sql!r}, {self.params!r}, shape={self.shape!r})'
@@ -0,0 +1,151 @@
+from concurrent.futures import Future
+from typing import Any, List, Optional, Tuple, Union
+
+from psycopg2 import extensions
+from psycopg2.extras import CompositeCaster
+
+from Query import Query
+from QueryStatistics import QueryEvent
+
+
+class QueryBatch:
+    """
+    Collects queries and runs them all in a single statement, so a request running several
+    small queries pays one network round trip instead of one per query.
+
+    Each query becomes a scalar subquery returning its rows as an array of row literals,
+    and is also joined with LIMIT 0, which gives the column names and types of its rows
+    without reading any:
+
+        SELECT (SELECT array_agg(ROW(t.*)::text) FROM (<query 1>) t), ...,
+               1, d1.*, ...
+        FROM (SELECT) b
+        LEFT JOIN (SELECT * FROM (<query 1>) t LIMIT 0) d1 ON true ...
+
+    ROW(t.*) always means the whole row, where a bare `t` would name a column called t.
+    The values are then decoded with the typecasters psycopg2 uses for the column types,
+    so each query returns the same rows as `get()`, in its result shape ('rows',
+    'headers', 'dictionary' or 'records').
+
+    Example:
+        with db.batch() as batch:
+            countries = batch.add(db.select(['country']).from_table('locations'))
+            total = batch.add(db.rows_only().select(['count(*)']).from_table('locations'))
+        countries.result(), total.result()
+    """
+
+    def __init__(self, db: Any):
+        self.db = db
+        self._queries: List[Tuple[Query, Future]] = []
+
+    def add(self, query: Union[Query, Any]) -> Future:
+        """
+        Adds a Query object, or the builder chain in progress (built on the spot).
+        Returns the Future receiving its rows when the batch runs.
+        """
+        if not isinstance(query, Query):
+            query = query.build()
+        if query.shape == 'columns':
+            raise ValueError("rows_as_columns() queries cannot run in a batch")
+        if query.prefetch:
+            raise ValueError("prefetch() queries cannot run in a batch")
+
+        future = Future()
+        future.set_running_or_notify_cancel()
+        self._queries.append((query, future))
+        return future
+
+    def __len__(self) -> int:
+        return len(self._queries)
+
+    def __enter__(self) -> 'QueryBatch':
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.execute()
+        else:
+            for _, future in self._queries:
+                future.set_exception(exc_value)
+            self._queries = []
+
+    def _compile(self, queries: List[Tuple[Query, Future]]) -> Tuple[str, Tuple[Any, ...]]:
+        rows, descriptions, joins = [], [], []
+        rows_params, descriptions_params = [], []
+
+        for index, (query, _) in enumerate(queries, 1):
+            rows.append(f"(SELECT array_agg(ROW(t.*)::text) FROM ({query.sql}) t)")
+            rows_params.extend(query.params)
+            # the marker is the only non null value of the description columns
+            descriptions.append(f"{index}, d{index}.*")
+            joins.append(f"LEFT JOIN (SELECT * FROM ({query.sql}) t LIMIT 0) d{index} ON true")
+            descriptions_params.extend(query.params)
+
+        sql = f"SELECT {', '.join(rows + descriptions)} FROM (SELECT) b {' '.join(joins)}"
+        return sql, tuple(rows_params + descriptions_params)
+
+    def execute(self):
+        """
+        Runs the queries added so far and resolves their futures. A failure of the statement
+        is set on every future.
+        """
+        queries, self._queries = self._queries, []
+        if not queries:
+            return
+
+        event = QueryEvent('batch')
+        event.query, event.params = self._compile(queries)
+        event.compile_time = event.lap()
+
+        try:
+            results = self.db._run_query(event, 'rows', lambda cursor: self._fetch(cursor, queries, event))
+        except Exception as error:
+            for _, future in queries:
+                future.set_exception(error)
+            return
+
+        for (_, future), result in zip(queries, results):
+            future.set_result(result)
+
+    def _fetch(self, cursor: Any, queries: List[Tuple[Query, Future]], event: QueryEvent) -> List[List[Any]]:
+        row = cursor.fetchone()
+        description = cursor.description
+        count = len(queries)
+
+        # description columns of each query start after its marker
+        markers = [index for index in range(count, len(row)) if row[index] is not None] + [len(row)]
+
+        results = []
+        row_count = 0
+        for index, (query, _) in enumerate(queries):
+            columns = description[markers[index] + 1:markers[index + 1]]
+            column_names = tuple(column.name for column in columns)
+            casters = [self._caster(cursor, column.type_code) for column in columns]
+
+            rows = [
+                tuple(
+                    value if caster is None else caster(value, cursor)
+                    for caster, value in zip(casters, CompositeCaster.tokenize(literal))
+                )
+                for literal in row[index] or ()
+            ]
+            row_count += len(rows)
+
+            if query.shape == 'headers':
+                results.append([column_names] + rows)
+            else:
+                results.append(self.db._format_rows(query.shape, column_names, rows))
+
+        event.row_count = row_count
+        return results
+
+    def _caster(self, cursor: Any, oid: int) -> Optional[Any]:
+        """
+        The typecaster psycopg2 would use for the type: registered on the cursor, on the
+        connection or globally. None keeps the text, like psycopg2 does for unknown types.
+        """
+        for types in (cursor.string_types, cursor.connection.string_types, extensions.string_types):
+            caster = types.get(oid) if types else None
+            if caster is not None:
+                return caster
+        return None
@@ -1,5 +1,5 @@
 from abc import ABC
-from typing import Optional
+from typing import Any, Dict, Optional
 
 class QueryBuilder(ABC):
     
@@ -9,7 +9,8 @@ class QueryBuilder(ABC):
             host: Optional[str] = None, 
             port: Optional[str] = None,
             user_name: Optional[str] = None, 
-            password: Optional[str] = None
+            password: Optional[str] = None,
+            pool_options: Optional[Dict[str, Any]] = None
         ):
         """
         Creates a new Postgres instance with the provided database connection details.
@@ -20,12 +21,44 @@ class QueryBuilder(ABC):
             port (Optional[str]): The port number to connect to.
             user_name (Optional[str]): The username for authentication.
             password (Optional[str]): The password for authentication.
+            pool_options (Optional[Dict[str, Any]]): Options for the connection pool shared by
+                every instance with the same connection details (min_size, max_size, timeout,
+                max_idle, ping_after, reset_query). Only used when the pool is first created.
 
         Returns:
             A Postgres instance configured with the specified connection details.
         """
         from Postgres import Postgres  # Local import inside the method
-        return Postgres(database, host, port, user_name, password)
+        return Postgres(database, host, port, user_name, password, pool_options)
+
+
+    @staticmethod
+    def AsyncPostgres(
+            database: Optional[str] = None,
+            host: Optional[str] = None, 
+            port: Optional[str] = None,
+            user_name: Optional[str] = None, 
+            password: Optional[str] = None,
+            pool_options: Optional[Dict[str, Any]] = None
+        ):
+        """
+        Creates a new AsyncPostgres instance, the asyncio version of Postgres, with the
+        provided database connection details.
+
+        Args:
+            database (Optional[str]): The name of the database.
+            host (Optional[str]): The hostname of the database server.
+            port (Optional[str]): The port number to connect to.
+            user_name (Optional[str]): The username for authentication.
+            password (Optional[str]): The password for authentication.
+            pool_options (Optional[Dict[str, Any]]): Options for the asynchronous connection pool
+                (min_size, max_size, timeout, max_idle).
+
+        Returns:
+            An AsyncPostgres instance configured with the specified connection details.
+        """
+        from AsyncPostgres import AsyncPostgres  # Local import inside the method
+        return AsyncPostgres(database, host, port, user_name, password, pool_options)
 
 
 # class SQL(QueryBuilder):
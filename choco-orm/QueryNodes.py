@@ -0,0 +1,396 @@
+from typing import Any, List, Optional, Tuple
+
+
+def escape_text(text: Any) -> str:
+    # literal '%' must not be taken as a placeholder by the driver
+    return str(text).replace('%', '%%')
+
+
+class Parameter:
+    """
+    Value sent to the database as a bound parameter instead of being written into the SQL text.
+    Rendered as its placeholder when the query is compiled.
+    """
+    __slots__ = ('value', 'placeholder')
+
+    def __init__(self, value: Any, placeholder: str = '%s'):
+        self.value = value
+        self.placeholder = placeholder
+
+    def compile(self, texts: List[str], params: List[Any]):
+        texts.append(self.placeholder)
+        params.append(self.value)
+
+    def __str__(self) -> str:
+        return self.placeholder
+
+    def __repr__(self) -> str:
+        return f'Parameter({self.value!r})'
+
+
+class Raw:
+    """
+    SQL text written into the query as it is.
+    """
+    __slots__ = ('text',)
+
+    def __init__(self, text: Any):
+        self.text = text
+
+    def compile(self, texts: List[str], params: List[Any]):
+        texts.append(escape_text(self.text))
+
+    def __repr__(self) -> str:
+        return f'Raw({self.text!r})'
+
+
+class Select:
+    """
+    The selected columns: SQL text, or nodes such as Aggregate.
+    """
+    __slots__ = ('fields',)
+
+    def __init__(self, fields: Optional[List[Any]] = None):
+        self.fields = fields if fields is not None else []
+
+    def compile(self, texts: List[str], params: List[Any]):
+        texts.append('SELECT')
+        if not self.fields:
+            texts.append('*')
+            return
+
+        columns = []
+        for field in self.fields:
+            if type(field) is str:
+                columns.append(escape_text(field))
+            else:
+                parts: List[str] = []
+                field.compile(parts, params)
+                columns.append(' '.join(parts))
+        texts.append(', '.join(columns))
+
+    def __repr__(self) -> str:
+        return f'Select({self.fields!r})'
+
+
+class Aggregate:
+    """
+    `function([DISTINCT] expression) [FILTER (WHERE conditions)] [AS alias]`.
+    """
+    __slots__ = ('function', 'expression', 'alias', 'filter', 'distinct')
+
+    def __init__(
+            self,
+            function: str,
+            expression: str,
+            alias: Optional[str] = None,
+            filter: Optional['BoolGroup'] = None,
+            distinct: bool = False
+        ):
+        self.function = function
+        self.expression = expression
+        self.alias = alias
+        self.filter = filter
+        self.distinct = distinct
+
+    def compile(self, texts: List[str], params: List[Any]):
+        distinct = 'DISTINCT ' if self.distinct else ''
+        texts.append(f'{self.function}({distinct}{escape_text(self.expression)})')
+        if self.filter:
+            texts.append('FILTER (WHERE')
+            self.filter.compile(texts, params)
+            texts.append(')')
+        if self.alias:
+            texts.append(f'AS {escape_text(self.alias)}')
+
+    def __repr__(self) -> str:
+        return f'Aggregate({self.function!r}, {self.expression!r}, alias={self.alias!r})'
+
+
+class From:
+    __slots__ = ('table', 'alias')
+
+    def __init__(self, table: str, alias: Optional[str] = None):
+        self.table = table
+        self.alias = alias
+
+    def compile(self, texts: List[str], params: List[Any]):
+        texts.append('FROM')
+        texts.append(escape_text(self.table))
+        if self.alias:
+            texts.append(escape_text(self.alias))
+
+    def __repr__(self) -> str:
+        return f'From({self.table!r}, {self.alias!r})'
+
+
+class Join:
+    """
+    `kind JOIN table ON conditions`, the conditions being a BoolGroup.
+    """
+    __slots__ = ('kind', 'table', 'on')
+
+    def __init__(self, kind: str, table: str, on: 'BoolGroup'):
+        self.kind = kind
+        self.table = table
+        self.on = on
+
+    def compile(self, texts: List[str], params: List[Any]):
+        texts.append(f'{self.kind} JOIN')
+        texts.append(escape_text(self.table))
+        texts.append('ON')
+        self.on.compile(texts, params)
+
+    def __repr__(self) -> str:
+        return f'Join({self.kind!r}, {self.table!r}, {self.on!r})'
+
+
+def compile_operand(node: Any, texts: List[str], params: List[Any]):
+    """Compiles a node used inside a condition, in parentheses when it is a group or a subquery."""
+    if type(node) is Predicate:
+        node.compile(texts, params)
+    elif isinstance(node, (BoolGroup, Subquery)):
+        texts.append('(')
+        node.compile(texts, params)
+        texts.append(')')
+    elif hasattr(node, 'compile'):
+        node.compile(texts, params)
+    else:
+        texts.append(escape_text(node))
+
+
+class Predicate:
+    """
+    `field operator value`, where the value is a Parameter, a Subquery, a BoolGroup or raw SQL.
+    """
+    __slots__ = ('field', 'operator', 'value')
+
+    def __init__(self, field: str, operator: str, value: Any):
+        self.field = field
+        self.operator = operator
+        self.value = value
+
+    def compile(self, texts: List[str], params: List[Any]):
+        value = self.value
+        if type(value) is Parameter:
+            # the usual case, written in one string
+            texts.append(f'{self.field} {self.operator}'.replace('%', '%%') + ' ' + value.placeholder)
+            params.append(value.value)
+        else:
+            texts.append(f'{self.field} {self.operator}'.replace('%', '%%'))
+            compile_operand(value, texts, params)
+
+    def __repr__(self) -> str:
+        return f'Predicate({self.field!r}, {self.operator!r}, {self.value!r})'
+
+
+class BoolGroup:
+    """
+    Conditions joined by AND / OR. Nested groups are compiled in parentheses.
+
+    Each condition is compiled when it is added (conditions are complete by then), so
+    adding one is an append and compiling the group is a single join, done once until
+    the group changes. A group shared by several queries, e.g. the filters of every
+    chunk_by() page, is only compiled once.
+    """
+    __slots__ = ('items', '_texts', '_params', '_text')
+
+    def __init__(self):
+        self.items: List[Tuple[Optional[str], Any]] = []
+        self._texts: List[str] = []
+        self._params: List[Any] = []
+        self._text: Optional[str] = None
+
+    def add(self, node: Any, connector: Optional[str] = 'AND') -> 'BoolGroup':
+        """
+        Appends a condition. The connector of the first condition is not written;
+        None juxtaposes the node without connector (raw SQL fragments).
+        """
+        texts = self._texts
+        if self.items and connector:
+            texts.append(connector)
+        self.items.append((connector, node))
+
+        value = getattr(node, 'value', None)
+        if type(value) is Parameter and type(node) is Predicate:
+            # inlined Predicate.compile, the usual case
+            texts.append(f'{node.field} {node.operator}'.replace('%', '%%') + ' ' + value.placeholder)
+            self._params.append(value.value)
+        else:
+            compile_operand(node, texts, self._params)
+        self._text = None
+        return self
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def compile(self, texts: List[str], params: List[Any]):
+        if self._text is None:
+            self._text = ' '.join(self._texts)
+        texts.append(self._text)
+        params.extend(self._params)
+
+    def __repr__(self) -> str:
+        return f'BoolGroup({self.items!r})'
+
+
+class CompiledSql:
+    """
+    SQL already compiled, e.g. from a Query object, with its `%s` placeholders and values.
+    """
+    __slots__ = ('sql', 'params')
+
+    def __init__(self, sql: str, params: Tuple[Any, ...] = ()):
+        self.sql = sql
+        self.params = params
+
+    def compile(self, texts: List[str], params: List[Any]):
+        texts.append(self.sql)
+        params.extend(self.params)
+
+    def __repr__(self) -> str:
+        return f'CompiledSql({self.sql!r})'
+
+
+class UnionQuery:
+    """
+    `left UNION [ALL] right`, the body of a recursive CTE.
+    """
+    __slots__ = ('left', 'right', 'all')
+
+    def __init__(self, left: Any, right: Any, all: bool = True):
+        self.left = left
+        self.right = right
+        self.all = all
+
+    def compile(self, texts: List[str], params: List[Any]):
+        self.left.compile(texts, params)
+        texts.append('UNION ALL' if self.all else 'UNION')
+        self.right.compile(texts, params)
+
+    def __repr__(self) -> str:
+        return f'UnionQuery({self.left!r}, {self.right!r}, all={self.all!r})'
+
+
+class CommonTable:
+    """
+    `name [(columns)] AS [[NOT] MATERIALIZED] (query)`, an entry of a WITH clause.
+    """
+    __slots__ = ('name', 'query', 'columns', 'materialized', 'recursive')
+
+    def __init__(
+            self,
+            name: str,
+            query: Any,
+            columns: Optional[List[str]] = None,
+            materialized: Optional[bool] = None,
+            recursive: bool = False
+        ):
+        self.name = name
+        self.query = query
+        self.columns = columns
+        self.materialized = materialized
+        self.recursive = recursive
+
+    def compile(self, texts: List[str], params: List[Any]):
+        texts.append(escape_text(self.name))
+        if self.columns:
+            texts.append('(' + ', '.join(escape_text(column) for column in self.columns) + ')')
+        texts.append('AS')
+        if self.materialized is not None:
+            texts.append('MATERIALIZED' if self.materialized else 'NOT MATERIALIZED')
+        texts.append('(')
+        self.query.compile(texts, params)
+        texts.append(')')
+
+    def __repr__(self) -> str:
+        return f'CommonTable({self.name!r}, {self.query!r})'
+
+
+class Subquery:
+    """
+    A SELECT statement. The built query is one too, compiled without the parentheses
+    a nested subquery gets.
+    """
+    __slots__ = ('ctes', 'select', 'from_', 'joins', 'where', 'group_by', 'having', 'order_by', 'limit', 'offset')
+
+    def __init__(self):
+        self.ctes: List[CommonTable] = []
+        self.select: Optional[Select] = None
+        self.from_: Optional[From] = None
+        self.joins: List[Join] = []
+        self.where = BoolGroup()
+        self.group_by: List[str] = []
+        self.having = BoolGroup()
+        self.order_by: List[str] = []
+        self.limit: Optional[int] = None
+        self.offset: Optional[int] = None
+
+    @property
+    def is_statement(self) -> bool:
+        """False while only conditions were added, i.e. the node is just a group of conditions."""
+        return self.select is not None or self.from_ is not None
+
+    def copy(self) -> 'Subquery':
+        """Shallow copy, sharing the child nodes."""
+        query = Subquery()
+        for name in self.__slots__:
+            setattr(query, name, getattr(self, name))
+        query.ctes = list(self.ctes)
+        query.joins = list(self.joins)
+        query.group_by = list(self.group_by)
+        query.order_by = list(self.order_by)
+        return query
+
+    def compile(self, texts: List[str], params: List[Any]):
+        if self.ctes:
+            recursive = any(cte.recursive for cte in self.ctes)
+            texts.append('WITH RECURSIVE' if recursive else 'WITH')
+            for index, cte in enumerate(self.ctes):
+                if index:
+                    texts.append(',')
+                cte.compile(texts, params)
+
+        (self.select or Select()).compile(texts, params)
+
+        if self.from_ is not None:
+            self.from_.compile(texts, params)
+
+        for join in self.joins:
+            join.compile(texts, params)
+
+        if self.where:
+            texts.append('WHERE')
+            self.where.compile(texts, params)
+
+        if self.group_by:
+            texts.append('GROUP BY')
+            texts.append(', '.join(escape_text(field) for field in self.group_by))
+
+        if self.having:
+            texts.append('HAVING')
+            self.having.compile(texts, params)
+
+        if self.order_by:
+            texts.append('ORDER BY')
+            texts.append(', '.join(escape_text(field) for field in self.order_by))
+
+        # bound as parameters so every page size / position shares the same query text
+        if self.limit is not None:
+            texts.append('LIMIT')
+            Parameter(self.limit).compile(texts, params)
+
+        if self.offset is not None:
+            texts.append('OFFSET')
+            Parameter(self.offset).compile(texts, params)
+
+    def to_sql(self) -> Tuple[str, Tuple[Any, ...]]:
+        """
+        Returns the SQL, with a `%s` placeholder for every bound value, and the values in order.
+        """
+        texts, params = [], []
+        self.compile(texts, params)
+        return ' '.join(texts), tuple(params)
+
+    def __repr__(self) -> str:
+        return f'Subquery({self.to_sql()[0]!r})'
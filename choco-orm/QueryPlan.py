@@ -0,0 +1,170 @@
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class QueryPlan:
+    """
+    Plan of a query as returned by `EXPLAIN (FORMAT JSON)`, with accessors for the
+    figures usually looked at first.
+
+    Actual rows, times, sort methods and buffers are only present when the plan was
+    captured with `analyze=True` (and `buffers=True`); the accessors return None or
+    skip the checks that need them otherwise.
+
+    Example:
+        plan = db.select(['country']).from_table('locations').where('population', '>', 1000).explain(analyze=True)
+        plan.total_cost, plan.estimated_rows, plan.actual_rows
+        plan.seq_scans(min_rows=10000), plan.sort_spills(), plan.misestimates()
+        print(plan)
+    """
+
+    def __init__(
+            self,
+            raw: List[Dict[str, Any]],
+            query: Optional[str] = None,
+            table_rows: Optional[Dict[str, float]] = None
+        ):
+        """
+        Args:
+            raw: The parsed JSON output of EXPLAIN.
+            query: The explained SQL, kept for reference.
+            table_rows: Rows of the tables read ('schema.table' -> pg_class.reltuples),
+                used by `seq_scans` when the plan was not analyzed.
+        """
+        self.raw = raw
+        self.query = query
+        self.root: Dict[str, Any] = raw[0]['Plan']
+        self.table_rows: Dict[str, float] = table_rows or {}
+
+    @property
+    def analyzed(self) -> bool:
+        return 'Actual Rows' in self.root
+
+    @property
+    def total_cost(self) -> float:
+        return self.root['Total Cost']
+
+    @property
+    def startup_cost(self) -> float:
+        return self.root['Startup Cost']
+
+    @property
+    def estimated_rows(self) -> int:
+        return self.root['Plan Rows']
+
+    @property
+    def actual_rows(self) -> Optional[int]:
+        return self.root.get('Actual Rows')
+
+    @property
+    def planning_time(self) -> Optional[float]:
+        """Planning time in milliseconds (analyze only)."""
+        return self.raw[0].get('Planning Time')
+
+    @property
+    def execution_time(self) -> Optional[float]:
+        """Execution time in milliseconds (analyze only)."""
+        return self.raw[0].get('Execution Time')
+
+    def nodes(self) -> Iterator[Tuple[int, Dict[str, Any]]]:
+        """
+        Yields (depth, node) for every node of the plan, parents before children.
+        """
+        stack = [(0, self.root)]
+        while stack:
+            depth, node = stack.pop()
+            yield depth, node
+            for child in reversed(node.get('Plans', ())):
+                stack.append((depth + 1, child))
+
+    def relation(self, node: Dict[str, Any]) -> Optional[str]:
+        """'schema.table' read by a scan node (the schema is only known with VERBOSE)."""
+        if 'Relation Name' not in node:
+            return None
+        if 'Schema' in node:
+            return f"{node['Schema']}.{node['Relation Name']}"
+        return node['Relation Name']
+
+    def seq_scan_relations(self) -> List[str]:
+        """Tables read by sequential scans."""
+        relations = (self.relation(node) for _, node in self.nodes() if node['Node Type'] == 'Seq Scan')
+        return list(dict.fromkeys(relation for relation in relations if relation))
+
+    def _scanned_rows(self, node: Dict[str, Any]) -> float:
+        """
+        Rows read by a scan node, before its filter: the actual rows plus the rows removed by
+        the filter over all loops when analyzed, the table size otherwise.
+        """
+        if 'Actual Rows' in node:
+            return (node['Actual Rows'] + node.get('Rows Removed by Filter', 0)) * node.get('Actual Loops', 1)
+
+        table_rows = self.table_rows.get(self.relation(node), -1)
+        if table_rows >= 0:
+            return table_rows
+        # table never analyzed (reltuples = -1) or size unknown: the output estimate is all there is
+        return node['Plan Rows']
+
+    def seq_scans(self, min_rows: int = 10000) -> List[Dict[str, Any]]:
+        """
+        Sequential scans reading at least `min_rows` rows, i.e. large tables read without an
+        index, however selective their filter. The rows are counted before the filter: actual
+        rows plus rows removed by the filter when analyzed, the table size otherwise.
+        """
+        return [
+            node for _, node in self.nodes()
+            if node['Node Type'] == 'Seq Scan' and self._scanned_rows(node) >= min_rows
+        ]
+
+    def sort_spills(self) -> List[Dict[str, Any]]:
+        """
+        Sorts that did not fit in work_mem and spilled to disk (analyze only).
+        """
+        return [
+            node for _, node in self.nodes()
+            if node['Node Type'] in ('Sort', 'Incremental Sort') and node.get('Sort Space Type') == 'Disk'
+        ]
+
+    def misestimates(self, factor: float = 10.0) -> List[Tuple[Dict[str, Any], int, int]]:
+        """
+        Nodes whose actual row count is off from the planner estimate by more than
+        `factor` times in either direction (analyze only).
+
+        Returns:
+            A list of (node, estimated rows, actual rows per loop).
+        """
+        result = []
+        for _, node in self.nodes():
+            if 'Actual Rows' not in node or node.get('Actual Loops', 1) == 0:
+                continue
+            estimated, actual = node['Plan Rows'], node['Actual Rows']
+            if max(estimated, actual) > factor * max(min(estimated, actual), 1):
+                result.append((node, estimated, actual))
+        return result
+
+    def _describe(self, node: Dict[str, Any]) -> str:
+        text = node['Node Type']
+        if 'Relation Name' in node:
+            text += f" on {self.relation(node)}"
+            if node.get('Alias') not in (None, node['Relation Name']):
+                text += f" {node['Alias']}"
+        elif 'Function Name' in node:
+            text += f" on {node['Function Name']}"
+        if 'Index Name' in node:
+            text += f" using {node['Index Name']}"
+
+        text += f" (cost={node['Startup Cost']:.2f}..{node['Total Cost']:.2f} rows={node['Plan Rows']})"
+        if 'Actual Rows' in node:
+            text += f" (actual time={node['Actual Total Time']:.3f} rows={node['Actual Rows']} loops={node['Actual Loops']})"
+        if 'Sort Method' in node:
+            text += f" [{node['Sort Method']}, {node.get('Sort Space Type')}: {node.get('Sort Space Used')}kB]"
+        return text
+
+    def __str__(self) -> str:
+        lines = ['  ' * depth + ('-> ' if depth else '') + self._describe(node) for depth, node in self.nodes()]
+        if self.planning_time is not None:
+            lines.append(f'Planning Time: {self.planning_time:.3f} ms')
+        if self.execution_time is not None:
+            lines.append(f'Execution Time: {self.execution_time:.3f} ms')
+        return '\n'.join(lines)
+
+    def __repr__(self) -> str:
+        return f'QueryPlan(total_cost={self.total_cost}, estimated_rows={self.estimated_rows}, actual_rows={self.actual_rows})'
@@ -1,73 +1,89 @@
+import threading
 from abc import ABC, abstractmethod
 from typing import Any, List, Union, Tuple, Callable, Optional
 
 from QueryBuilder import QueryBuilder
+from QueryNodes import Subquery
+
+
+class PerThread:
+    """
+    Instance attribute holding one value per thread, so threads sharing a builder instance
+    never see each other's query being built.
+
+    Args:
+        default: Value in a thread that did not set the attribute yet; a callable is called
+            with the instance to create it.
+    """
+
+    def __init__(self, default: Any = None):
+        self.default = default
+
+    def __set_name__(self, owner: type, name: str):
+        self.name = name
+
+    def __get__(self, instance: Any, owner: type = None) -> Any:
+        if instance is None:
+            return self
+        state = instance._thread_state
+        try:
+            return getattr(state, self.name)
+        except AttributeError:
+            value = self.default(instance) if callable(self.default) else self.default
+            setattr(state, self.name, value)
+            return value
+
+    def __set__(self, instance: Any, value: Any):
+        setattr(instance._thread_state, self.name, value)
+
 
 class QuerySql(QueryBuilder):
+    # Builder state, one per thread
+    from_schema_name = PerThread(lambda instance: [])
+    _query = PerThread(lambda instance: instance.new_query())
+    _scope = PerThread(lambda instance: instance._query)
+    _show_query = PerThread(False)
+    _return_query = PerThread(False)
+    # Result shape, set by rows_only() and co., sticky within the thread
+    _rows_only = PerThread(False)
+    _rows_with_headers = PerThread(False)
+    _rows_are_dictionary = PerThread(False)
+
     def __init__(self):
-        
+        self._thread_state = threading.local()
+
         self.database_source = None
         self.has_schema: bool = False
 
         # self.schema_name: str = None
         self.from_schema_name = []
-        self.with_query = []
-        self.selected_fields = []
-        self.from_table_name = []
-        self.joins_conditions = []
-        self.where_conditions = ['2']
-        self.group_by_conditions = []
-        self.having_conditions = []
-        self.order_by_conditions = []
-        self.limit_value: int = None
-        self.offset_value: int = None
+        self.new_query()
 
         self._show_query: bool = False
         self._return_query: bool = False
 
         self.query: str = None
 
-        # SUBQUERY
-        self._current_attribute = None
-        self._has_a_subquery: bool = False
-        self._is_in_subquery: bool = False
-        self.subquery_depth = 0 # LEVEL DA SUBQUERY
-        self._is_start_subquery: bool = False
-        self.subquery_args = []
-        self.current_subquery = []
-
-        self.is_anonymous_subquery: bool = False
-
         # Results type
         self._rows_only = False
         self._rows_with_headers = False
         self._rows_are_dictionary = False
 
-        self._attributes_by_function = {
-            'WHERE': 'where_conditions',
-            'SELECT': 'selected_fields',
-            'WITH': 'with_query',
-            'SUBQUERY': 'current_subquery'
-        }
+    def new_query(self) -> Subquery:
+        """
+        Starts an empty query tree. Builder calls add nodes to the innermost scope: the
+        query itself, or the subquery whose lambdas are running.
+        """
+        self._query = Subquery()
+        self._scope = self._query
+        return self._query
 
     def reset(self):
         self.database_source = None
         self.has_schema: bool = False
         self.schema_name: str = None
-        self.with_query = []
-        self.selected_fields = []
         self.table_name: str = None
-        self.joins_conditions = []
-        self.where_conditions = []
-        self.group_by_conditions = []
-        self.having_conditions = []
-        self.order_by_conditions = []
-        self.limit_value: int = None
-        self.offset_value: int = None
-        self._is_start_subquery: bool = False
-        self._is_end_subquery: bool = False
-        self._current_attribute = ''
- 
+        self.new_query()
 
         self.query: str = None
 
@@ -90,11 +106,11 @@ class QuerySql(QueryBuilder):
         return self
     
     def limit(self, limit_value: int):
-        self.limit_value = limit_value
+        self._scope.limit = limit_value
         return self
     
     def offset(self, offset_value: int):
-        self.offset_value = offset_value
+        self._scope.offset = offset_value
         return self
     
 
@@ -145,9 +161,9 @@ class QuerySql(QueryBuilder):
     # def first(self) -> 'QueryBuilder':
     #     pass
 
-    @abstractmethod
-    def insert_many (self, *args: Any) -> 'QueryBuilder':
-        pass
+    # @abstractmethod
+    # def insert_many (self, *args: Any) -> 'QueryBuilder':
+    #     pass
 
     # @abstractmethod
     # def update (self) -> 'QueryBuilder':
@@ -0,0 +1,204 @@
+import json
+import math
+import re
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from ResultCache import estimate_rows_size
+
+
+def normalize_query(query: str) -> str:
+    """
+    Fingerprint of a query: the SQL with its placeholders, whitespace collapsed and
+    without the trailing semicolon. Values are bound parameters, so the same query
+    shape always gives the same fingerprint.
+    """
+    return re.sub(r'\s+', ' ', query).strip().rstrip(';').rstrip()
+
+
+# Rows measured by estimate_result_size, the size of the others is extrapolated from them.
+RESULT_SIZE_SAMPLE = 64
+
+
+def estimate_result_size(results: Any) -> int:
+    """
+    Approximate memory of a query result: a list of rows, or the Columns of rows_as_columns().
+
+    Only RESULT_SIZE_SAMPLE rows, spread over the result, are measured; their mean size is
+    taken for every row, so the cost does not grow with the number of rows.
+    """
+    if isinstance(results, dict):
+        size = sys.getsizeof(results)
+        for values in results.values():
+            size += getattr(values, 'nbytes', None) or sys.getsizeof(values)
+        return size
+
+    count = len(results)
+    if count <= RESULT_SIZE_SAMPLE:
+        return estimate_rows_size(results)
+
+    step = count / RESULT_SIZE_SAMPLE
+    sample = [results[int(index * step)] for index in range(RESULT_SIZE_SAMPLE)]
+    rows_size = estimate_rows_size(sample) - sys.getsizeof(sample)
+    return sys.getsizeof(results) + rows_size * count // RESULT_SIZE_SAMPLE
+
+
+class QueryEvent:
+    """
+    Measurements of one query, passed to every query hook once the query is done.
+
+    Times are in seconds. `result_size` is an estimate of the memory of the rows
+    returned, `cached` tells the rows came from the result cache and `error` holds
+    the exception when the query failed.
+    """
+    __slots__ = (
+        'query', 'params', 'operation', 'compile_time', 'acquire_time', 'execute_time',
+        'fetch_time', 'row_count', 'result_size', 'cached', 'error', '_fingerprint', '_clock',
+    )
+
+    def __init__(self, operation: str = 'get', query: Optional[str] = None, params: Optional[Tuple[Any, ...]] = None):
+        self.query = query
+        self.params = params
+        self.operation = operation
+        self.compile_time = 0.0
+        self.acquire_time = 0.0
+        self.execute_time = 0.0
+        self.fetch_time = 0.0
+        self.row_count = 0
+        self.result_size = 0
+        self.cached = False
+        self.error: Optional[BaseException] = None
+        self._fingerprint = None
+        self._clock = time.perf_counter()
+
+    def lap(self) -> float:
+        """Returns the seconds elapsed since the previous lap (or the creation of the event)."""
+        now = time.perf_counter()
+        elapsed = now - self._clock
+        self._clock = now
+        return elapsed
+
+    @property
+    def fingerprint(self) -> str:
+        if self._fingerprint is None:
+            self._fingerprint = normalize_query(self.query or '')
+        return self._fingerprint
+
+    @property
+    def total_time(self) -> float:
+        return self.compile_time + self.acquire_time + self.execute_time + self.fetch_time
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            'fingerprint': self.fingerprint,
+            'query': self.query,
+            'operation': self.operation,
+            'compile_time': self.compile_time,
+            'acquire_time': self.acquire_time,
+            'execute_time': self.execute_time,
+            'fetch_time': self.fetch_time,
+            'total_time': self.total_time,
+            'row_count': self.row_count,
+            'result_size': self.result_size,
+            'cached': self.cached,
+            'error': repr(self.error) if self.error else None,
+        }
+
+    def __repr__(self) -> str:
+        return f'QueryEvent({self.fingerprint!r}, total_time={self.total_time:.6f}, rows={self.row_count})'
+
+
+class QueryStatistics:
+    """
+    Client-side aggregate of query events per fingerprint, in the spirit of pg_stat_statements.
+
+    Register it as a query hook; it keeps, for every query shape, the number of calls,
+    errors, result cache hits, total/mean/max latency, p95/p99 latency (over the last `sample_size` calls)
+    and the rows returned.
+
+    Example:
+        stats = QueryStatistics()
+        Postgres.add_global_query_hook(stats)
+        ...
+        for entry in stats.dump()[:10]:
+            print(entry['fingerprint'], entry['calls'], entry['mean_time'], entry['p99_time'])
+    """
+
+    def __init__(self, sample_size: int = 1024):
+        self.sample_size = sample_size
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, event: QueryEvent):
+        self.record(event)
+
+    def record(self, event: QueryEvent):
+        total_time = event.total_time
+        with self._lock:
+            entry = self._entries.get(event.fingerprint)
+            if entry is None:
+                entry = {
+                    'calls': 0,
+                    'errors': 0,
+                    'cached': 0,
+                    'rows': 0,
+                    'result_size': 0,
+                    'total_time': 0.0,
+                    'max_time': 0.0,
+                    'compile_time': 0.0,
+                    'acquire_time': 0.0,
+                    'execute_time': 0.0,
+                    'fetch_time': 0.0,
+                    'samples': deque(maxlen=self.sample_size),
+                }
+                self._entries[event.fingerprint] = entry
+
+            entry['calls'] += 1
+            entry['errors'] += 1 if event.error else 0
+            entry['cached'] += 1 if event.cached else 0
+            entry['rows'] += event.row_count
+            entry['result_size'] += event.result_size
+            entry['total_time'] += total_time
+            entry['max_time'] = max(entry['max_time'], total_time)
+            entry['compile_time'] += event.compile_time
+            entry['acquire_time'] += event.acquire_time
+            entry['execute_time'] += event.execute_time
+            entry['fetch_time'] += event.fetch_time
+            entry['samples'].append(total_time)
+
+    @staticmethod
+    def _percentile(sorted_samples: List[float], percentile: float) -> float:
+        if not sorted_samples:
+            return 0.0
+        rank = max(0, math.ceil(percentile / 100 * len(sorted_samples)) - 1)
+        return sorted_samples[rank]
+
+    def dump(self, order_by: str = 'total_time') -> List[Dict[str, Any]]:
+        """
+        Returns one dict per fingerprint, sorted by `order_by` (descending).
+        """
+        with self._lock:
+            entries = [(fingerprint, dict(entry), sorted(entry['samples'])) for fingerprint, entry in self._entries.items()]
+
+        result = []
+        for fingerprint, entry, samples in entries:
+            del entry['samples']
+            entry['fingerprint'] = fingerprint
+            entry['mean_time'] = entry['total_time'] / entry['calls']
+            entry['mean_rows'] = entry['rows'] / entry['calls']
+            entry['p95_time'] = self._percentile(samples, 95)
+            entry['p99_time'] = self._percentile(samples, 99)
+            result.append(entry)
+
+        result.sort(key=lambda entry: entry[order_by], reverse=True)
+        return result
+
+    def dumps(self, order_by: str = 'total_time', indent: Optional[int] = 2) -> str:
+        return json.dumps(self.dump(order_by), indent=indent)
+
+    def reset(self):
+        with self._lock:
+            self._entries.clear()
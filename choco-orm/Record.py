@@ -0,0 +1,94 @@
+import keyword
+import operator
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from LRUCache import LRUCache
+
+
+class Record(tuple):
+    """
+    Tuple-backed result row with access by position, by column name and by attribute.
+
+    One subclass is created per result shape (see `record_class`), holding the column
+    names once for every row, so a row costs about the same memory as a plain tuple.
+
+    Example:
+        row.country, row['country'], row[0], row.get('missing'), row.as_dict()
+    """
+    __slots__ = ()
+
+    _fields: Tuple[str, ...] = ()
+    _index: Dict[str, int] = {}
+
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            try:
+                key = self._index[key]
+            except KeyError:
+                raise KeyError(key) from None
+        return tuple.__getitem__(self, key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        index = self._index.get(key)
+        return default if index is None else tuple.__getitem__(self, index)
+
+    def keys(self) -> Tuple[str, ...]:
+        return self._fields
+
+    def values(self) -> Tuple[Any, ...]:
+        return tuple(self)
+
+    def items(self) -> Iterator[Tuple[str, Any]]:
+        return zip(self._fields, self)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return dict(zip(self._fields, self))
+
+    def __repr__(self) -> str:
+        values = ', '.join(f'{name}={value!r}' for name, value in zip(self._fields, self))
+        return f'Record({values})'
+
+    def __reduce__(self):
+        return (_rebuild_record, (self._fields, tuple(self)))
+
+
+_record_classes = LRUCache(max_size=256)
+
+
+def record_class(column_names: Sequence[str]) -> type:
+    """
+    Returns the Record subclass for a list of column names, creating it on first use.
+    Classes are cached, so queries with the same columns reuse the same class.
+    """
+    column_names = tuple(column_names)
+    cls = _record_classes.get(column_names)
+    if cls is not None:
+        return cls
+
+    namespace = {
+        '__slots__': (),
+        '_fields': column_names,
+        # with duplicated column names the first one wins, as in cursor.description
+        '_index': {name: index for index, name in reversed(list(enumerate(column_names)))},
+    }
+    for index, name in enumerate(column_names):
+        if (
+            name.isidentifier()
+            and not keyword.iskeyword(name)
+            and not name.startswith('_')
+            and not hasattr(Record, name)
+            and name not in namespace
+        ):
+            namespace[name] = property(operator.itemgetter(index), doc=f'Column {name!r}')
+
+    cls = type('Record', (Record,), namespace)
+    _record_classes.put(column_names, cls)
+    return cls
+
+
+def _rebuild_record(column_names: Tuple[str, ...], values: Tuple[Any, ...]) -> Record:
+    return record_class(column_names)(values)
+
+
+def to_records(column_names: Sequence[str], rows: List[Tuple[Any, ...]]) -> List[Record]:
+    return list(map(record_class(column_names), rows))
@@ -0,0 +1,90 @@
+import sys
+import threading
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set
+
+from LRUCache import LRUCache
+
+
+def estimate_rows_size(rows: List[Any]) -> int:
+    """
+    Approximate memory used by a list of result rows (tuples or dictionaries).
+    """
+    size = sys.getsizeof(rows)
+    for row in rows:
+        size += sys.getsizeof(row)
+        values = row.values() if isinstance(row, dict) else row
+        for value in values:
+            size += sys.getsizeof(value)
+    return size
+
+
+class ResultCache:
+    """
+    Cache of query results keyed by the compiled SQL, its parameters and the result shape.
+
+    Bounded by number of entries and by approximate memory, evicting the least recently
+    used results. Each entry remembers the tables its query reads, so a write to a table
+    through the ORM drops every cached result that depends on it.
+    """
+
+    def __init__(self, max_entries: int = 1024, max_bytes: int = 64 * 1024 * 1024):
+        """
+        Args:
+            max_entries (int): Maximum number of cached results.
+            max_bytes (int): Maximum approximate memory of the cached results.
+        """
+        self._entries = LRUCache(max_entries, on_evict=self._evicted, max_bytes=max_bytes, sizeof=estimate_rows_size)
+        self._keys_by_table: Dict[str, Set[Hashable]] = {}
+        self._tables_by_key: Dict[Hashable, Iterable[str]] = {}
+        self._lock = threading.RLock()
+        self.invalidations = 0
+
+    def get(self, key: Hashable) -> Optional[List[Any]]:
+        return self._entries.get(key)
+
+    def put(self, key: Hashable, rows: List[Any], tables: Iterable[str], ttl: Optional[float] = None):
+        tables = frozenset(tables)
+        with self._lock:
+            self._forget(key)
+            self._tables_by_key[key] = tables
+            for table in tables:
+                self._keys_by_table.setdefault(table, set()).add(key)
+            self._entries.put(key, rows, ttl)
+
+    def _evicted(self, key: Hashable, _rows: Any):
+        # called by the LRU outside its lock, the key may have been stored again meanwhile
+        with self._lock:
+            if key not in self._entries:
+                self._forget(key)
+
+    def _forget(self, key: Hashable):
+        with self._lock:
+            for table in self._tables_by_key.pop(key, ()):
+                keys = self._keys_by_table.get(table)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self._keys_by_table[table]
+
+    def invalidate_table(self, table_name: str) -> int:
+        """
+        Drops every cached result reading the table ('schema.table'). Returns how many were dropped.
+        """
+        with self._lock:
+            keys = list(self._keys_by_table.get(table_name, ()))
+            for key in keys:
+                self._entries.pop(key)
+                self._forget(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_table.clear()
+            self._tables_by_key.clear()
+
+    def info(self) -> Dict[str, Any]:
+        info = self._entries.info()
+        info['invalidations'] = self.invalidations
+        return info
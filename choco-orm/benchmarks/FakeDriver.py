@@ -0,0 +1,141 @@
+import datetime
+from typing import Any, List, Optional, Tuple
+
+from psycopg2 import extensions
+
+
+# (name, type oid) of the columns returned by every query
+FAKE_COLUMNS = (
+    ('id', 23),
+    ('country', 1043),
+    ('population', 20),
+    ('created', 1082),
+)
+
+
+def fake_rows(count: int) -> List[Tuple[Any, ...]]:
+    created = datetime.date(2024, 1, 1)
+    return [(index, f'country {index % 200}', index * 1000, created) for index in range(1, count + 1)]
+
+
+class FakeCursor:
+    """
+    DB-API cursor returning the same in-memory rows for every query, so the library
+    code around the driver can be measured without a database or a network.
+    """
+
+    def __init__(self, connection: 'FakeConnection', name: Optional[str] = None):
+        self.connection = connection
+        self.name = name
+        self.itersize = 2000
+        self.description = None
+        self.rowcount = -1
+        self._rows: List[Tuple[Any, ...]] = []
+        self._position = 0
+
+    def __enter__(self) -> 'FakeCursor':
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def execute(self, query: Any, params: Optional[Tuple[Any, ...]] = None):
+        self.connection.executed += 1
+        self.connection.queries.append((query, params))
+        self.description = tuple((name, oid, None, None, None, None, None) for name, oid in FAKE_COLUMNS)
+        self._rows = self.connection.rows
+        self._position = 0
+        # like psycopg2, a named (server-side) cursor only counts the rows of its last fetch
+        self.rowcount = -1 if self.name else len(self._rows)
+
+    def copy_expert(self, query: str, file: Any, size: int = 8192):
+        """Reads everything a COPY ... FROM STDIN would send, kept in `connection.copied`."""
+        self.connection.queries.append((query, None))
+        self.connection.copied.append(file.read())
+        self.rowcount = -1
+
+    def fetchone(self) -> Optional[Tuple[Any, ...]]:
+        rows = self.fetchmany(1)
+        return rows[0] if rows else None
+
+    def fetchmany(self, size: int = 1) -> List[Tuple[Any, ...]]:
+        rows = self._rows[self._position:self._position + size]
+        self._position += len(rows)
+        if self.name:
+            self.rowcount = len(rows)
+        return rows
+
+    def fetchall(self) -> List[Tuple[Any, ...]]:
+        rows = self._rows[self._position:]
+        self._position = len(self._rows)
+        if self.name:
+            self.rowcount = len(rows)
+        return rows
+
+    def close(self):
+        self._rows = []
+
+
+class FakeConnection:
+    """
+    The part of a psycopg2 connection used by PostgresPool and Postgres.
+    """
+
+    def __init__(self, rows: List[Tuple[Any, ...]]):
+        self.rows = rows
+        self.closed = 0
+        self.encoding = 'UTF8'
+        self.executed = 0
+        self.queries: List[Tuple[Any, Any]] = []  # (query, params) of every execute()
+        self.copied: List[str] = []                # data sent by every COPY FROM STDIN
+
+    def cursor(self, name: Optional[str] = None) -> FakeCursor:
+        return FakeCursor(self, name)
+
+    def get_transaction_status(self) -> int:
+        return extensions.TRANSACTION_STATUS_IDLE
+
+    def poll(self) -> int:
+        # asynchronous connection API: every operation is already complete
+        return extensions.POLL_OK
+
+    def set_session(self, **options: Any):
+        pass
+
+    def commit(self):
+        pass
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = 1
+
+
+class FakeDriver:
+    """
+    Connection factory for `pool_options={'connect': ...}` returning FakeConnections
+    whose queries all return `rows`.
+
+    Example:
+        driver = FakeDriver(fake_rows(10000))
+        db = QueryBuilder.Postgres('fake', 'localhost', 5432, 'fake', 'fake', pool_options={'connect': driver})
+    """
+
+    def __init__(self, rows: List[Tuple[Any, ...]]):
+        self.rows = rows
+
+    def __call__(self, dsn: str) -> FakeConnection:
+        return FakeConnection(self.rows)
+
+
+class FakeAsyncDriver(FakeDriver):
+    """
+    FakeDriver for the `connect` option of AsyncPostgres pools, a coroutine function.
+
+    Example:
+        db = QueryBuilder.AsyncPostgres('fake', 'localhost', 5432, 'fake', 'fake', pool_options={'connect': FakeAsyncDriver([])})
+    """
+
+    async def __call__(self, dsn: str) -> FakeConnection:
+        return FakeConnection(self.rows)
@@ -0,0 +1,227 @@
+"""
+Benchmarks of the query builder and of result materialization.
+
+Run from the choco-orm directory:
+
+    python -m benchmarks.run                                   # fake driver, no database needed
+    python -m benchmarks.run --postgres                        # local Postgres from the .env settings
+    python -m benchmarks.run --output after.json --compare before.json
+
+Every case reports the best and the median time per call (microseconds) over `--repeat`
+rounds; result shape cases also report the time per row. Results are written as JSON,
+and `--compare` prints the ratio against a previous run to spot regressions.
+"""
+import argparse
+import datetime
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import timeit
+from typing import Any, Callable, Dict, Optional
+
+from Postgres import Postgres
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver, fake_rows
+
+
+FIELDS = ['id', 'country', 'population', 'created']
+
+# Rows produced by generate_series when benchmarking against a real database
+POSTGRES_ROWS_QUERY = (
+    "SELECT g AS id, 'country ' || (g % 200) AS country, g * 1000 AS population, current_date AS created "
+    "FROM generate_series(1, %s) g;"
+)
+
+
+def measure(function: Callable[[], Any], number: int, repeat: int) -> Dict[str, float]:
+    """Runs `function` `number` times per round, returns the best and median microseconds per call."""
+    function()  # warm up caches and the connection pool
+    rounds = timeit.Timer(function).repeat(repeat=repeat, number=number)
+    per_call = [elapsed / number * 1e6 for elapsed in rounds]
+    return {
+        'number': number,
+        'repeat': repeat,
+        'best_us': min(per_call),
+        'median_us': statistics.median(per_call),
+    }
+
+
+def clear_builder(db: Postgres):
+    # drops the built state without compiling it, so only the builder calls are measured
+    db.reset()
+
+
+def nested_subquery(db: Postgres, depth: int):
+    if depth == 0:
+        return db.where('population', '>', 1000)
+    return db.subquery(
+        lambda: db.where('country', '=', 'Brazil'),
+        lambda: nested_subquery(db, depth - 1),
+        combinator='AND'
+    )
+
+
+def build_nested_query(db: Postgres, depth: int) -> Postgres:
+    return (
+        db.select(['country'])
+        .from_table('locations')
+        .where_subquery(
+            'population', 'IN',
+            lambda: db.select(['population']),
+            lambda: db.from_table('locations'),
+            lambda: db.where('country', '=', 'Brazil'),
+            lambda: nested_subquery(db, depth)
+        )
+    )
+
+
+def build_where_chain(db: Postgres, conditions: int) -> Postgres:
+    db.select(FIELDS).from_table('locations')
+    for index in range(conditions):
+        if index % 2:
+            db.where_or('population', '>', index)
+        else:
+            db.where('country', '=', f'country {index}')
+    return db
+
+
+def builder_cases(db: Postgres) -> Dict[str, Callable[[], Any]]:
+    ids = list(range(10000))
+
+    def case(build: Callable[[], Any]) -> Callable[[], Any]:
+        def run():
+            build()
+            clear_builder(db)
+        return run
+
+    return {
+        'builder.select': case(lambda: db.select(FIELDS)),
+        'builder.select_from_where': case(
+            lambda: db.select(FIELDS).from_table('locations').where('country', '=', 'Brazil')
+        ),
+        'builder.where_chain_20': case(lambda: build_where_chain(db, 20)),
+        'builder.where_chain_200': case(lambda: build_where_chain(db, 200)),
+        'builder.where_in_10000': case(lambda: db.from_table('locations').where_in('id', ids)),
+        'builder.nested_subquery_5': case(lambda: build_nested_query(db, 5)),
+    }
+
+
+def compile_cases(db: Postgres) -> Dict[str, Callable[[], Any]]:
+    """
+    get_query.*: build + get_query() compile of a new query tree on every call.
+    compile.*.unchanged: compiling the same tree again, served from the compiled condition groups.
+    """
+    def built_and_compiled(build: Callable[[], Any]) -> Callable[[], Any]:
+        def run():
+            build()
+            return db.get_query(parameterized=True).get()
+        return run
+
+    def recompiled(build: Callable[[], Any]) -> Callable[[], Any]:
+        other = QueryBuilder.Postgres('choco_benchmark', 'localhost', 5432, 'benchmark', 'benchmark')
+        build(other)
+        return other._compile_query
+
+    cases = {}
+    for name, build in (
+        ('where_chain_20', lambda target: build_where_chain(target, 20)),
+        ('where_chain_200', lambda target: build_where_chain(target, 200)),
+        ('nested_subquery_5', lambda target: build_nested_query(target, 5)),
+    ):
+        cases[f'get_query.{name}'] = built_and_compiled(lambda build=build: build(db))
+        cases[f'compile.{name}.unchanged'] = recompiled(build)
+    return cases
+
+
+def result_cases(db: Postgres, query: str, params: Optional[tuple]) -> Dict[str, Callable[[], Any]]:
+    return {
+        'results.only_rows': lambda: db.results_only_rows(query, params),
+        'results.with_headers': lambda: db.results_with_headers(query, params),
+        'results.with_dictionary': lambda: db.results_with_dictionary(query, params),
+        'results.with_records': lambda: db.results_with_records(query, params),
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results: Dict[str, Dict[str, float]], previous_path: str):
+    with open(previous_path) as file:
+        previous = json.load(file)['results']
+
+    print(f"\n{'case':45} {'before':>12} {'after':>12} {'ratio':>8}")
+    for name, result in results.items():
+        if name not in previous:
+            continue
+        before, after = previous[name]['best_us'], result['best_us']
+        print(f"{name:45} {before:12.2f} {after:12.2f} {after / before:8.2f}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--postgres', action='store_true', help='run the result cases on the Postgres of the .env settings')
+    parser.add_argument('--rows', type=int, default=10000, help='rows returned by the result cases')
+    parser.add_argument('--repeat', type=int, default=7, help='measured rounds per case')
+    parser.add_argument('--number', type=int, default=200, help='calls per round of the builder cases')
+    parser.add_argument('--output', default='benchmark_results.json', help='JSON file to write')
+    parser.add_argument('--compare', help='previous JSON results to compare with')
+    args = parser.parse_args(argv)
+
+    if args.postgres:
+        from tests.Config import PostgresConfig
+        db = QueryBuilder.Postgres(**PostgresConfig().get_config())
+        query, params = POSTGRES_ROWS_QUERY, (args.rows,)
+        driver = 'postgres'
+    else:
+        db = QueryBuilder.Postgres(
+            'choco_benchmark', 'localhost', 5432, 'benchmark', 'benchmark',
+            pool_options={'connect': FakeDriver(fake_rows(args.rows))}
+        )
+        query, params = 'SELECT id, country, population, created FROM public.locations;', None
+        driver = 'fake'
+
+    results = {}
+    for name, function in {**builder_cases(db), **compile_cases(db)}.items():
+        results[name] = measure(function, args.number, args.repeat)
+
+    # result cases return args.rows rows per call, a few calls per round are enough
+    for name, function in result_cases(db, query, params).items():
+        result = measure(function, max(1, args.number // 100), args.repeat)
+        result['rows'] = args.rows
+        result['best_us_per_row'] = result['best_us'] / args.rows
+        results[name] = result
+
+    for name, result in results.items():
+        per_row = f"  ({result['best_us_per_row']:.3f} us/row)" if 'rows' in result else ''
+        print(f"{name:45} best {result['best_us']:12.2f} us  median {result['median_us']:12.2f} us{per_row}")
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': sys.version.split()[0],
+            'platform': platform.platform(),
+            'driver': driver,
+            'rows': args.rows,
+        },
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == '__main__':
+    main()
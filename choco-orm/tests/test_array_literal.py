@@ -0,0 +1,52 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+
+from PostgresCopy import array_literal
+from QueryBuilder import QueryBuilder
+
+
+@pytest.fixture
+def db():
+    return QueryBuilder.Postgres('choco_test', 'localhost', 5432, 'test', 'test')
+
+
+def test_scalars():
+    assert array_literal([1, 2.5, Decimal('3.10'), None, True, False]) == '{1,2.5,3.10,NULL,t,f}'
+    assert array_literal([]) == '{}'
+
+
+def test_strings_are_quoted_and_escaped():
+    assert array_literal(['a b', 'say "hi"', 'back\\slash', 'NULL', '', '{x,y}']) == \
+        '{"a b","say \\"hi\\"","back\\\\slash","NULL","","{x,y}"}'
+
+
+def test_dates_uuids_nested_lists_and_dicts():
+    value = uuid.UUID('12345678-1234-5678-1234-567812345678')
+    assert array_literal([datetime.date(2024, 1, 2), value]) == f'{{"2024-01-02","{value}"}}'
+    assert array_literal([[1, 2], (3, None)]) == '{{1,2},{3,NULL}}'
+    assert array_literal([{'name': 'a "b"'}]) == '{"{\\"name\\": \\"a \\\\\\"b\\\\\\"\\"}"}'
+
+
+def test_values_without_a_text_form():
+    assert array_literal([b'bytes']) is None
+    assert array_literal([[1], [object()]]) is None
+
+
+def test_long_where_in_lists_are_sent_as_one_literal(db):
+    db.where_in_literal_threshold = 3
+
+    query = db.from_table('t').where_in('id', [1, 2]).build()
+    assert query.sql == 'SELECT * FROM public.t WHERE id = ANY (%s)'
+    assert query.params == ([1, 2],)
+
+    query = db.from_table('t').where_in('name', ['a', 'b', 'c"']).build()
+    assert query.sql == 'SELECT * FROM public.t WHERE name = ANY (%s)'
+    assert query.params == ('{"a","b","c\\""}',)
+
+    # bytes have no literal form, the list is adapted by psycopg2 instead
+    query = db.from_table('t').where('data', 'NOT IN', [b'a', b'b', b'c']).build()
+    assert query.sql == 'SELECT * FROM public.t WHERE data <> ALL (%s)'
+    assert query.params == ([b'a', b'b', b'c'],)
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from AsyncPostgresPool import AsyncPostgresPool
+from Postgres import Postgres
+from PostgresBuilder import PostgresBuilder
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeAsyncDriver, fake_rows
+
+
+def run(coroutine_function):
+    """Runs the coroutine in a new event loop, closing its pools at the end."""
+    async def main():
+        try:
+            return await coroutine_function()
+        finally:
+            await AsyncPostgresPool.close_all()
+    return asyncio.run(main())
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.AsyncPostgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeAsyncDriver(fake_rows(3)), 'max_size': 1}
+    )
+    yield db
+    db.result_cache.clear()
+
+
+def queries(db):
+    conn = db.pool._idle[-1][0]
+    return conn.queries
+
+
+def test_get(db):
+    async def main():
+        rows = await db.rows_only().from_table('locations').where('country', '=', 'Brazil').get()
+        return rows, queries(db)
+
+    rows, executed = run(main)
+    assert rows == fake_rows(3)
+    assert executed == [('SELECT * FROM public.locations WHERE country = %s', ('Brazil',))]
+
+
+def test_pool_follows_the_event_loop(db):
+    async def main():
+        return await db.rows_only().from_table('locations').get()
+
+    assert run(main) == fake_rows(3)
+    assert run(main) == fake_rows(3)
+
+
+def test_cached_results_are_served_from_the_cache(db):
+    async def main():
+        first = await db.cached(ttl=10).from_table('locations').get()
+        second = await db.cached(ttl=10).from_table('locations').get()
+        return first, second, queries(db)
+
+    first, second, executed = run(main)
+    assert first == second
+    assert len(executed) == 1
+    assert db.result_cache_info()['hits'] == 1
+
+
+@pytest.mark.parametrize('name', [
+    'insert_many', 'upsert_many', 'update_many', 'transaction', 'batch', 'explain', 'export', 'chunk_by',
+    'use_prepared_statements', 'log_slow_queries', 'introspect', 'get_schemas', 'get_tables',
+    'get_info_table', 'results_only_rows', 'open_connection',
+])
+def test_blocking_operations_are_not_part_of_the_async_api(db, name):
+    assert hasattr(Postgres, name)
+    assert not hasattr(db, name)
+
+
+def test_async_postgres_shares_the_builder_not_postgres(db):
+    assert isinstance(db, PostgresBuilder)
+    assert not isinstance(db, Postgres)
+
+
+def test_get_query(db):
+    async def main():
+        return await db.get_query(parameterized=True).from_table('locations').where('id', '=', 1).get()
+
+    assert run(main) == ('SELECT * FROM public.locations WHERE id = %s;', (1,))
+
+
+def test_gather_rejects_async_queries(db):
+    query = db.from_table('locations').build()
+    with pytest.raises(TypeError, match='asyncio.gather'):
+        Postgres.gather([query])
+
+
+def test_asyncio_gather(db):
+    async def main():
+        return await asyncio.gather(
+            db.rows_only().from_table('locations').build().run(),
+            db.rows_only().from_table('cities').build().run(),
+        )
+
+    assert run(main) == [fake_rows(3), fake_rows(3)]
@@ -0,0 +1,76 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeConnection, FakeDriver, fake_rows
+
+
+class PagedConnection(FakeConnection):
+    """Returns the next of `pages` on every query, then no rows."""
+
+    def __init__(self, pages):
+        super().__init__([])
+        self.pages = pages
+
+    def cursor(self, name=None):
+        self.rows = self.pages.pop(0) if self.pages else []
+        return super().cursor(name)
+
+
+class PagedDriver(FakeDriver):
+    def __call__(self, dsn):
+        return PagedConnection(self.rows)
+
+
+@pytest.fixture
+def pages():
+    rows = fake_rows(5)
+    return [rows[0:2], rows[2:4], rows[4:5]]
+
+
+@pytest.fixture
+def db(pages):
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': PagedDriver(pages), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def queries(db):
+    conn = db.pool.getconn()
+    db.pool.putconn(conn)
+    return conn.queries
+
+
+def test_pages_continue_after_the_last_key(db):
+    chunks = list(
+        db.rows_only().from_table('locations')
+        .where('country', '=', 'Brazil').where_or('population', '>', 10)
+        .order_by('population').limit(3)
+        .chunk_by('locations.id', 2)
+    )
+
+    assert [[row[0] for row in chunk] for chunk in chunks] == [[1, 2], [3, 4], [5]]
+    assert queries(db) == [
+        ('SELECT * FROM public.locations WHERE country = %s OR population > %s ORDER BY locations.id LIMIT %s',
+         ('Brazil', 10, 2)),
+        # the OR stays grouped, so the key condition applies to both branches
+        ('SELECT * FROM public.locations WHERE ( country = %s OR population > %s ) AND locations.id > %s '
+         'ORDER BY locations.id LIMIT %s', ('Brazil', 10, 2, 2)),
+        ('SELECT * FROM public.locations WHERE ( country = %s OR population > %s ) AND locations.id > %s '
+         'ORDER BY locations.id LIMIT %s', ('Brazil', 10, 4, 2)),
+    ]
+
+
+def test_a_full_last_page_needs_one_more_query(db, pages):
+    pages.pop()
+    assert len(list(db.from_table('locations').chunk_by('id', 2))) == 2
+    assert len(queries(db)) == 3
+
+
+def test_key_must_be_selected(db):
+    with pytest.raises(ValueError):
+        list(db.from_table('locations').chunk_by('missing', 2))
@@ -0,0 +1,56 @@
+import pytest
+
+from Columnar import build_columns
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver, fake_rows
+
+
+DESCRIPTION = (('id', 23), ('price', 701), ('name', 1043))
+
+
+def test_build_columns_from_batches():
+    columns = build_columns(DESCRIPTION, [[(1, 1.5, 'a'), (2, 2.5, 'b')], [], [(3, 3.5, 'c')]])
+
+    assert columns.row_count == 3
+    assert list(columns) == ['id', 'price', 'name']
+    assert list(columns['id']) == [1, 2, 3]
+    assert list(columns['price']) == [1.5, 2.5, 3.5]
+    assert list(columns['name']) == ['a', 'b', 'c']
+    assert not any(columns.masks['id'])
+
+
+def test_build_columns_masks_nulls():
+    columns = build_columns(DESCRIPTION, [[(1, None, None), (None, 2.0, 'b')]])
+
+    assert list(columns.masks['id']) == [False, True]
+    assert list(columns.masks['price']) == [True, False]
+    assert list(columns.masks['name']) == [True, False]
+    assert list(columns['name']) == [None, 'b']
+
+
+def test_build_columns_without_rows():
+    columns = build_columns(DESCRIPTION, [[]])
+    assert columns.row_count == 0
+    assert all(len(values) == 0 for values in columns.values())
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver(fake_rows(25))}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def test_columns_event_counts_every_fetched_row(db):
+    events = []
+    db.add_query_hook(events.append)
+
+    columns = db.from_table('locations').rows_as_columns().get()
+
+    assert columns.row_count == 25
+    assert events[-1].row_count == 25
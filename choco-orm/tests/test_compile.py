@@ -0,0 +1,121 @@
+import pytest
+
+from Query import Query
+from QueryBuilder import QueryBuilder
+
+
+@pytest.fixture
+def db():
+    return QueryBuilder.Postgres('choco_test', 'localhost', 5432, 'test', 'test')
+
+
+def compiled(db):
+    query = db.build()
+    return query.sql, query.params
+
+
+def test_where_and_where_or(db):
+    assert compiled(
+        db.select(['country'])
+        .from_table('locations')
+        .where('country', '=', 'Brazil')
+        .where_or('population', '>', 1000)
+    ) == ('SELECT country FROM public.locations WHERE country = %s OR population > %s', ('Brazil', 1000))
+
+
+def test_same_shape_with_other_values(db):
+    db.from_table('locations').where('country', '=', 'Brazil')
+    assert compiled(db) == ('SELECT * FROM public.locations WHERE country = %s', ('Brazil',))
+
+    db.from_table('locations').where('country', '=', 'Chile')
+    assert compiled(db) == ('SELECT * FROM public.locations WHERE country = %s', ('Chile',))
+
+
+def test_other_shapes_are_not_confused(db):
+    db.from_table('locations').where('country', '=', 'Brazil')
+    compiled(db)
+    db.from_table('locations').where('country', '<>', 'Brazil')
+    assert compiled(db) == ('SELECT * FROM public.locations WHERE country <> %s', ('Brazil',))
+    db.from_table('cities').where('country', '=', 'Brazil')
+    assert compiled(db) == ('SELECT * FROM public.cities WHERE country = %s', ('Brazil',))
+
+
+def test_where_subquery_with_nested_subquery(db):
+    assert compiled(
+        db.select(['country as pais', 'population as populacao'])
+        .from_table('locations')
+        .where_subquery('population', 'IN',
+            lambda: db.select(['population']),
+            lambda: db.from_table('locations'),
+            lambda: db.where('country', '=', 'Brazil'),
+            lambda: db.subquery(
+                lambda: db.where('country', '=', 'Argentina'),
+                lambda: db.where_or('population', '>', 1000),
+                combinator='AND'
+            )
+        )
+    ) == (
+        'SELECT country as pais, population as populacao FROM public.locations WHERE population IN '
+        '( SELECT population FROM public.locations WHERE country = %s AND '
+        '( country = %s OR population > %s ) )',
+        ('Brazil', 'Argentina', 1000)
+    )
+
+
+def test_where_in_list(db):
+    assert compiled(
+        db.from_table('locations').where_in('id', [1, 2, 3]).where('country', '=', 'Brazil')
+    ) == ('SELECT * FROM public.locations WHERE id = ANY (%s) AND country = %s', ([1, 2, 3], 'Brazil'))
+
+
+def test_where_in_list_length_does_not_change_the_sql(db):
+    db.from_table('locations').where_in('id', [1, 2])
+    compiled(db)
+    db.from_table('locations').where_in('id', list(range(100)))
+    assert compiled(db) == ('SELECT * FROM public.locations WHERE id = ANY (%s)', (list(range(100)),))
+
+
+def test_limit_and_offset(db):
+    assert compiled(
+        db.from_table('locations').where('country', '=', 'Brazil').limit(10).offset(20)
+    ) == ('SELECT * FROM public.locations WHERE country = %s LIMIT %s OFFSET %s', ('Brazil', 10, 20))
+
+    db.from_table('locations').where('country', '=', 'Brazil').limit(10)
+    assert compiled(db) == ('SELECT * FROM public.locations WHERE country = %s LIMIT %s', ('Brazil', 10))
+
+
+def test_main_example(db):
+    assert compiled(
+        db.select(['country']).from_table('locations').where('country', '=', 'Brazil')
+    ) == ('SELECT country FROM public.locations WHERE country = %s', ('Brazil',))
+
+
+def test_inlined_query(db):
+    db.from_table('locations').where('country', '=', "O'Brien")
+    compiled(db)
+    db.get_query().from_table('locations').where('country', '=', 'Brazil')
+    assert db.get() == "SELECT * FROM public.locations WHERE country = 'Brazil';"
+
+
+def test_from_table_alias_is_not_part_of_the_table_name(db):
+    db.select(['c.name']).from_table('categories c').where('c.id', '=', 1)
+    query = db.build()
+    assert (query.sql, query.params) == ('SELECT c.name FROM public.categories c WHERE c.id = %s', (1,))
+    assert query.tables == {'public.categories'}
+
+
+def test_select_keeps_an_explicit_star(db):
+    assert compiled(db.select(['id', '*']).from_table('locations')) == ('SELECT id, * FROM public.locations', ())
+    assert compiled(db.select('*').from_table('locations')) == ('SELECT * FROM public.locations', ())
+    assert compiled(db.select([]).from_table('locations')) == ('SELECT * FROM public.locations', ())
+
+
+def test_query_params_are_a_tuple(db):
+    query = db.from_table('locations').where('country', '=', 'Brazil').build()
+    assert isinstance(query.params, tuple)
+    assert Query('SELECT %s', [1], 'records').params == (1,)
+
+
+def test_reset_discards_the_query_being_built(db):
+    db.select(['country']).from_table('locations').where('country', '=', 'Brazil').reset()
+    assert compiled(db.from_table('cities')) == ('SELECT * FROM public.cities', ())
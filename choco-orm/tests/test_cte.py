@@ -0,0 +1,60 @@
+import pytest
+
+from QueryBuilder import QueryBuilder
+
+
+@pytest.fixture
+def db():
+    return QueryBuilder.Postgres('choco_test', 'localhost', 5432, 'test', 'test')
+
+
+def test_chained_ctes_are_read_without_schema(db):
+    stage = db.from_table('x').where('a', '=', 2).build()
+    query = (
+        db.with_cte('big', lambda: db.select(['id', 'country']).from_table('cities').where('population', '>', 1),
+                    materialized=True)
+        .with_cte('stage', stage, columns=['a'], materialized=False)
+        .select(['country']).from_table('big')
+        .join('stage', 'stage.a', '=', 'big.id')
+        .where('country', '=', 'Brazil')
+        .build()
+    )
+
+    assert query.sql == (
+        'WITH big AS MATERIALIZED ( SELECT id, country FROM public.cities WHERE population > %s ) , '
+        'stage (a) AS NOT MATERIALIZED ( SELECT * FROM public.x WHERE a = %s ) '
+        'SELECT country FROM big INNER JOIN stage ON stage.a = big.id WHERE country = %s'
+    )
+    assert query.params == (1, 2, 'Brazil')
+    # the result cache follows the tables read inside the CTEs
+    assert query.tables == {'public.cities', 'public.x'}
+
+
+def test_recursive_cte(db):
+    query = (
+        db.with_recursive(
+            'tree',
+            lambda: db.select(['id', 'parent_id']).from_table('categories').where('id', '=', 1),
+            lambda: db.select(['c.id', 'c.parent_id']).from_table('categories c').join('tree', 'c.parent_id', '=', 'tree.id'),
+            union_all=False)
+        .from_table('tree')
+        .build()
+    )
+
+    assert query.sql == (
+        'WITH RECURSIVE tree AS ( SELECT id, parent_id FROM public.categories WHERE id = %s '
+        'UNION SELECT c.id, c.parent_id FROM public.categories c INNER JOIN tree ON c.parent_id = tree.id ) '
+        'SELECT * FROM tree'
+    )
+    assert query.params == (1,)
+
+
+def test_cte_names_do_not_leak_into_the_next_query(db):
+    db.with_cte('big', lambda: db.from_table('cities')).from_table('big').build()
+    assert db.from_table('big').build().sql == 'SELECT * FROM public.big'
+
+
+def test_cte_needs_a_statement(db):
+    with pytest.raises(ValueError):
+        db.with_cte('big', lambda: db.where('population', '>', 1))
+    db.reset()
@@ -0,0 +1,64 @@
+import io
+
+import pytest
+
+from PostgresCopy import CopyChunkWriter
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver
+
+
+class Target(io.BytesIO):
+    def __init__(self):
+        super().__init__()
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+        return super().write(data)
+
+
+def test_writes_in_chunks_of_the_given_size():
+    target = Target()
+    writer = CopyChunkWriter(target, chunk_size=4)
+
+    for data in (b'ab', b'cdefg', b'hij'):
+        writer.write(data)
+    assert target.writes == [b'abcd', b'efgh']
+
+    writer.flush()
+    assert target.writes == [b'abcd', b'efgh', b'ij']
+    assert writer.bytes_written == 10
+    assert target.getvalue() == b'abcdefghij'
+
+
+def test_text_targets_keep_characters_split_between_chunks():
+    target = io.StringIO()
+    writer = CopyChunkWriter(target, chunk_size=3, encoding='utf-8')
+
+    writer.write('São Paulo,ñ\n'.encode('utf-8'))
+    writer.flush()
+
+    assert target.getvalue() == 'São Paulo,ñ\n'
+    assert writer.bytes_written == len('São Paulo,ñ\n'.encode('utf-8'))
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver([]), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def test_export_arguments_are_checked(db):
+    with pytest.raises(ValueError):
+        db.from_table('locations').export(io.BytesIO(), format='xml')
+    db.reset()
+
+    with pytest.raises(ValueError):
+        db.from_table('locations').export(io.StringIO(), format='binary')
+    assert db.pool.stats()['in_use'] == 0
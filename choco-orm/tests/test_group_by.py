@@ -0,0 +1,46 @@
+import pytest
+
+from QueryBuilder import QueryBuilder
+
+
+@pytest.fixture
+def db():
+    return QueryBuilder.Postgres('choco_test', 'localhost', 5432, 'test', 'test')
+
+
+def test_aggregates_group_by_having_and_order_by(db):
+    query = (
+        db.select(['country'])
+        .count('*', alias='cities')
+        .sum('population', alias='big', filter=lambda: db.where('population', '>', 10))
+        .count('name', distinct=True)
+        .from_table('cities')
+        .group_by(['country', 'region'])
+        .having('count(*)', '>', 2)
+        .having_or('sum(population)', '<', 3)
+        .order_by('cities', 'desc', nulls='last')
+        .order_by('country')
+        .build()
+    )
+
+    assert query.sql == (
+        'SELECT country, count(*) AS cities, sum(population) FILTER (WHERE population > %s ) AS big, '
+        'count(DISTINCT name) FROM public.cities GROUP BY country, region '
+        'HAVING count(*) > %s OR sum(population) < %s ORDER BY cities DESC NULLS LAST, country ASC'
+    )
+    assert query.params == (10, 2, 3)
+
+
+def test_aggregate_without_select(db):
+    query = db.avg('population').min('population', alias='smallest').from_table('cities').group_by('country').build()
+    assert query.sql == 'SELECT avg(population), min(population) AS smallest FROM public.cities GROUP BY country'
+
+
+def test_invalid_order_and_filter(db):
+    with pytest.raises(ValueError):
+        db.order_by('country', 'UP')
+    with pytest.raises(ValueError):
+        db.order_by('country', nulls='MIDDLE')
+    with pytest.raises(ValueError):
+        db.count('*', filter=lambda: db.from_table('cities'))
+    db.reset()
@@ -0,0 +1,69 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver([]), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def copied(db):
+    conn = db.pool.getconn()
+    db.pool.putconn(conn)
+    return conn.copied
+
+
+def test_rows_as_arguments(db):
+    assert db.from_table('t').insert_many(['a', 'b'], (1, 2), (3, 4), method='copy') == 2
+    assert copied(db) == ['1\t2\n3\t4\n']
+
+
+def test_single_row_argument(db):
+    assert db.from_table('t').insert_many(['a', 'b'], (1, 2), method='copy') == 1
+    assert copied(db) == ['1\t2\n']
+
+
+def test_tuple_of_rows(db):
+    assert db.from_table('t').insert_many(['a', 'b'], ((1, 2), (3, 4)), method='copy') == 2
+    assert copied(db) == ['1\t2\n3\t4\n']
+
+
+def test_list_and_generator_of_rows(db):
+    assert db.from_table('t').insert_many(['a', 'b'], [(1, 2), (3, 4)], method='copy') == 2
+    assert db.from_table('t').insert_many(['a', 'b'], ((n, n) for n in range(3)), method='copy') == 3
+    assert copied(db) == ['1\t2\n3\t4\n', '0\t0\n1\t1\n2\t2\n']
+
+
+def test_rows_keyword(db):
+    assert db.from_table('t').insert_many(['a', 'b'], rows=((1, 2), (3, 4)), method='copy') == 2
+    assert copied(db) == ['1\t2\n3\t4\n']
+
+    with pytest.raises(ValueError):
+        db.from_table('t').insert_many(['a', 'b'], (1, 2), rows=[(3, 4)])
+
+
+def test_row_of_wrong_length_is_rejected(db):
+    with pytest.raises(ValueError):
+        db.from_table('t').insert_many(['a', 'b', 'c'], ((1, 2), (3, 4)), method='copy')
+
+
+def test_copy_writes_lists_as_array_literals(db):
+    rows = [(1, [1, None, 3], ['a b', 'say "hi"', 'back\\slash', 'tab\there', None], [[1, 2], [3, 4]])]
+    db.from_table('t').insert_many(['id', 'numbers', 'words', 'matrix'], rows=rows, method='copy')
+    assert copied(db) == [
+        '1\t{1,NULL,3}\t{"a b","say \\\\"hi\\\\"","back\\\\\\\\slash","tab\\there",NULL}\t{{1,2},{3,4}}\n'
+    ]
+
+
+def test_copy_rejects_values_without_array_form(db):
+    with pytest.raises(ValueError, match='cannot be written as a Postgres array'):
+        db.from_table('t').insert_many(['id', 'data'], (1, [b'x']), method='copy')
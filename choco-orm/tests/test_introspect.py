@@ -0,0 +1,92 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeConnection, FakeCursor, FakeDriver
+
+
+RELATIONS = [
+    (1, 'public', 'cities', 'r', 2000),
+    (2, 'public', 'big_cities', 'v', -1),
+    (3, 'sales', 'orders', 'p', 0),
+]
+COLUMNS = [
+    (1, 'id', 'integer', False, "nextval('cities_id_seq'::regclass)"),
+    (1, 'name', 'character varying(30)', True, None),
+    (2, 'name', 'character varying(30)', True, None),
+    (3, 'id', 'bigint', False, None),
+]
+INDEXES = [
+    (1, 'cities_name_idx', False, False, 'CREATE INDEX cities_name_idx ON public.cities USING btree (name)', ['name']),
+    (1, 'cities_pkey', True, True, 'CREATE UNIQUE INDEX cities_pkey ON public.cities USING btree (id)', ['id']),
+    # index of a relation kind that is not described
+    (9, 'other_idx', False, False, 'CREATE INDEX other_idx ON public.other (id)', ['id']),
+]
+
+
+class CatalogCursor(FakeCursor):
+    def execute(self, query, params=None):
+        super().execute(query, params)
+        self._rows = self.connection.results.pop(0)
+
+
+class CatalogConnection(FakeConnection):
+    """Answers the relations, columns and indexes queries in that order."""
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.results = []
+
+    def cursor(self, name=None):
+        return CatalogCursor(self, name)
+
+
+class CatalogDriver(FakeDriver):
+    def __call__(self, dsn):
+        return CatalogConnection(self.rows)
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': CatalogDriver([]), 'max_size': 1}
+    )
+    db.metadata_cache.clear()
+    conn = db.pool.getconn()
+    conn.results = [RELATIONS, COLUMNS, INDEXES]
+    db.pool.putconn(conn)
+    yield db
+    db.metadata_cache.clear()
+    PostgresPool.close_all()
+
+
+def test_schemas_are_described_with_three_queries(db):
+    result = db.introspect(['public', 'sales'])
+
+    assert list(result) == ['public', 'sales']
+    cities = result['public']['cities']
+    assert cities['kind'] == 'table'
+    assert cities['estimated_rows'] == 2000
+    assert cities['columns']['name'] == {'type': 'character varying(30)', 'nullable': True, 'default': None}
+    assert cities['primary_key'] == ['id']
+    assert cities['indexes']['cities_pkey']['unique'] and not cities['indexes']['cities_name_idx']['unique']
+
+    assert result['public']['big_cities']['kind'] == 'view'
+    assert result['public']['big_cities']['estimated_rows'] is None
+    assert result['sales']['orders']['kind'] == 'partitioned table'
+    assert result['sales']['orders']['primary_key'] == []
+
+
+def test_introspection_is_cached_per_schema(db):
+    db.introspect(['public', 'sales'])
+    conn = db.pool.getconn()
+    db.pool.putconn(conn)
+    assert len(conn.queries) == 3
+    assert conn.queries[0][1] == (['public', 'sales'],)
+
+    assert 'orders' in db.introspect('sales')['sales']
+    db.invalidate_metadata(schema='sales')
+    assert 'cities' in db.introspect('public')['public']
+    assert len(conn.queries) == 3
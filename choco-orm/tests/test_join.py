@@ -0,0 +1,70 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from Prefetch import Prefetch
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver, fake_rows
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver(fake_rows(2)), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def test_joins_with_aliases(db):
+    query = (
+        db.select(['l.country', 'c.name']).from_table('locations l')
+        .join('cities c', 'c.location_id', '=', 'l.id')
+        .left_join('people', 'people.city_id', '=', 'c.id')
+        .where('c.population', '>', 5)
+        .build()
+    )
+
+    assert query.sql == (
+        'SELECT l.country, c.name FROM public.locations l '
+        'INNER JOIN public.cities c ON c.location_id = l.id '
+        'LEFT JOIN public.people ON people.city_id = c.id '
+        'WHERE c.population > %s'
+    )
+    assert query.params == (5,)
+    assert query.tables == {'public.locations', 'public.cities', 'public.people'}
+
+
+def test_unsupported_join_type(db):
+    with pytest.raises(ValueError):
+        db.from_table('locations').join('cities', 'cities.location_id', '=', 'locations.id', kind='CROSS')
+    db.reset()
+
+
+def test_prefetch_reads_the_children_in_one_query(db):
+    rows = db.from_table('locations').prefetch('cities', 'id', name='same').get()
+
+    assert [row['id'] for row in rows] == [1, 2]
+    assert [[child['id'] for child in row['same']] for row in rows] == [[1], [2]]
+
+    conn = db.pool.getconn()
+    db.pool.putconn(conn)
+    assert conn.queries == [
+        ('SELECT * FROM public.locations', ()),
+        ('SELECT * FROM public.cities WHERE id = ANY (%s)', ([1, 2],)),
+    ]
+
+
+def test_prefetch_query_and_attach(db):
+    prefetch = Prefetch('public.cities', 'location_id')
+    parents = [{'id': 1}, {'id': 2}, {'id': 1}, {'id': None}]
+
+    query = prefetch.query(parents, db)
+    assert (query.sql, query.params) == ('SELECT * FROM public.cities WHERE location_id = ANY (%s)', ([1, 2],))
+    assert prefetch.query([{'id': None}], db) is None
+    with pytest.raises(ValueError):
+        prefetch.query([{'name': 'x'}], db)
+
+    prefetch.attach(parents, [{'location_id': 1, 'name': 'a'}, {'location_id': 1, 'name': 'b'}])
+    assert [len(parent['cities']) for parent in parents] == [2, 0, 2, 0]
@@ -0,0 +1,41 @@
+import pytest
+
+from QueryBuilder import QueryBuilder
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres('choco_test', 'localhost', 5432, 'test', 'test')
+    cache = db.metadata_cache
+    cache.clear()
+    cache.put(('schemas',), ['public', 'sales'])
+    cache.put(('tables', 'public'), ['cities', 'locations'])
+    cache.put(('columns', 'public', 'locations'), {'id': 'int4'})
+    cache.put(('columns', 'public', 'cities'), {'id': 'int4'})
+    cache.put(('columns', 'sales', 'locations'), {'id': 'int4'})
+    yield db
+    cache.clear()
+
+
+def test_invalidate_table_without_schema_drops_it_from_every_schema(db):
+    db.invalidate_metadata(table_name='locations')
+    keys = set(db.metadata_cache.keys())
+    assert ('columns', 'public', 'locations') not in keys
+    assert ('columns', 'sales', 'locations') not in keys
+    assert ('columns', 'public', 'cities') in keys
+    assert ('schemas',) in keys
+
+
+def test_invalidate_qualified_table(db):
+    db.invalidate_metadata(table_name='public.locations')
+    keys = set(db.metadata_cache.keys())
+    assert ('columns', 'public', 'locations') not in keys
+    assert ('columns', 'sales', 'locations') in keys
+
+
+def test_invalidate_schema(db):
+    db.invalidate_metadata(schema='sales')
+    keys = set(db.metadata_cache.keys())
+    assert ('columns', 'sales', 'locations') not in keys
+    assert ('columns', 'public', 'locations') in keys
+    assert ('schemas',) not in keys
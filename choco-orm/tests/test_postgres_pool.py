@@ -0,0 +1,52 @@
+import threading
+
+import pytest
+
+from PostgresPool import PostgresPool, PoolTimeoutError
+
+from benchmarks.FakeDriver import FakeDriver
+
+
+@pytest.fixture(autouse=True)
+def close_pools():
+    yield
+    PostgresPool.close_all()
+
+
+def test_for_dsn_shares_the_pool():
+    pool = PostgresPool.for_dsn('dbname=a', connect=FakeDriver([]))
+    assert PostgresPool.for_dsn('dbname=a') is pool
+    assert pool.stats()['created'] == 1
+
+
+def test_slow_connect_does_not_block_other_dsns():
+    connecting = threading.Event()
+    release = threading.Event()
+    driver = FakeDriver([])
+
+    def slow_connect(dsn):
+        connecting.set()
+        release.wait(5)
+        return driver(dsn)
+
+    thread = threading.Thread(target=PostgresPool.for_dsn, args=('dbname=slow',), kwargs={'connect': slow_connect})
+    thread.start()
+    try:
+        assert connecting.wait(5)
+        other = threading.Thread(target=PostgresPool.for_dsn, args=('dbname=fast',), kwargs={'connect': driver})
+        other.start()
+        other.join(1)
+        assert not other.is_alive()
+    finally:
+        release.set()
+        thread.join()
+
+
+def test_checkout_reuses_and_times_out():
+    pool = PostgresPool('dbname=a', min_size=0, max_size=1, connect=FakeDriver([]))
+    conn = pool.getconn()
+    with pytest.raises(PoolTimeoutError):
+        pool.getconn(timeout=0.01)
+    pool.putconn(conn)
+    assert pool.getconn() is conn
+    assert pool.stats()['created'] == 1
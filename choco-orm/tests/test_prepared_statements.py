@@ -0,0 +1,58 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver, fake_rows
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver(fake_rows(1)), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def queries(db):
+    conn = db.pool.getconn()
+    db.pool.putconn(conn)
+    return conn.queries
+
+
+def test_values_are_bound_not_written_in_the_sql(db):
+    db.from_table('locations').where('country', '=', "O'Higgins'; DROP TABLE locations; --").get()
+    assert queries(db) == [
+        ('SELECT * FROM public.locations WHERE country = %s', ("O'Higgins'; DROP TABLE locations; --",)),
+    ]
+
+
+def test_each_query_shape_is_prepared_once(db):
+    db.use_prepared_statements()
+    db.from_table('locations').where('country', '=', 'Brazil').where('name', 'LIKE', 'a%').get()
+    db.from_table('locations').where('country', '=', 'Chile').where('name', 'LIKE', 'b%').get()
+    db.from_table('cities').get()
+
+    (prepare, _), first, second, (prepare_cities, _), cities = queries(db)
+    name = prepare.split()[1]
+    assert prepare == f'PREPARE {name} AS SELECT * FROM public.locations WHERE country = $1 AND name LIKE $2'
+    assert first == (f'EXECUTE {name} (%s, %s)', ('Brazil', 'a%'))
+    assert second == (f'EXECUTE {name} (%s, %s)', ('Chile', 'b%'))
+    assert prepare_cities.endswith(' AS SELECT * FROM public.cities')
+    assert cities == (f'EXECUTE {prepare_cities.split()[1]}', None)
+
+
+def test_placeholders_are_numbered_and_percent_signs_kept(db):
+    assert db._to_prepared_statement("SELECT '100%%', %s, %s") == "SELECT '100%', $1, $2"
+
+
+def test_least_recently_used_statements_are_deallocated(db):
+    db.use_prepared_statements(max_statements=1)
+    db.from_table('locations').get()
+    db.from_table('cities').get()
+
+    executed = [query for query, _ in queries(db)]
+    first = executed[0].split()[1]
+    assert executed[2].startswith('PREPARE ') and executed[3] == f'DEALLOCATE {first}'
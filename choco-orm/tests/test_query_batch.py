@@ -0,0 +1,88 @@
+from collections import namedtuple
+
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBatch import QueryBatch
+from QueryBuilder import QueryBuilder
+from QueryStatistics import QueryEvent
+
+from benchmarks.FakeDriver import FakeDriver
+
+
+Column = namedtuple('Column', 'name type_code')
+
+
+class BatchCursor:
+    """Cursor holding the single row the batch statement returns."""
+
+    string_types = {}
+
+    def __init__(self, row, description):
+        self.row = row
+        self.description = description
+        self.connection = self
+
+    def fetchone(self):
+        return self.row
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver([])}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def test_compile_puts_rows_before_descriptions(db):
+    batch = QueryBatch(db)
+    batch.add(db.select(['country']).from_table('locations').where('population', '>', 10))
+    batch.add(db.from_table('cities'))
+
+    sql, params = batch._compile(batch._queries)
+
+    assert sql == (
+        "SELECT (SELECT array_agg(ROW(t.*)::text) FROM (SELECT country FROM public.locations WHERE population > %s) t), "
+        "(SELECT array_agg(ROW(t.*)::text) FROM (SELECT * FROM public.cities) t), 1, d1.*, 2, d2.* "
+        "FROM (SELECT) b "
+        "LEFT JOIN (SELECT * FROM (SELECT country FROM public.locations WHERE population > %s) t LIMIT 0) d1 ON true "
+        "LEFT JOIN (SELECT * FROM (SELECT * FROM public.cities) t LIMIT 0) d2 ON true"
+    )
+    assert params == (10, 10)
+
+
+def test_fetch_decodes_rows_between_markers(db):
+    batch = QueryBatch(db)
+    batch.add(db.rows_only().select(['id', 'name']).from_table('locations'))
+    batch.add(db.rows_are_dictionary().select(['born']).from_table('people'))
+    batch.add(db.rows_only().select(['id']).from_table('empty'))
+
+    row = (
+        ['(1,"São Paulo")', '(2,)', '(3,"a ""quoted"" \\\\ name")'],
+        ['(2024-01-02)'],
+        None,
+        1, None, None,
+        2, None,
+        3, None,
+    )
+    description = [Column('array_agg', 1009)] * 3 + [
+        Column('?column?', 23), Column('id', 23), Column('name', 1043),
+        Column('?column?', 23), Column('born', 1082),
+        Column('?column?', 23), Column('id', 23),
+    ]
+    event = QueryEvent('batch')
+
+    results = batch._fetch(BatchCursor(row, description), batch._queries, event)
+
+    assert results[0] == [(1, 'São Paulo'), (2, None), (3, 'a "quoted" \\ name')]
+    assert [{key: str(value) for key, value in row.items()} for row in results[1]] == [{'born': '2024-01-02'}]
+    assert results[2] == []
+    assert event.row_count == 4
+
+
+def test_columns_queries_are_rejected(db):
+    with pytest.raises(ValueError):
+        QueryBatch(db).add(db.rows_as_columns().from_table('locations'))
@@ -0,0 +1,69 @@
+from QueryPlan import QueryPlan
+
+
+def scan(table, plan_rows, **figures):
+    node = {
+        'Node Type': 'Seq Scan', 'Relation Name': table, 'Schema': 'public', 'Alias': table,
+        'Startup Cost': 0.0, 'Total Cost': 100.0, 'Plan Rows': plan_rows,
+    }
+    node.update(figures)
+    return node
+
+
+def plan(root, **top):
+    return QueryPlan([dict({'Plan': root}, **top)], 'SELECT 1')
+
+
+def test_figures_of_the_root():
+    query_plan = plan(scan('users', 10, **{'Actual Rows': 12, 'Actual Loops': 1, 'Actual Total Time': 1.5}),
+                      **{'Planning Time': 0.1, 'Execution Time': 1.6})
+
+    assert query_plan.analyzed
+    assert (query_plan.total_cost, query_plan.estimated_rows, query_plan.actual_rows) == (100.0, 10, 12)
+    assert (query_plan.planning_time, query_plan.execution_time) == (0.1, 1.6)
+    assert 'Seq Scan on public.users' in str(query_plan)
+    assert str(query_plan).endswith('Execution Time: 1.600 ms')
+
+
+def test_nodes_are_visited_parents_first():
+    root = {
+        'Node Type': 'Hash Join', 'Startup Cost': 0.0, 'Total Cost': 1.0, 'Plan Rows': 1,
+        'Plans': [scan('users', 1), {'Node Type': 'Hash', 'Startup Cost': 0.0, 'Total Cost': 1.0,
+                                     'Plan Rows': 1, 'Plans': [scan('orders', 1)]}],
+    }
+    nodes = [(depth, node['Node Type']) for depth, node in plan(root).nodes()]
+
+    assert nodes == [(0, 'Hash Join'), (1, 'Seq Scan'), (1, 'Hash'), (2, 'Seq Scan')]
+    assert plan(root).seq_scan_relations() == ['public.users', 'public.orders']
+
+
+def test_analyzed_seq_scans_count_rows_removed_by_the_filter():
+    selective = scan('users', 1, **{'Actual Rows': 1, 'Rows Removed by Filter': 49999, 'Actual Loops': 1})
+    assert plan(selective).seq_scans(min_rows=10000) == [selective]
+
+    small = scan('users', 1, **{'Actual Rows': 1, 'Rows Removed by Filter': 99, 'Actual Loops': 1})
+    assert plan(small).seq_scans(min_rows=10000) == []
+
+
+def test_estimated_seq_scans_use_the_table_size():
+    node = scan('users', 1)
+    query_plan = QueryPlan([{'Plan': node}], table_rows={'public.users': 50000.0})
+    assert query_plan.seq_scans(min_rows=10000) == [node]
+
+    # never analyzed tables (reltuples = -1) fall back to the estimated output rows
+    query_plan = QueryPlan([{'Plan': node}], table_rows={'public.users': -1.0})
+    assert query_plan.seq_scans(min_rows=10000) == []
+
+
+def test_sort_spills_and_misestimates():
+    sort = {
+        'Node Type': 'Sort', 'Startup Cost': 0.0, 'Total Cost': 1.0, 'Plan Rows': 10,
+        'Actual Rows': 5000, 'Actual Loops': 1, 'Sort Space Type': 'Disk',
+        'Plans': [scan('users', 5000, **{'Actual Rows': 5000, 'Actual Loops': 1})],
+    }
+    query_plan = plan(sort)
+
+    assert query_plan.sort_spills() == [sort]
+    assert query_plan.misestimates() == [(sort, 10, 5000)]
+    assert not plan(scan('users', 10)).analyzed
+    assert plan(scan('users', 10)).misestimates() == []
@@ -0,0 +1,21 @@
+from QueryStatistics import RESULT_SIZE_SAMPLE, estimate_result_size
+from ResultCache import estimate_rows_size
+
+from benchmarks.FakeDriver import fake_rows
+
+
+def test_small_results_are_measured_exactly():
+    rows = fake_rows(RESULT_SIZE_SAMPLE)
+    assert estimate_result_size(rows) == estimate_rows_size(rows)
+
+
+def test_large_results_are_extrapolated_from_a_sample():
+    rows = fake_rows(10000)
+    exact = estimate_rows_size(rows)
+    assert abs(estimate_result_size(rows) - exact) < exact * 0.05
+
+
+def test_sample_spans_the_whole_result():
+    rows = [(1,)] * 5000 + [('x' * 1000,)] * 5000
+    exact = estimate_rows_size(rows)
+    assert abs(estimate_result_size(rows) - exact) < exact * 0.05
@@ -0,0 +1,46 @@
+import time
+
+from ResultCache import ResultCache
+
+
+def test_invalidate_table_drops_dependent_results():
+    cache = ResultCache()
+    cache.put('a', [(1,)], ['public.users'])
+    cache.put('b', [(2,)], ['public.users', 'public.orders'])
+    cache.put('c', [(3,)], ['public.orders'])
+
+    assert cache.invalidate_table('public.users') == 2
+    assert cache.get('a') is None and cache.get('b') is None
+    assert cache.get('c') == [(3,)]
+    assert cache.info()['invalidations'] == 2
+    assert cache.invalidate_table('public.users') == 0
+
+
+def test_lru_eviction_forgets_tables():
+    cache = ResultCache(max_entries=1)
+    cache.put('a', [(1,)], ['public.users'])
+    cache.put('b', [(2,)], ['public.orders'])
+
+    assert cache.get('a') is None
+    assert 'public.users' not in cache._keys_by_table
+    assert 'a' not in cache._tables_by_key
+
+
+def test_expired_entry_forgets_tables():
+    cache = ResultCache()
+    cache.put('a', [(1,)], ['public.users'], ttl=0.01)
+    time.sleep(0.02)
+
+    assert cache.get('a') is None
+    assert cache._keys_by_table == {}
+    assert cache._tables_by_key == {}
+
+
+def test_put_again_replaces_tables():
+    cache = ResultCache()
+    cache.put('a', [(1,)], ['public.users'])
+    cache.put('a', [(2,)], ['public.orders'])
+
+    assert cache.invalidate_table('public.users') == 0
+    assert cache.get('a') == [(2,)]
+    assert cache.invalidate_table('public.orders') == 1
@@ -0,0 +1,57 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver, fake_rows
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver(fake_rows(5)), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def test_rows_are_streamed_in_the_result_shape(db):
+    assert [row[0] for row in db.rows_only().from_table('locations').stream(batch_size=2)] == [1, 2, 3, 4, 5]
+
+    rows = list(db.rows_with_headers().from_table('locations').stream(batch_size=2))
+    assert rows[0] == ('id', 'country', 'population', 'created')
+    assert len(rows) == 6
+
+    rows = iter(db.rows_are_dictionary().from_table('locations'))
+    assert next(rows)['country'] == 'country 1'
+    rows.close()
+
+    rows = db.rows_are_records().from_table('locations').stream()
+    assert next(rows).population == 1000
+    rows.close()
+
+
+def test_named_cursor_and_event(db):
+    events = []
+    db.add_query_hook(events.append)
+
+    assert len(list(db.from_table('locations').where('id', '>', 0).stream(batch_size=2))) == 5
+
+    event = events[-1]
+    assert (event.query, event.params, event.row_count) == ('SELECT * FROM public.locations WHERE id > %s', (0,), 5)
+
+
+def test_connection_is_returned_when_the_iterator_is_closed(db):
+    rows = db.from_table('locations').stream(batch_size=2)
+    next(rows)
+    assert db.pool.stats()['in_use'] == 1
+
+    rows.close()
+    assert db.pool.stats()['in_use'] == 0
+
+
+def test_columns_cannot_be_streamed(db):
+    with pytest.raises(ValueError):
+        db.rows_as_columns().from_table('locations').stream()
+    db.reset()
@@ -0,0 +1,30 @@
+import threading
+
+from QueryBuilder import QueryBuilder
+
+
+def run_in_thread(function):
+    result = {}
+    thread = threading.Thread(target=lambda: result.setdefault('value', function()))
+    thread.start()
+    thread.join()
+    return result['value']
+
+
+def test_result_shape_is_per_thread():
+    db = QueryBuilder.Postgres('choco_test', 'localhost', 5432, 'test', 'test')
+    db.rows_only()
+
+    assert run_in_thread(lambda: db.from_table('locations').build().shape) == 'dictionary'
+    assert db.from_table('locations').build().shape == 'rows'
+
+
+def test_query_being_built_is_per_thread():
+    db = QueryBuilder.Postgres('choco_test', 'localhost', 5432, 'test', 'test')
+    db.from_table('locations').where('country', '=', 'Brazil')
+
+    other = run_in_thread(lambda: db.from_table('cities').build())
+    query = db.build()
+
+    assert (other.sql, other.params) == ('SELECT * FROM public.cities', ())
+    assert (query.sql, query.params) == ('SELECT * FROM public.locations WHERE country = %s', ('Brazil',))
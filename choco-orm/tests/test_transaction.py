@@ -0,0 +1,102 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeConnection, FakeDriver
+
+
+class RecordingConnection(FakeConnection):
+    """Keeps every statement, commit and session change in `log`."""
+
+    def __init__(self, rows):
+        super().__init__(rows)
+        self.log = []
+
+    def cursor(self, name=None):
+        cursor = super().cursor(name)
+        execute = cursor.execute
+
+        def recorded(query, params=None):
+            self.log.append(query)
+            execute(query, params)
+        cursor.execute = recorded
+        return cursor
+
+    def set_session(self, **options):
+        if options.get('isolation_level') != 'DEFAULT':
+            self.log.append(('set_session', options))
+
+    def commit(self):
+        self.log.append('COMMIT')
+
+
+class RecordingDriver(FakeDriver):
+    def __call__(self, dsn):
+        return RecordingConnection(self.rows)
+
+
+@pytest.fixture
+def db():
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': RecordingDriver([]), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def log(db):
+    conn = db.pool.getconn()
+    db.pool.putconn(conn)
+    return conn.log
+
+
+def test_queries_share_one_connection_and_commit_once(db):
+    with db.transaction(isolation_level='SERIALIZABLE') as tx:
+        assert tx is db and db.in_transaction
+        connection = db.conn
+        db.from_table('a').insert_many(['x'], (1,), method='copy')
+        db.from_table('b').get()
+        assert db.conn is connection
+
+    assert not db.in_transaction and db.conn is None
+    # the COPY of the insert is not committed on its own
+    assert log(db) == [
+        ('set_session', {'isolation_level': 'SERIALIZABLE'}),
+        'SELECT * FROM public.b',
+        'COMMIT',
+    ]
+
+
+def test_nested_transactions_are_savepoints(db):
+    with db.transaction():
+        with db.transaction():
+            with pytest.raises(RuntimeError):
+                with db.transaction():
+                    raise RuntimeError('rolled back to choco_savepoint_2')
+        assert db.in_transaction
+
+    assert log(db) == [
+        'SAVEPOINT choco_savepoint_1',
+        'SAVEPOINT choco_savepoint_2',
+        'ROLLBACK TO SAVEPOINT choco_savepoint_2',
+        'RELEASE SAVEPOINT choco_savepoint_2',
+        'RELEASE SAVEPOINT choco_savepoint_1',
+        'COMMIT',
+    ]
+
+
+def test_failed_transaction_is_not_committed(db):
+    with pytest.raises(RuntimeError):
+        with db.transaction():
+            raise RuntimeError
+    assert log(db) == []
+    assert not db.in_transaction
+
+
+def test_options_only_on_the_outermost_transaction(db):
+    with db.transaction():
+        with pytest.raises(ValueError):
+            with db.transaction(readonly=True):
+                pass
@@ -0,0 +1,78 @@
+import pytest
+
+from PostgresPool import PostgresPool
+from QueryBuilder import QueryBuilder
+
+from benchmarks.FakeDriver import FakeDriver
+
+
+@pytest.fixture
+def db():
+    # every query returns (inserted, updated) = (2, 1)
+    db = QueryBuilder.Postgres(
+        'choco_test', 'localhost', 5432, 'test', 'test',
+        pool_options={'connect': FakeDriver([(2, 1)]), 'max_size': 1}
+    )
+    yield db
+    PostgresPool.close_all()
+
+
+def executed(db):
+    conn = db.pool.getconn()
+    db.pool.putconn(conn)
+    return [query for query, _ in conn.queries], conn.copied
+
+
+def test_upsert_stages_the_rows_and_counts_inserts_by_xmax(db):
+    rows = [{'id': 1, 'country': 'Brazil', 'population': 10}, {'id': 2, 'country': 'Chile', 'population': 20}]
+
+    assert db.upsert_many('locations', rows, key=['id']) == {'rows': 2, 'inserted': 2, 'updated': 1}
+
+    queries, copied = executed(db)
+    assert queries == [
+        'CREATE TEMPORARY TABLE choco_stage ON COMMIT DROP AS '
+        'SELECT id, country, population FROM public.locations WITH NO DATA',
+        'COPY choco_stage (id, country, population) FROM STDIN',
+        'ANALYZE choco_stage',
+        'WITH applied AS (INSERT INTO public.locations AS t (id, country, population) '
+        'SELECT id, country, population FROM choco_stage ON CONFLICT (id) '
+        'DO UPDATE SET country = EXCLUDED.country, population = EXCLUDED.population '
+        'RETURNING (xmax = 0) AS inserted) '
+        'SELECT count(*) FILTER (WHERE inserted), count(*) FILTER (WHERE NOT inserted) FROM applied',
+        'DROP TABLE choco_stage',
+    ]
+    assert copied == ['1\tBrazil\t10\n2\tChile\t20\n']
+
+
+def test_upsert_skip_unchanged_and_update_fields(db):
+    db.upsert_many('locations', [(1, 'Brazil', 10)], key=['id'], fields=['id', 'country', 'population'],
+                   update_fields=['population'], skip_unchanged=True)
+
+    apply_query = executed(db)[0][3]
+    assert 'DO UPDATE SET population = EXCLUDED.population '\
+           'WHERE ROW(t.population) IS DISTINCT FROM ROW(EXCLUDED.population) ' in apply_query
+
+
+def test_upsert_without_fields_to_update_does_nothing_on_conflict(db):
+    db.upsert_many('locations', [{'id': 1}], key=['id'])
+    assert 'ON CONFLICT (id) DO NOTHING RETURNING (xmax = 0) AS inserted' in executed(db)[0][3]
+
+
+def test_update_many_joins_the_stage_on_the_key(db):
+    result = db.update_many('locations', [(1, 2000)], key=['id'], fields=['id', 'population'], skip_unchanged=True)
+
+    assert (result['rows'], result['updated']) == (1, 1)
+    assert executed(db)[0][3] == (
+        'WITH applied AS (UPDATE public.locations AS t SET population = s.population FROM choco_stage AS s '
+        'WHERE t.id = s.id AND ROW(t.population) IS DISTINCT FROM ROW(s.population) RETURNING 1) '
+        'SELECT 0, count(*) FROM applied'
+    )
+
+
+def test_staged_arguments_are_checked(db):
+    assert db.upsert_many('locations', [], key=['id']) == {'rows': 0, 'inserted': 0, 'updated': 0}
+    with pytest.raises(ValueError):
+        db.upsert_many('locations', [(1, 'Brazil')], key=['id'])
+    with pytest.raises(ValueError):
+        db.update_many('locations', [(1,)], key=['id'], fields=['id'])
+    assert executed(db)[0] == []